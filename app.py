@@ -11,6 +11,8 @@ from biomarker_input import (
     validate_biomarker_inputs,
 )
 from calculations import calculate_all_parameters
+from records import BiomarkerVector, as_biomarker_vector
+from dependency_graph import recalculate_incremental
 from results_display import display_results
 from biomarkers_data import TOTAL_BIOMARKERS
 from differential_equations import display_differential_equations
@@ -125,7 +127,7 @@ def load_example_data(scenario: str = "Baseline (Moderate Hormone+ Risk)"):
 
     # Set biomarker values in session state
     # Widgets will read from st.session_state.biomarkers via existing_values
-    st.session_state.biomarkers = example_data
+    st.session_state.biomarkers = as_biomarker_vector(example_data)
 
 # Sidebar
 with st.sidebar:
@@ -157,7 +159,7 @@ with st.sidebar:
 
     # Panel selection (Full / Optimized / Core) — capture for input page
     core_markers, panel_r2 = display_panel_selection()
-    st.session_state.panel_core_markers = core_markers  # list of 15 keys when Core, else None
+    st.session_state.panel_core_markers = core_markers  # panel keys when Core/Optimized, else None
     st.session_state.panel_r2 = panel_r2
 
     # Patient data: save, load, export, import
@@ -229,6 +231,8 @@ with st.sidebar:
                 del st.session_state.biomarkers
             if 'results' in st.session_state:
                 del st.session_state.results
+            if 'results_inputs' in st.session_state:
+                del st.session_state.results_inputs
             if 'patient_baseline' in st.session_state:
                 del st.session_state.patient_baseline
             if 'patient_loaded_from' in st.session_state:
@@ -330,19 +334,20 @@ def show_input_page():
 
     panel_markers = st.session_state.get("panel_core_markers")
     if panel_markers:
-        st.header("📊 Enter Biomarker Values (Core Panel)")
-        st.write("Enter values for the **15 Core Panel** biomarkers. All 37 parameters are still calculated; other biomarkers are imputed to reference values (Chapter 4 preprocessing).")
+        st.header("📊 Enter Biomarker Values (Reduced Panel)")
+        st.write(f"Enter values for the **{len(panel_markers)} panel** biomarkers. All 37 parameters are still calculated; other biomarkers are imputed to reference values (Chapter 4 preprocessing).")
     else:
         st.header("📊 Enter Biomarker Values")
         st.write(f"Enter values for all {TOTAL_BIOMARKERS} biomarkers. Progress is tracked automatically.")
     
-    # Get biomarker inputs (only Core 15 when Core Panel selected)
+    # Get biomarker inputs (only panel biomarkers when Core/Optimized Panel selected)
     biomarkers = get_biomarker_inputs(panel_markers=panel_markers)
     
-    # Store in session state
+    # Store in session state (array-backed; behaves like the 47-key dict)
+    biomarkers = as_biomarker_vector(biomarkers)
     st.session_state.biomarkers = biomarkers
     
-    # Calculate and show progress (over Core 15 when Core panel selected)
+    # Calculate and show progress (over panel biomarkers when a reduced panel is selected)
     progress = calculate_progress(biomarkers, panel_markers=st.session_state.get("panel_core_markers"))
     
     st.divider()
@@ -376,7 +381,7 @@ def show_results_page():
         biomarkers = st.session_state.biomarkers
     else:
         # Try to get from input page
-        biomarkers = get_biomarker_inputs()
+        biomarkers = as_biomarker_vector(get_biomarker_inputs())
         st.session_state.biomarkers = biomarkers
     
     if not biomarkers:
@@ -395,8 +400,17 @@ def show_results_page():
     core_markers = st.session_state.get("panel_core_markers")
     with st.spinner("Calculating parameters..."):
         try:
-            calc_results = calculate_all_parameters(biomarkers, core_markers=core_markers)
+            # Reuse the previous result when only some biomarkers changed on the same panel:
+            # only the scores and parameters that depend on the edited values are recomputed.
+            previous = st.session_state.get("results_inputs")
+            if previous and previous[0] == core_markers and 'results' in st.session_state:
+                calc_results = recalculate_incremental(
+                    st.session_state.results, previous[1], biomarkers, core_markers=core_markers
+                )
+            else:
+                calc_results = calculate_all_parameters(biomarkers, core_markers=core_markers)
             st.session_state.results = calc_results
+            st.session_state.results_inputs = (core_markers, dict(biomarkers))
         except Exception as e:
             st.error(f"❌ Calculation error: {str(e)}")
             st.exception(e)
@@ -495,7 +509,7 @@ def display_patient_simulation():
         # Merge example into full biomarker dict (rest = 0)
         example_data = {k: 0.0 for k in ALL_BIOMARKERS}
         example_data.update(example_patients[selected_example])
-        st.session_state.biomarkers = example_data
+        st.session_state.biomarkers = as_biomarker_vector(example_data)
         # Clear widget keys so form shows new values
         for key in ALL_BIOMARKERS:
             widget_key = f"input_{key}"
@@ -510,7 +524,7 @@ if 'page' not in st.session_state:
     st.session_state.page = "overview"
 
 if 'biomarkers' not in st.session_state:
-    st.session_state.biomarkers = {}
+    st.session_state.biomarkers = BiomarkerVector()
 
 # Page routing
 if st.session_state.page == "overview":
@@ -0,0 +1,472 @@
+"""
+Batch Calculation Module
+Vectorized Chapter 4 formulas for whole cohorts stored as (N, 47) arrays.
+
+Every formula mirrors calculations.calculate_all_parameters term by term, so each
+row reproduces the scalar result exactly; the λ-ordering auto-corrections are
+applied with array masks instead of per-patient branches. On import the registries
+are checked against the formula index dependency_graph reads from calculations.py,
+so a formula edited in one place but not the other fails loudly.
+"""
+
+import numpy as np
+import pandas as pd
+
+from biomarkers_data import BIOMARKER_KEYS, BIOMARKER_INDEX
+from calculations import PARAMETER_NAMES, REFERENCE_VALUES_FOR_IMPUTATION
+
+# Column order of the score and organ arrays returned by calculate_all_parameters_batch
+SCORE_NAMES = (
+    's_tumor', 's_prolif', 's_immune', 's_suppress', 'G', 's_genetic',
+    's_metabolic', 's_stress', 's_activation', 'f_resist1', 'f_resist2',
+    's_quiescence', 'f_metastatic',
+)
+ORGAN_NAMES = ('f_liver', 'f_kidney', 'f_clearance')
+
+# Biological ordering λ₁ > λ₂ > λ_R1 > λ_R2, checked in this order (higher, lower, message)
+GROWTH_HIERARCHY = (
+    ('lambda1', 'lambda2', "λ₁ must be > λ₂"),
+    ('lambda2', 'lambdaR1', "λ₂ must be > λ_R1"),
+    ('lambdaR1', 'lambdaR2', "λ_R1 must be > λ_R2"),
+)
+
+# Reference (normal) values as a row vector in BIOMARKER_KEYS order
+REFERENCE_VECTOR = np.array([REFERENCE_VALUES_FOR_IMPUTATION.get(k, 0.0) for k in BIOMARKER_KEYS])
+
+
+def biomarkers_to_array(data):
+    """
+    Convert a cohort into an (N, 47) float array in ALL_BIOMARKERS column order.
+
+    Accepts a DataFrame (columns named by biomarker key), a list of biomarker
+    dicts, a single dict, or an array of shape (N, 47) / (47,). Biomarkers that
+    are absent are returned as NaN so they can be imputed.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.reindex(columns=list(BIOMARKER_KEYS)).to_numpy(dtype=float)
+    if isinstance(data, dict):
+        data = [data]
+    if isinstance(data, (list, tuple)) and data and isinstance(data[0], dict):
+        X = np.full((len(data), len(BIOMARKER_KEYS)), np.nan)
+        for i, record in enumerate(data):
+            for key, value in record.items():
+                idx = BIOMARKER_INDEX.get(key)
+                if idx is not None and value is not None:
+                    X[i, idx] = value
+        return X
+    X = np.asarray(data, dtype=float)
+    if X.ndim == 1:
+        X = X[np.newaxis, :]
+    if X.ndim != 2 or X.shape[1] != len(BIOMARKER_KEYS):
+        raise ValueError(f"Expected an (N, {len(BIOMARKER_KEYS)}) array, got shape {X.shape}")
+    return X
+
+
+def impute_reference_batch(X):
+    """Replace missing (NaN) entries with REFERENCE_VALUES_FOR_IMPUTATION."""
+    return np.where(np.isnan(X), REFERENCE_VECTOR, X)
+
+
+class _Columns:
+    """Read-only view giving biomarker columns by key, e.g. b['il10'] -> (N,) array."""
+
+    __slots__ = ('_X',)
+
+    def __init__(self, X):
+        self._X = X
+
+    def __getitem__(self, key):
+        return self._X[:, BIOMARKER_INDEX[key]]
+
+
+def _clamp(x, lo, hi):
+    """Elementwise max(lo, min(hi, x)), the bounded transformation used throughout Chapter 4."""
+    return np.maximum(lo, np.minimum(hi, x))
+
+
+# ---------------------------------------------------------------------------
+# Composite scores
+# ---------------------------------------------------------------------------
+
+def _s_tumor(b, s):
+    return (1/5) * (b['ca153'] / 31.3 + b['ca2729'] / 38 + b['cea'] / 3.0 + b['ctc'] / 5 + b['ctdna'] / 1.0)
+
+
+def _s_prolif(b, s):
+    return (1/4) * (b['tk1'] / 2.0 + b['glucose'] / 95 + b['lactate'] / 2.2 + b['survivin'] / 0.5)
+
+
+def _s_immune(b, s):
+    return (
+        0.4 * (b['cd8'] / 700) +
+        0.3 * (b['cd4'] / 1050) +
+        0.2 * (b['nk'] / 345) +
+        0.1 * (b['ifn_gamma'] / 2.0)
+    )
+
+
+def _s_suppress(b, s):
+    return (1/3) * (b['il10'] / 5.0 + b['tgf_beta'] / 2.5 + b['pdl1_ctc'] / 1.0)
+
+
+def _G(b, s):
+    return _clamp(1 - 0.3 * (b['ctdna'] / 1.0) - 0.2 * (b['pik3ca'] / 10) - 0.2 * (b['tp53'] / 10), 0.1, 1.0)
+
+
+def _s_genetic(b, s):
+    return (1/3) * (b['ctdna'] / 1.0 + b['pik3ca'] / 10 + b['tp53'] / 10)
+
+
+def _s_metabolic(b, s):
+    return (1/3) * (b['glucose'] / 95 + b['lactate'] / 2.2 + b['ldh'] / 250)
+
+
+def _s_stress(b, s):
+    return s['s_metabolic']
+
+
+def _s_activation(b, s):
+    return (1/2) * (b['ifn_gamma'] / 5 + b['cd4'] / 1200)
+
+
+def _f_resist1(b, s):
+    return _clamp((1/4) * (b['esr1_mutations'] / 8 + b['pgr'] / 20 + b['pik3ca'] / 5 + b['survivin'] / 6), 0.1, 2.0)
+
+
+def _f_resist2(b, s):
+    return _clamp((1/4) * (b['her2_mutations'] / 10 + b['mdr1'] / 150 + b['survivin'] / 6 + b['hsp'] / 10), 0.1, 2.0)
+
+
+def _s_quiescence(b, s):
+    nutrient_stress = np.maximum(0, (100 - b['glucose']) / 100)
+    metabolic_stress = np.minimum(1.0, b['lactate'] / 4.0)
+    return (nutrient_stress + metabolic_stress) / 2
+
+
+def _f_metastatic(b, s):
+    f_emt = np.maximum(0, (5 - b['mir200']) / 5)
+    return (1/3) * (b['ctc'] / 20 + f_emt + b['exosomes'] / 100)
+
+
+_SCORE_FORMULAS = {
+    's_tumor': _s_tumor,
+    's_prolif': _s_prolif,
+    's_immune': _s_immune,
+    's_suppress': _s_suppress,
+    'G': _G,
+    's_genetic': _s_genetic,
+    's_metabolic': _s_metabolic,
+    's_stress': _s_stress,
+    's_activation': _s_activation,
+    'f_resist1': _f_resist1,
+    'f_resist2': _f_resist2,
+    's_quiescence': _s_quiescence,
+    'f_metastatic': _f_metastatic,
+}
+
+
+# ---------------------------------------------------------------------------
+# Organ functions
+# ---------------------------------------------------------------------------
+
+def _f_liver(b, o):
+    alt_factor = _clamp(40 / np.maximum(b['alt'], 5), 0.2, 1.2)
+    ast_factor = _clamp(45 / np.maximum(b['ast'], 8), 0.2, 1.2)
+    bilirubin_factor = _clamp(1.2 / np.maximum(b['bilirubin'], 0.1), 0.5, 1.5)
+    return (alt_factor + ast_factor + bilirubin_factor) / 3
+
+
+def _f_kidney(b, o):
+    creatinine_factor = _clamp(1.2 / np.maximum(b['creatinine'], 0.5), 0.3, 1.3)
+    bun_factor = _clamp(20 / np.maximum(b['bun'], 5), 0.3, 1.3)
+    return (creatinine_factor + bun_factor) / 2
+
+
+def _f_clearance(b, o):
+    return o['f_liver'] * o['f_kidney']
+
+
+_ORGAN_FORMULAS = {
+    'f_liver': _f_liver,
+    'f_kidney': _f_kidney,
+    'f_clearance': _f_clearance,
+}
+
+
+# ---------------------------------------------------------------------------
+# Parameters (same order as calculate_all_parameters)
+# ---------------------------------------------------------------------------
+
+def _f_general(b):
+    albumin_component = b['albumin'] / 4.0
+    glucose_component = np.maximum(0.5, 1 - 0.3 * np.abs(95 - b['glucose']) / 95)
+    return (albumin_component + glucose_component) / 2
+
+
+def _f_organs(o):
+    return (o['f_liver'] + o['f_kidney']) / 2
+
+
+def _etaE(b, s, o, p):
+    f_receptor = np.minimum(1.0, b['esr1_protein'] / 6.0)
+    f_CYP2D6 = np.minimum(1.0, b['cyp2d6'] / 2.0)
+    f_metabolism = (o['f_liver'] + f_CYP2D6 + _f_general(b)) / 3
+    resistance_component = 0.6 * (b['esr1_mutations'] / 8) + 0.4 * s['s_genetic']
+    f_resist_hormone = 1 - np.minimum(0.9, resistance_component)
+    return _clamp(f_receptor * f_metabolism * f_resist_hormone, 0.1, 0.95)
+
+
+def _etaC(b, s, o, p):
+    return _clamp(_f_general(b) * _f_organs(o) * (1 - 0.7 * s['f_resist2']), 0.1, 0.95)
+
+
+def _etaH(b, s, o, p):
+    her2_circ_component = np.minimum(1.0, b['her2_circ'] / 5.0)
+    her2_mut_penalty = 1 - 0.6 * (b['her2_mutations'] / 10)
+    f_HER2 = her2_circ_component * her2_mut_penalty
+    return _clamp(f_HER2 * _f_organs(o) * (1 - 0.5 * s['f_resist2']), 0.1, 0.95)
+
+
+def _etaI(b, s, o, p):
+    f_PDL1 = np.minimum(1.0, b['pdl1_ctc'] / 3.0)
+    cd8_component = b['cd8'] / 700
+    cd4_component = b['cd4'] / 1050
+    ifn_component = b['ifn_gamma'] / 2.0
+    il10_component = np.maximum(0.0, 1.0 - b['il10'] / 15)
+    f_immune_ctx = (cd8_component + cd4_component + ifn_component + il10_component) / 4
+    return _clamp(f_PDL1 * f_immune_ctx * _f_general(b), 0.1, 0.95)
+
+
+def _deltaG(b, s, o, p):
+    brca_factor = 1.0 - np.minimum(0.5, b['brca'] / 2.0)
+    return _clamp(0.01 * brca_factor * s['G'], 0.001, 0.05)
+
+
+def _kappaM(b, s, o, p):
+    beta_hydroxybutyrate_factor = np.maximum(0.5, 1 - b['beta_hydroxybutyrate'] / 2.0)
+    return _clamp(0.02 * s['s_metabolic'] * beta_hydroxybutyrate_factor, 0.001, 0.1)
+
+
+def _alpha_acid(b, s, o, p):
+    ph_deviation = np.maximum(0.0, 7.4 - b['blood_ph'])
+    return _clamp(2.0 * ph_deviation, 0.01, 0.5)
+
+
+_PARAMETER_FORMULAS = {
+    'G': lambda b, s, o, p: s['G'],
+    'lambda1': lambda b, s, o, p: _clamp(0.04 * (1 + 1.5 * s['s_prolif']), 0.01, 0.15),
+    'lambda2': lambda b, s, o, p: _clamp(0.6 * p['lambda1'] * (1 + 0.5 * s['f_resist1']), 0.005, 0.1),
+    'lambdaR1': lambda b, s, o, p: _clamp(0.4 * p['lambda1'] * s['f_resist1'], 0.003, 0.05),
+    'lambdaR2': lambda b, s, o, p: _clamp(0.25 * p['lambda1'] * (1 - 0.3 * s['f_resist2']), 0.001, 0.03),
+    'K': lambda b, s, o, p: _clamp(s['s_tumor'] * 2000, 100, 15000),
+    'beta1': lambda b, s, o, p: _clamp(0.02 * s['s_immune'] * (1 - s['s_suppress']), 0.001, 0.1),
+    'beta2': lambda b, s, o, p: _clamp(0.05 + 0.15 * s['s_suppress'], 0.01, 0.5),
+    'phi1': lambda b, s, o, p: _clamp(0.05 + 0.1 * s['s_activation'], 0.01, 0.2),
+    'phi2': lambda b, s, o, p: _clamp(0.01 + 0.03 * (s['s_tumor'] / 2), 0.005, 0.1),
+    'phi3': lambda b, s, o, p: _clamp(0.02 + 0.08 * (b['il10'] / 15), 0.005, 0.15),
+    'deltaI': lambda b, s, o, p: _clamp(0.05 + 0.1 * s['s_stress'], 0.02, 0.3),
+    'omegaR1': lambda b, s, o, p: _clamp(0.002 * s['s_genetic'] * s['s_stress'], 0.0001, 0.01),
+    'omegaR2': lambda b, s, o, p: _clamp(0.001 * s['s_genetic'] * s['s_stress'], 0.0001, 0.008),
+    'etaE': _etaE,
+    'etaC': _etaC,
+    'etaH': _etaH,
+    'etaI': _etaI,
+    'kel': lambda b, s, o, p: _clamp(0.1 / o['f_clearance'], 0.05, 0.3),
+    'k_metabolism': lambda b, s, o, p: _clamp(0.05 * o['f_liver'], 0.02, 0.2),
+    'k_clearance': lambda b, s, o, p: _clamp(0.2 * o['f_clearance'], 0.1, 0.5),
+    'alphaA': lambda b, s, o, p: _clamp(0.02 * (1 + b['vegf'] / 400) * (1 + b['ang2'] / 3000), 0.001, 0.1),
+    'deltaA': lambda b, s, o, p: _clamp(0.1 * o['f_clearance'], 0.05, 0.2),
+    'kappaQ': lambda b, s, o, p: _clamp(0.005 + 0.02 * s['s_quiescence'], 0.001, 0.05),
+    'lambdaQ': lambda b, s, o, p: _clamp(0.002 + 0.01 * (1 - s['s_quiescence']), 0.0005, 0.02),
+    'kappaS': lambda b, s, o, p: _clamp(0.002 + 0.01 * s['s_stress'], 0.001, 0.04),
+    'deltaS': lambda b, s, o, p: _clamp(0.05 * s['s_immune'], 0.02, 0.1),
+    'gamma': lambda b, s, o, p: _clamp(0.002 * s['f_metastatic'], 0.0001, 0.01),
+    'deltaP': lambda b, s, o, p: _clamp(0.05 + 0.03 * s['s_immune'], 0.02, 0.1),
+    'mu': lambda b, s, o, p: _clamp(0.01 * (1 + 1.5 * s['s_genetic']), 0.001, 0.05),
+    'nu': lambda b, s, o, p: _clamp(0.002 * s['s_genetic'] * (1 + s['s_stress']), 0.0001, 0.01),
+    'deltaG': _deltaG,
+    'kappaM': _kappaM,
+    'deltaM': lambda b, s, o, p: _clamp(0.01 * (1 - 0.5 * s['s_metabolic']), 0.001, 0.05),
+    'kappaH': lambda b, s, o, p: _clamp(0.02 * np.maximum(0, s['s_tumor'] - 0.5), 0.001, 0.1),
+    'deltaH': lambda b, s, o, p: _clamp(0.05 * (1 + o['f_clearance']), 0.01, 0.1),
+    'rho1': lambda b, s, o, p: _clamp(0.75 + 0.15 * s['s_immune'], 0.6, 0.9),
+    'rho2': lambda b, s, o, p: _clamp(0.45 - 0.15 * s['f_resist2'], 0.3, 0.6),
+    'alpha_acid': _alpha_acid,
+}
+
+
+def _enforce_growth_hierarchy(parameters):
+    """
+    Apply the λ-ordering auto-corrections in place with array masks.
+    Returns an (N, 3) boolean array of violations in GROWTH_HIERARCHY order.
+    """
+    violations = []
+    for higher, lower, _ in GROWTH_HIERARCHY:
+        mask = parameters[higher] <= parameters[lower]
+        parameters[lower] = np.where(mask, parameters[higher] * 0.99, parameters[lower])
+        violations.append(mask)
+    return np.column_stack(violations)
+
+
+class _Reads:
+    """Mapping view that records the biomarker keys behind every value a formula reads."""
+
+    __slots__ = ('_values', '_keys', '_read')
+
+    def __init__(self, values, keys, read):
+        self._values = values
+        self._keys = keys
+        self._read = read
+
+    def __getitem__(self, key):
+        self._read |= self._keys(key)
+        return self._values[key]
+
+
+def _registry_dependencies():
+    """
+    Biomarker keys each batch formula depends on, directly or through other
+    scores/organs/parameters, traced by evaluating the registries on one reference row.
+    Returns {(kind, name): frozenset(biomarker keys)} using dependency_graph's node names.
+    """
+    columns = _Columns(REFERENCE_VECTOR[np.newaxis, :])
+    deps = {}
+    values = {'score': {}, 'organ': {}, 'parameter': {}}
+
+    def view(kind, read):
+        return _Reads(values[kind], lambda key: deps[(kind, key)], read)
+
+    for kind, registry in (('score', _SCORE_FORMULAS), ('organ', _ORGAN_FORMULAS)):
+        for name, formula in registry.items():
+            read = set()
+            values[kind][name] = formula(_Reads(columns, lambda key: {key}, read), view(kind, read))
+            deps[(kind, name)] = frozenset(read)
+    for name, formula in _PARAMETER_FORMULAS.items():
+        read = set()
+        values['parameter'][name] = formula(
+            _Reads(columns, lambda key: {key}, read),
+            view('score', read), view('organ', read), view('parameter', read),
+        )
+        deps[('parameter', name)] = frozenset(read)
+    # The λ-ordering correction may overwrite the lower rate with the higher one
+    for higher, lower, _ in GROWTH_HIERARCHY:
+        deps[('parameter', lower)] |= deps[('parameter', higher)]
+    return deps
+
+
+def _check_formula_registry():
+    """
+    Check the hand-vectorized registries against the formulas in calculations.py.
+
+    dependency_graph reads the scalar formulas from the calculations.py source;
+    every score, organ factor and parameter there must have a batch formula here
+    reading the same biomarkers (and vice versa), otherwise the two copies have
+    drifted apart and importing this module fails.
+    """
+    from dependency_graph import biomarker_inputs, formula_inputs
+
+    batch = _registry_dependencies()
+    scalar = formula_inputs()
+    problems = [f"{kind} {name}: no batch formula" for kind, name in sorted(set(scalar) - set(batch))]
+    problems += [f"{kind} {name}: not in calculations.py" for kind, name in sorted(set(batch) - set(scalar))]
+    for node in sorted(set(batch) & set(scalar)):
+        if batch[node] != biomarker_inputs(node):
+            extra = sorted(batch[node] - biomarker_inputs(node))
+            missing = sorted(biomarker_inputs(node) - batch[node])
+            problems.append(f"{node[0]} {node[1]}: reads {extra} extra, {missing} missing")
+    if problems:
+        raise RuntimeError(
+            "batch_calculations formulas differ from calculations.py:\n  " + "\n  ".join(problems)
+        )
+
+
+_check_formula_registry()
+
+
+def calculate_composite_scores_batch(X):
+    """
+    Calculate all composite scores for an imputed (N, 47) cohort.
+    Returns dictionary of (N,) arrays keyed by score name.
+    """
+    b = _Columns(X)
+    scores = {}
+    for name, formula in _SCORE_FORMULAS.items():
+        scores[name] = formula(b, scores)
+    return scores
+
+
+def calculate_organ_functions_batch(X):
+    """
+    Calculate liver and kidney function factors for an imputed (N, 47) cohort.
+    Returns dictionary of (N,) arrays keyed by organ factor name.
+    """
+    b = _Columns(X)
+    organs = {}
+    for name, formula in _ORGAN_FORMULAS.items():
+        organs[name] = formula(b, organs)
+    return organs
+
+
+def calculate_all_parameters_batch(data, core_markers=None):
+    """
+    Calculate all 37 parameters for a cohort in one vectorized pass.
+
+    Args:
+        data: (N, 47) array in ALL_BIOMARKERS column order, or a DataFrame / list of
+            dicts accepted by biomarkers_to_array. NaN marks a missing biomarker and
+            is imputed to reference values, like a missing key in the scalar path.
+        core_markers: optional panel (e.g. Core 15 / Optimized 25); columns outside the
+            panel are imputed to reference values with the panel's precompiled template.
+
+    Returns:
+        dict with 'parameters' (N, 37), 'scores' (N, 13), 'organs' (N, 3),
+        'alpha_acid' (N,), 'constraint_violations' (N, 3) boolean mask, and the
+        matching column names ('parameter_names', 'score_names', 'organ_names',
+        'constraint_messages').
+    """
+    X = biomarkers_to_array(data)
+    if core_markers:
+        from panels import apply_panel_template, panel_template
+        X = apply_panel_template(X, panel_template(core_markers))
+    else:
+        X = impute_reference_batch(X)
+    b = _Columns(X)
+
+    scores = calculate_composite_scores_batch(X)
+    organs = calculate_organ_functions_batch(X)
+
+    parameters = {}
+    for name, formula in _PARAMETER_FORMULAS.items():
+        parameters[name] = formula(b, scores, organs, parameters)
+
+    violations = _enforce_growth_hierarchy(parameters)
+
+    return {
+        'parameters': np.column_stack([parameters[n] for n in PARAMETER_NAMES]),
+        'scores': np.column_stack([scores[n] for n in SCORE_NAMES]),
+        'organs': np.column_stack([organs[n] for n in ORGAN_NAMES]),
+        'alpha_acid': parameters['alpha_acid'],
+        'constraint_violations': violations,
+        'parameter_names': PARAMETER_NAMES,
+        'score_names': SCORE_NAMES,
+        'organ_names': ORGAN_NAMES,
+        'constraint_messages': tuple(message for _, _, message in GROWTH_HIERARCHY),
+    }
+
+
+def batch_row_to_result(batch, i):
+    """
+    Rebuild the calculate_all_parameters-style dict for row i of a batch result.
+    Useful for handing a single cohort member to the results page.
+    """
+    parameters = {'G': float(batch['scores'][i, SCORE_NAMES.index('G')])}
+    parameters.update({n: float(v) for n, v in zip(batch['parameter_names'], batch['parameters'][i])})
+    parameters['alpha_acid'] = float(batch['alpha_acid'][i])
+    return {
+        'parameters': parameters,
+        'scores': {n: float(v) for n, v in zip(batch['score_names'], batch['scores'][i])},
+        'organs': {n: float(v) for n, v in zip(batch['organ_names'], batch['organs'][i])},
+        'constraint_violations': [
+            m for m, hit in zip(batch['constraint_messages'], batch['constraint_violations'][i]) if hit
+        ],
+    }
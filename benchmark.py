@@ -0,0 +1,244 @@
+"""
+Benchmark Module
+Timing suite for the parameter pipeline.
+
+Times the scalar functions (get_biomarkers_for_calculation,
+calculate_composite_scores, calculate_organ_functions, calculate_all_parameters)
+and the batch, selective and parallel variants on synthetic cohorts for the Full
+and Core panels, plus the 365-day ensemble ODE simulation on cohorts of up to
+MAX_SIMULATION_ROWS patients, and writes machine-readable JSON with ops/sec, p50/p99 latency
+and peak traced memory (calling process only; score_parallel workers are not
+included). A previous JSON file can be passed with --compare to flag regressions.
+
+Usage:
+    python benchmark.py -o bench.json
+    python benchmark.py --sizes 1 1000 --panels core -o quick.json --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from batch_calculations import REFERENCE_VECTOR, calculate_all_parameters_batch
+from biomarkers_data import BIOMARKER_KEYS
+from calculations import (
+    calculate_all_parameters,
+    calculate_composite_scores,
+    calculate_organ_functions,
+    get_biomarkers_for_calculation,
+)
+
+DEFAULT_SIZES = (1, 1_000, 100_000, 1_000_000)
+DEFAULT_PANELS = ('full', 'core')
+
+# Scalar functions are timed per patient on at most this many rows of each cohort
+MAX_SCALAR_ROWS = 10_000
+MIN_SCALAR_CALLS = 1_000
+# Target wall time per case; batch cases repeat until it is reached (min 3, max 1000 runs)
+TARGET_SECONDS = 1.0
+# simulate_cohort is timed only on cohorts up to this size
+MAX_SIMULATION_ROWS = 5_000
+
+
+def synthetic_cohort(n, seed=0):
+    """(n, 47) cohort: reference values with log-normal spread and 5% missing entries."""
+    rng = np.random.default_rng(seed)
+    X = REFERENCE_VECTOR * rng.lognormal(0.0, 0.5, size=(n, len(BIOMARKER_KEYS)))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def _rows_as_dicts(X):
+    return [
+        {k: v for k, v in zip(BIOMARKER_KEYS, row) if v == v}
+        for row in X.tolist()
+    ]
+
+
+def _summary(name, panel, n, rows_per_call, timings, peak_bytes, **extra):
+    timings = np.asarray(timings)
+    total = float(timings.sum())
+    result = {
+        'name': name,
+        'panel': panel,
+        'n': n,
+        'calls': int(len(timings)),
+        'rows_per_call': rows_per_call,
+        'ops_per_sec': rows_per_call * len(timings) / total if total > 0 else float('inf'),
+        'p50_ms': float(np.percentile(timings, 50) * 1e3),
+        'p99_ms': float(np.percentile(timings, 99) * 1e3),
+        'mean_ms': float(timings.mean() * 1e3),
+        'peak_memory_mb': peak_bytes / 2 ** 20,
+    }
+    result.update(extra)
+    return result
+
+
+def _peak_memory(call):
+    """Peak traced allocation (bytes) of one call; numpy buffers are traced."""
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _time_per_row(name, panel, n, rows, call):
+    """Time call(row) per patient, cycling through rows for at least MIN_SCALAR_CALLS calls."""
+    timings = []
+    clock = time.perf_counter
+    for i in range(max(len(rows), MIN_SCALAR_CALLS)):
+        row = rows[i % len(rows)]
+        start = clock()
+        call(row)
+        timings.append(clock() - start)
+    peak = _peak_memory(lambda: call(rows[0]))
+    return _summary(name, panel, n, 1, timings, peak, rows_timed=len(rows))
+
+
+def _time_cohort(name, panel, n, call, target_seconds=TARGET_SECONDS):
+    """Time call() on the whole cohort, repeating until target_seconds has passed."""
+    timings = []
+    clock = time.perf_counter
+    deadline = clock() + target_seconds
+    while len(timings) < 3 or (clock() < deadline and len(timings) < 1000):
+        start = clock()
+        call()
+        timings.append(clock() - start)
+    peak = _peak_memory(call)
+    return _summary(name, panel, n, n, timings, peak)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, panels=DEFAULT_PANELS, max_scalar_rows=MAX_SCALAR_ROWS,
+                   workers=None, target_seconds=TARGET_SECONDS, log=None):
+    """Run every case for each (panel, size); returns the list of result dicts."""
+    from panels import PANELS
+    from parallel_scoring import score_parallel
+    from selective import calculate_parameters_batch
+    from simulation import simulate_cohort
+
+    results = []
+    for panel in panels:
+        markers = None if panel == 'full' else PANELS[panel]['markers']
+        for n in sizes:
+            X = synthetic_cohort(n)
+            rows = _rows_as_dicts(X[:max_scalar_rows])
+            imputed = [get_biomarkers_for_calculation(r, markers) for r in rows]
+            cases = [
+                lambda: _time_per_row('get_biomarkers_for_calculation', panel, n, rows,
+                                      lambda r: get_biomarkers_for_calculation(r, markers)),
+                lambda: _time_per_row('calculate_composite_scores', panel, n, imputed, calculate_composite_scores),
+                lambda: _time_per_row('calculate_organ_functions', panel, n, imputed, calculate_organ_functions),
+                lambda: _time_per_row('calculate_all_parameters', panel, n, rows,
+                                      lambda r: calculate_all_parameters(r, core_markers=markers)),
+                lambda: _time_cohort('calculate_all_parameters_batch', panel, n,
+                                     lambda: calculate_all_parameters_batch(X, core_markers=markers), target_seconds),
+                lambda: _time_cohort('calculate_parameters_batch[therapy]', panel, n,
+                                     lambda: calculate_parameters_batch(X, ['therapy'], core_markers=markers),
+                                     target_seconds),
+            ]
+            if n >= 100_000:
+                cases.append(lambda: _time_cohort(
+                    'score_parallel', panel, n,
+                    lambda: score_parallel(X, core_markers=markers, workers=workers), target_seconds,
+                ))
+            if n <= MAX_SIMULATION_ROWS:
+                batch = calculate_all_parameters_batch(X, core_markers=markers)
+                model_parameters = np.column_stack([batch['parameters'], batch['alpha_acid']])
+                cases.append(lambda: _time_cohort(
+                    'simulate_cohort[365d]', panel, n,
+                    lambda: simulate_cohort(model_parameters), target_seconds,
+                ))
+            for case in cases:
+                result = case()
+                results.append(result)
+                if log:
+                    log(f"{result['name']:<40} {panel:<9} n={n:<9,} "
+                        f"{result['ops_per_sec']:>14,.0f} rows/s  p50 {result['p50_ms']:.3f} ms  "
+                        f"p99 {result['p99_ms']:.3f} ms  peak {result['peak_memory_mb']:.1f} MB")
+    return results
+
+
+def environment():
+    """Build/host details stored with the results."""
+    commit = None
+    head = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.git', 'HEAD')
+    try:
+        with open(head, encoding='utf-8') as f:
+            ref = f.read().strip()
+        if ref.startswith('ref: '):
+            with open(os.path.join(os.path.dirname(head), ref[5:]), encoding='utf-8') as f:
+                commit = f.read().strip()
+        else:
+            commit = ref
+    except OSError:
+        pass
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Cases whose ops/sec dropped by more than tolerance (fraction) versus baseline.
+    Returns a list of (name, panel, n, baseline_ops, current_ops).
+    """
+    previous = {(r['name'], r['panel'], r['n']): r['ops_per_sec'] for r in baseline['results']}
+    regressions = []
+    for r in results:
+        before = previous.get((r['name'], r['panel'], r['n']))
+        if before and r['ops_per_sec'] < before * (1 - tolerance):
+            regressions.append((r['name'], r['panel'], r['n'], before, r['ops_per_sec']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Chapter 4 parameter pipeline.")
+    parser.add_argument("-o", "--output", default="-", help="JSON output file ('-' for stdout, default)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="cohort sizes")
+    parser.add_argument("--panels", nargs="+", default=list(DEFAULT_PANELS), help="panels (full, optimized, core)")
+    parser.add_argument("--max-scalar-rows", type=int, default=MAX_SCALAR_ROWS,
+                        help="patients timed per scalar case (default %(default)s)")
+    parser.add_argument("--workers", type=int, help="processes for score_parallel (default: CPU count)")
+    parser.add_argument("--target-seconds", type=float, default=TARGET_SECONDS, help="time budget per batch case")
+    parser.add_argument("--compare", help="baseline JSON from a previous run; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ops/sec drop vs baseline (default 0.2)")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    results = run_benchmarks(args.sizes, args.panels, args.max_scalar_rows, args.workers, args.target_seconds, log)
+    report = {'environment': environment(), 'results': results}
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, panel, n, before, after in regressions:
+            log(f"REGRESSION {name} [{panel}, n={n:,}]: {before:,.0f} -> {after:,.0f} rows/s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,13 +9,14 @@ from biomarkers_data import (
     METABOLIC_MARKERS, ORGAN_MARKERS, CATEGORY_COUNTS,
     ALL_BIOMARKERS,
 )
+from panels import PANELS, PROVISIONAL_PANEL_NOTE
 
 def get_biomarker_inputs(panel_markers=None):
     """
     Collect biomarker inputs from user.
 
     Args:
-        panel_markers: If a list of biomarker keys (e.g. Core 15), only those
+        panel_markers: If a list of biomarker keys (e.g. Core 15, Optimized 25), only those
             inputs are shown; others are set to 0. If None, all 47 are shown.
 
     Returns:
@@ -26,10 +27,14 @@ def get_biomarker_inputs(panel_markers=None):
     # Get existing values from session state if available
     existing_values = st.session_state.get('biomarkers', {})
 
-    # Core Panel only: show 15 inputs, return full dict with rest 0
+    # Reduced panel (Core / Optimized): show panel inputs only, return full dict with rest 0
     if panel_markers is not None and len(panel_markers) > 0:
-        st.subheader("Core Panel (15 biomarkers)")
-        st.caption("Top 15 by selection frequency. All 37 parameters still calculated.")
+        label = next(
+            (panel['label'] for panel in PANELS.values() if list(panel['markers']) == list(panel_markers)),
+            f"Custom Panel ({len(panel_markers)} biomarkers)",
+        )
+        st.subheader(label)
+        st.caption("Panel biomarkers only. All 37 parameters still calculated.")
         biomarkers = {k: 0.0 for k in ALL_BIOMARKERS}
         cols = st.columns(2)
         for idx, key in enumerate(panel_markers):
@@ -219,36 +224,28 @@ def display_panel_selection():
     Display testing panel options in the sidebar and return selection details.
 
     Returns:
-        (core_markers, panel_r2) — core_markers is list for Core Panel or None; panel_r2 is R² from Chapter 4 validation.
+        (core_markers, panel_r2) — core_markers is the marker list for the Core or Optimized
+        Panel (see panels.PANELS) or None for the Full panel; panel_r2 is R² from Chapter 4 validation.
     """
     st.sidebar.subheader("Testing Panel Options")
+    labels = {panel['label']: name for name, panel in PANELS.items()}
     panel_option = st.sidebar.selectbox(
         "Select Testing Strategy:",
-        [
-            "Full Panel (47 biomarkers)",
-            "Optimized Panel (25 biomarkers)",
-            "Core Panel (15 biomarkers)",
-        ],
+        list(labels),
         help="Choose by clinical need; all 37 parameters formulae."
     )
+    panel_name = labels[panel_option]
+    st.session_state.panel_name = panel_name
+    panel = PANELS[panel_name]
 
-    if panel_option == "Core Panel (15 biomarkers)":
-        st.sidebar.caption("Core Panel (15 biomarkers). Use case: routine screening, basic treatment selection.")
-        # Top 15 by selection frequency (Chapter 4 feature selection)
-        core_markers = [
-            'ca153', 'cd8', 'pik3ca', 'albumin', 'cea', 'cd4',
-            'esr1_protein', 'il10', 'glucose', 'her2_mutations',
-            'tk1', 'nk', 'lactate', 'mdr1', 'ifn_gamma',
-        ]
-        return core_markers, 0.87
+    if panel_name == 'full':
+        st.sidebar.caption(f"{panel['label']}. Use case: {panel['use_case']}. R² = {panel['r2']} per Chapter 4.")
+        return None, panel['r2']
 
-    elif panel_option == "Optimized Panel (25 biomarkers)":
-        st.sidebar.caption("Optimized Panel (25 biomarkers). Use case: treatment planning, resistance monitoring.")
-        return None, 0.93
-
-    else:
-        st.sidebar.caption("Full Panel (47 biomarkers). Use case: complex cases, research protocols. R² = 0.996 per Chapter 4.")
-        return None, 0.996
+    st.sidebar.caption(f"{panel['label']}. Use case: {panel['use_case']}.")
+    if panel['provisional']:
+        st.sidebar.warning(PROVISIONAL_PANEL_NOTE.format(r2=panel['r2']))
+    return list(panel['markers']), panel['r2']
 
 
 def validate_biomarker_inputs(biomarkers):
@@ -314,6 +314,10 @@ ALL_BIOMARKERS = {
     **ORGAN_MARKERS
 }
 
+# Fixed column order for array-backed cohorts (ALL_BIOMARKERS insertion order)
+BIOMARKER_KEYS = tuple(ALL_BIOMARKERS)
+BIOMARKER_INDEX = {key: idx for idx, key in enumerate(BIOMARKER_KEYS)}
+
 # Verify count
 TOTAL_BIOMARKERS = len(ALL_BIOMARKERS)
 assert TOTAL_BIOMARKERS == 47, f"Expected 47 biomarkers, found {TOTAL_BIOMARKERS}"
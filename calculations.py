@@ -8,52 +8,22 @@ to reference (normal) values.
 import numpy as np
 from biomarkers_data import ALL_BIOMARKERS
 
-# Core panel (15 biomarkers): ca153, cd8, pik3ca, albumin, cea, cd4, esr1_protein, il10,
-# glucose, her2_mutations, tk1, nk, lactate, mdr1, ifn_gamma.
-# Mapping of each parameter to Core-panel relevance (formula inputs from Core vs imputed):
-# - "core_driven": main formula inputs come from Core biomarkers.
-# - "partly_core": some inputs from Core, some imputed.
-# - "imputed_only": all formula inputs are from imputed biomarkers (e.g. organs, VEGF, f_metastatic).
-CORE_PANEL_PARAMETER_COVERAGE = {
-    'lambda1': 'core_driven',   # s_prolif: tk1, glucose, lactate (3/4 Core)
-    'lambda2': 'partly_core',   # lambda1 + f_resist1 (pik3ca Core)
-    'lambdaR1': 'partly_core',  # lambda1 + f_resist1
-    'lambdaR2': 'partly_core',  # lambda1 + f_resist2 (her2_mutations, mdr1 Core)
-    'K': 'partly_core',         # s_tumor (ca153, cea Core)
-    'beta1': 'core_driven',    # s_immune (all 4 Core), s_suppress (il10 Core)
-    'beta2': 'partly_core',    # s_suppress (il10 Core)
-    'phi1': 'core_driven',     # s_activation (ifn_gamma, cd4 Core)
-    'phi2': 'partly_core',     # s_tumor (ca153, cea Core)
-    'phi3': 'core_driven',     # il10 (Core)
-    'deltaI': 'core_driven',   # s_stress (glucose, lactate Core)
-    'omegaR1': 'partly_core',  # s_genetic (pik3ca), s_stress (glucose, lactate)
-    'omegaR2': 'partly_core',
-    'etaE': 'partly_core',     # esr1_protein (Core); esr1_mutations, organs imputed
-    'etaC': 'partly_core',     # albumin, glucose (Core); organs imputed
-    'etaH': 'partly_core',     # her2_mutations (Core); her2_circ, organs imputed
-    'etaI': 'core_driven',     # cd8, cd4, ifn_gamma, il10, albumin, glucose (Core); pdl1 imputed
-    'kel': 'imputed_only',     # organs only (creatinine, bun, alt, ast, bilirubin)
-    'k_metabolism': 'imputed_only',
-    'k_clearance': 'imputed_only',
-    'alphaA': 'imputed_only',  # VEGF, Ang-2
-    'deltaA': 'imputed_only',  # organs
-    'kappaQ': 'core_driven',   # s_quiescence (glucose, lactate Core)
-    'lambdaQ': 'core_driven',
-    'kappaS': 'core_driven',   # s_stress (glucose, lactate Core)
-    'deltaS': 'core_driven',   # s_immune (all Core)
-    'gamma': 'imputed_only',   # f_metastatic (CTC, miR-200, exosomes)
-    'deltaP': 'core_driven',   # s_immune (Core)
-    'mu': 'partly_core',       # s_genetic (pik3ca), s_stress
-    'nu': 'partly_core',
-    'deltaG': 'partly_core',   # G (pik3ca), BRCA imputed
-    'kappaM': 'partly_core',   # s_metabolic (glucose, lactate Core)
-    'deltaM': 'partly_core',
-    'kappaH': 'partly_core',   # s_tumor (ca153, cea Core)
-    'deltaH': 'imputed_only',  # organs
-    'rho1': 'core_driven',     # s_immune (Core)
-    'rho2': 'partly_core',     # f_resist2 (her2_mutations, mdr1 Core)
-    'G': 'partly_core',        # pik3ca (Core); ctDNA, TP53 imputed
-}
+# Panel definitions (Full / Optimized / Core), their imputation templates and the
+# per-parameter coverage classes (core_driven / partly_core / imputed_only) live in
+# panels.py; coverage is derived from the formula dependencies in this module.
+
+# The 37 model parameters in Chapter 4 order. G and α_acid are reported alongside
+# them in calculate_all_parameters but are not counted among the 37.
+PARAMETER_NAMES = (
+    'lambda1', 'lambda2', 'lambdaR1', 'lambdaR2', 'K',
+    'beta1', 'beta2', 'phi1', 'phi2', 'phi3', 'deltaI',
+    'omegaR1', 'omegaR2',
+    'etaE', 'etaC', 'etaH', 'etaI',
+    'kel', 'k_metabolism', 'k_clearance',
+    'alphaA', 'deltaA', 'kappaQ', 'lambdaQ', 'kappaS', 'deltaS', 'gamma', 'deltaP',
+    'mu', 'nu', 'deltaG', 'kappaM', 'deltaM', 'kappaH', 'deltaH',
+    'rho1', 'rho2',
+)
 
 # Reference values for imputation when using Core (or Optimized) panel.
 # Missing biomarkers are set to these mid-normal / formula-safe values so that
@@ -77,24 +47,31 @@ def get_biomarkers_for_calculation(biomarkers, core_markers=None):
     """
     Return the biomarker dict to use for parameter calculation.
 
-    When core_markers is provided (e.g. Core Panel 15), only those keys are taken
-    from the user input; all other biomarkers are set to reference values.
+    When core_markers is provided (e.g. Core Panel 15 or Optimized 25), only those
+    keys are taken from the user input; all other biomarkers are set to reference values.
     When core_markers is None (Full panel), user-provided values are used where
     present; any missing key is imputed to reference (normal) values 
     ("imputation of missing values with the median value that is specific to the
     category"). This avoids zeros that would distort composite scores and formulae.
+    The reference fill per panel is precompiled once (see panels.panel_template).
     """
+    from panels import panel_template
+
+    template = panel_template(core_markers)
+    values = dict(template.reference)
+    if hasattr(biomarkers, 'to_dict'):
+        biomarkers = biomarkers.to_dict()  # records.BiomarkerVector: present entries only
     if core_markers is None or len(core_markers) == 0:
         # Full panel: impute missing biomarkers to reference values (no zeros)
-        return {
-            k: biomarkers.get(k, REFERENCE_VALUES_FOR_IMPUTATION.get(k, 0.0))
-            for k in ALL_BIOMARKERS
-        }
-    # Core (or Optimized) panel: only core keys from user; rest to reference
-    return {
-        k: biomarkers.get(k, REFERENCE_VALUES_FOR_IMPUTATION.get(k, 0.0))
-        for k in ALL_BIOMARKERS
-    }
+        values.update(biomarkers)
+        if len(values) != len(ALL_BIOMARKERS):
+            values = {k: values[k] for k in ALL_BIOMARKERS}
+        return values
+    # Core (or Optimized) panel: only panel keys from user; rest to reference
+    for k in template.markers:
+        if k in biomarkers:
+            values[k] = biomarkers[k]
+    return values
 
 
 def calculate_composite_scores(biomarkers):
@@ -224,14 +201,17 @@ def calculate_all_parameters(biomarkers, core_markers=None):
     """
     Calculate all 37 parameters formulas.
 
-    When core_markers is provided (Core Panel), only those biomarkers are taken
-    from the user; all others are imputed to reference values so formulas remain
-    well-defined and stable (see get_biomarkers_for_calculation).
+    When core_markers is provided (Core or Optimized Panel), only those biomarkers
+    are taken from the user; all others are imputed to reference values so formulas
+    remain well-defined and stable (see get_biomarkers_for_calculation).
 
     Returns:
-        dict with 'parameters', 'scores', 'organs', 'constraint_violations',
+        dict with 'parameters' (plain dict; wrap it with records.ParameterSet.from_mapping
+        for the compact array-backed form), 'scores', 'organs', 'constraint_violations',
         and optionally 'imputed_core_panel': True when Core panel imputation was used.
     """
+    from panels import parameter_coverage
+
     biomarkers_use = get_biomarkers_for_calculation(biomarkers, core_markers)
     imputed = core_markers is not None and len(core_markers) > 0
 
@@ -427,39 +407,29 @@ def calculate_all_parameters(biomarkers, core_markers=None):
     }
     if imputed:
         out['imputed_core_panel'] = True
-        out['parameter_coverage'] = dict(CORE_PANEL_PARAMETER_COVERAGE)  # core_driven / partly_core / imputed_only
+        out['parameter_coverage'] = parameter_coverage(core_markers)  # core_driven / partly_core / imputed_only
     return out
 
 
-def assess_mathematical_stability(parameters):
+def assess_mathematical_stability(parameters, controls=None):
     """
-    Assess approximate mathematical stability of the model for a given parameter set.
+    Assess mathematical stability of the 15-dimensional ODE model for a given parameter set.
+
+    Finds the non-negative equilibria (multi-start Newton) and classifies the
+    eigenvalues of the analytic Jacobian at the most stable one (see
+    stability.analyze_stability): STABLE if all Re λ < -1e-6, UNSTABLE if any
+    Re λ > 1e-6 (or no equilibrium is found), MARGINAL if the largest Re λ is
+    within ±1e-6 of zero.
 
-    This is a heuristic summary based on growth, immune, and carrying capacity relationships,
-    inspired by the 15-dimensional ODE stability analysis (46.7% stability in synthetic cohort).
+    Args:
+        parameters: the calculate_all_parameters 'parameters' (37 parameters + alpha_acid).
+        controls: optional constant treatment (u_E, u_C, u_H, u_I, dose_rate); default untreated.
 
     Returns:
         (stability_status, message)
         stability_status: 'STABLE', 'MARGINAL', or 'UNSTABLE'
         message: human-readable summary
     """
-    lambda1 = parameters['lambda1']
-    lambda2 = parameters['lambda2']
-    beta1 = parameters['beta1']
-    phi1 = parameters['phi1']
-    K = parameters['K']
-
-    # Simple heuristic checks
-    growth_stability = lambda1 > lambda2  # sensitive growth > partially resistant growth
-    immune_stability = beta1 * 1000 > lambda1  # effective immune killing vs growth
-    capacity_stability = K > 1000  # carrying capacity above minimal threshold
-
-    stability_score = sum([growth_stability, immune_stability, capacity_stability]) / 3
-
-    if stability_score >= 0.67:
-        return "STABLE", "✅ Mathematical stability confirmed - reliable predictions expected"
-    elif stability_score >= 0.33:
-        return "MARGINAL", "⚠️ Marginal stability - monitor predictions carefully"
-    else:
-        return "UNSTABLE", "❌ Mathematical instability - recommend frequent monitoring"
+    from stability import analyze_stability, stability_message
+    return stability_message(analyze_stability(parameters, controls))
 
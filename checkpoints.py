@@ -0,0 +1,97 @@
+"""
+Checkpoints Module
+Saved solver state for restarting long simulations part-way.
+
+simulate_patient(..., checkpoints=[120.0]) and simulate_fractional(...,
+checkpoints=[...]) return result['checkpoints'], a mapping time -> Checkpoint,
+and resume=checkpoint continues a run from one of them:
+
+    base = simulate_patient(p, schedule=standard, checkpoints=[120.0])
+    chemo = simulate_patient(p, schedule=standard_then_chemo, resume=base['checkpoints'][120.0])
+
+The resumed run integrates only [120, tf]; what-if branches that share the
+first 120 days therefore reuse them instead of re-integrating from t = 0. A
+checkpoint holds everything the solver carries forward:
+
+    y          the state at t, before any dosing event at t (the resumed
+               schedule gives the bolus there, so a branch may change it)
+    h          the RK45 step size reached (the next piece's first step)
+    observer   the reducers fed so far (outcomes.ReducerSet), so
+               'reductions' of a resumed run cover the whole run from t0
+    events     event crossings recorded so far (merged into the resumed
+               run's 'events' for events of the same name)
+    history    the Caputo memory of simulate_fractional (the sum-of-exponentials
+               modes or the full history) and base, y(0) plus the boluses given
+
+Schedules are functions of absolute time, so the schedule position is t
+itself: the resumed run is split at the new schedule's dosing events from t on.
+A run is split at its checkpoint times as at a dosing event, so resuming with
+the same schedule reproduces the checkpointed run from t exactly. A Checkpoint
+is never modified by resuming from it; any number of branches may share it.
+"""
+
+import copy
+
+import numpy as np
+
+
+class Checkpoint:
+    """
+    Solver state of a run at time t (see the module docstring).
+
+    Args:
+        t: checkpoint time.
+        y: (15,) state at t before any dosing event at t.
+        h: RK45 step size to restart with (None: the solver picks one).
+        observer: outcomes.ReducerSet fed up to t, or None (copied).
+        events: name -> {'t', 'y'} crossings up to t.
+        alpha: fractional order of the run (1.0: simulate_patient).
+        history: Caputo memory of simulate_fractional, or None (copied).
+        base: y(0) plus the boluses given before t (simulate_fractional).
+    """
+
+    def __init__(self, t, y, h=None, observer=None, events=None, alpha=1.0, history=None, base=None):
+        self.t = float(t)
+        self.y = np.array(y, dtype=float)
+        self.h = h
+        self.observer = observer.copy() if observer is not None else None
+        self.events = events or {}
+        self.alpha = float(alpha)
+        self.history = copy.deepcopy(history)
+        self.base = None if base is None else np.array(base, dtype=float)
+
+    def reducer_state(self):
+        """A copy of the reducers fed up to t (None without reducers)."""
+        return self.observer.copy() if self.observer is not None else None
+
+    def memory(self):
+        """A copy of the Caputo memory at t."""
+        return copy.deepcopy(self.history)
+
+    def event_results(self, names):
+        """Crossings up to t of the named events (none for events the run did not have)."""
+        empty = {'t': np.empty(0), 'y': np.empty((0, len(self.y)))}
+        return {name: self.events.get(name, empty) for name in names}
+
+    def __repr__(self):
+        kind = "integer order" if self.alpha == 1.0 else f"alpha={self.alpha:g}"
+        return f"Checkpoint(t={self.t:g}, {kind})"
+
+
+def checkpoint_times(times, t0, tf):
+    """Sorted checkpoint times; each must lie in (t0, tf]."""
+    times = sorted({float(t) for t in times})
+    if times and (times[0] <= t0 or times[-1] > tf):
+        raise ValueError(f"checkpoints must lie in ({t0:g}, {tf:g}], got {times}")
+    return times
+
+
+def split_pieces(pieces, times):
+    """(start, end, schedule, bolus) pieces also split at the given times (no bolus at the new cuts)."""
+    split = []
+    for a, b, schedule, amount in pieces:
+        for t in [t for t in times if a < t < b]:
+            split.append((a, t, schedule, amount))
+            a, amount = t, 0.0
+        split.append((a, b, schedule, amount))
+    return split
@@ -0,0 +1,316 @@
+"""
+Formula Dependency Graph Module
+Biomarker → composite score → parameter dependency index built from the Chapter 4
+formulas in calculations.py, and an incremental evaluator that recomputes only the
+scores, organ factors and parameters affected by changed biomarkers.
+
+The index is derived by reading the source of calculate_composite_scores,
+calculate_organ_functions and calculate_all_parameters, so it follows the formulas
+automatically when they are edited; a statement the reader cannot track (else/elif,
+augmented assignment, loops, side-effect calls) raises ValueError when the index is
+built instead of being skipped. Nodes are (kind, name) tuples with kind one of
+'biomarker', 'score', 'organ', 'parameter'.
+"""
+
+import ast
+from functools import lru_cache
+from pathlib import Path
+
+from calculations import get_biomarkers_for_calculation
+
+CALCULATIONS_SOURCE = Path(__file__).parent / "calculations.py"
+
+# Dicts read or written inside each formula function and the node kind they hold
+_FORMULA_FUNCTIONS = {
+    'calculate_composite_scores': {'biomarkers': 'biomarker', 'scores': 'score'},
+    'calculate_organ_functions': {'biomarkers': 'biomarker'},
+    'calculate_all_parameters': {
+        'biomarkers': 'biomarker',
+        'biomarkers_use': 'biomarker',
+        'scores': 'score',
+        'organs': 'organ',
+        'parameters': 'parameter',
+    },
+}
+_RECOMPUTE_ARGS = ('biomarkers', 'biomarkers_use', 'scores', 'organs', 'parameters', 'constraint_violations')
+_OUTPUT_CONTAINER = {'score': 'scores', 'organ': 'organs', 'parameter': 'parameters'}
+
+
+def _container_key(expr, containers):
+    """Return the node for d['key'] / d.get('key', ...) on a formula dict, else None."""
+    if (isinstance(expr, ast.Subscript) and isinstance(expr.value, ast.Name)
+            and expr.value.id in containers and isinstance(expr.slice, ast.Constant)):
+        return (containers[expr.value.id], expr.slice.value)
+    if (isinstance(expr, ast.Call) and isinstance(expr.func, ast.Attribute) and expr.func.attr == 'get'
+            and isinstance(expr.func.value, ast.Name) and expr.func.value.id in containers
+            and expr.args and isinstance(expr.args[0], ast.Constant)):
+        return (containers[expr.func.value.id], expr.args[0].value)
+    return None
+
+
+class _FunctionReader:
+    """Collects per-node inputs and the statements needed to recompute each node."""
+
+    def __init__(self, containers):
+        self.containers = containers
+        self.locals = {}    # local name -> (input nodes, statements that define it)
+        self.formulas = {}  # node -> {'inputs', 'statements', 'messages'}
+
+    def reads(self, expr):
+        inputs, statements = set(), set()
+        for sub in ast.walk(expr):
+            node = _container_key(sub, self.containers)
+            if node is not None:
+                inputs.add(node)
+            elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load) and sub.id in self.locals:
+                local_inputs, local_statements = self.locals[sub.id]
+                inputs |= local_inputs
+                statements |= local_statements
+        return inputs, statements
+
+    def assign(self, target, inputs, statements, stmt, guard):
+        if isinstance(target, ast.Tuple):
+            for element in target.elts:
+                self.assign(element, inputs, statements, stmt, guard)
+            return
+        if isinstance(target, ast.Name):
+            if target.id not in self.containers:
+                self.locals[target.id] = (inputs, statements | {stmt})
+            return
+        node = _container_key(target, self.containers)
+        if node is None:
+            return  # e.g. out['imputed_core_panel']: bookkeeping, not a formula
+        if guard is None:
+            self.formulas[node] = {'inputs': set(inputs), 'statements': statements | {stmt}, 'messages': []}
+            return
+        # Conditional correction (λ-ordering): keep the formula, add the check and its message
+        guard_stmt, guard_inputs, guard_statements = guard
+        formula = self.formulas[node]
+        formula['inputs'] |= (inputs | guard_inputs) - {node}
+        formula['statements'] |= statements | guard_statements | {guard_stmt}
+        formula['messages'].extend(
+            sub.args[0].value for sub in ast.walk(guard_stmt)
+            if isinstance(sub, ast.Call) and isinstance(sub.func, ast.Attribute) and sub.func.attr == 'append'
+            and sub.args and isinstance(sub.args[0], ast.Constant)
+        )
+
+    def walk(self, body, guard=None):
+        for stmt in body:
+            if isinstance(stmt, ast.Assign):
+                inputs, statements = self.reads(stmt.value)
+                for target in stmt.targets:
+                    self.assign(target, inputs, statements, guard[0] if guard else stmt, guard)
+            elif isinstance(stmt, ast.If) and not stmt.orelse:
+                inputs, statements = self.reads(stmt.test)
+                self.walk(stmt.body, (guard[0] if guard else stmt, inputs, statements))
+            elif isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Dict):
+                # calculate_organ_functions returns {'f_liver': f_liver, ...}
+                for key, value in zip(stmt.value.keys, stmt.value.values):
+                    assign = ast.Assign(
+                        targets=[ast.Subscript(value=ast.Name(id='organs', ctx=ast.Load()),
+                                               slice=ast.Constant(value=key.value), ctx=ast.Store())],
+                        value=value,
+                    )
+                    ast.copy_location(assign, value)
+                    inputs, statements = self.reads(value)
+                    self.formulas[('organ', key.value)] = {
+                        'inputs': inputs, 'statements': statements | {assign}, 'messages': [],
+                    }
+            elif self.ignorable(stmt, guard):
+                continue
+            else:
+                # Anything else (else/elif, augmented assignment, loops, side-effect calls)
+                # could change a formula without the index noticing; refuse to build it.
+                raise ValueError(
+                    f"{CALCULATIONS_SOURCE.name}:{stmt.lineno}: unsupported {type(stmt).__name__} "
+                    f"statement in a formula function; dependency_graph cannot track its effects"
+                )
+
+    @staticmethod
+    def ignorable(stmt, guard):
+        """Statements with no effect on formula values: docstrings, imports, returns, violation messages."""
+        if isinstance(stmt, (ast.Import, ast.ImportFrom, ast.Pass)):
+            return True
+        if isinstance(stmt, ast.Return):
+            return stmt.value is None or isinstance(stmt.value, ast.Name)
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+            return True
+        # constraint_violations.append("...") inside a λ-ordering check (part of the guard statement)
+        return (guard is not None and isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)
+                and isinstance(stmt.value.func, ast.Attribute) and stmt.value.func.attr == 'append'
+                and isinstance(stmt.value.func.value, ast.Name)
+                and stmt.value.func.value.id == 'constraint_violations')
+
+
+@lru_cache(maxsize=1)
+def _formula_graph():
+    """Parse calculations.py once and compile a small program per score/organ/parameter."""
+    tree = ast.parse(CALCULATIONS_SOURCE.read_text(encoding="utf-8"))
+    functions = {f.name: f for f in tree.body if isinstance(f, ast.FunctionDef)}
+
+    graph = {}
+    for function_name, containers in _FORMULA_FUNCTIONS.items():
+        reader = _FunctionReader(containers)
+        reader.walk(functions[function_name].body)
+        for node, formula in reader.formulas.items():
+            statements = sorted(formula['statements'], key=lambda s: (s.lineno, s.col_offset))
+            graph[node] = {
+                'inputs': frozenset(formula['inputs']),
+                'recompute': _compile_formula(node, statements),
+                'messages': tuple(formula['messages']),
+                'order': len(graph),
+            }
+    return graph
+
+
+def _compile_formula(node, statements):
+    """
+    Wrap the statements computing one node in a function
+    f(biomarkers, biomarkers_use, scores, organs, parameters, constraint_violations)
+    that writes the node's value into the matching dict.
+    """
+    name = f"_recompute_{node[0]}_{node[1]}"
+    arguments = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg(arg=a) for a in _RECOMPUTE_ARGS],
+        kwonlyargs=[], kw_defaults=[], defaults=[],
+    )
+    function = ast.FunctionDef(name=name, args=arguments, body=statements, decorator_list=[], returns=None)
+    if hasattr(ast.FunctionDef, 'type_params'):
+        function.type_params = []
+    module = ast.fix_missing_locations(ast.Module(body=[function], type_ignores=[]))
+    namespace = {}
+    exec(compile(module, str(CALCULATIONS_SOURCE), 'exec'), namespace)
+    return namespace[name]
+
+
+def formula_inputs():
+    """Direct inputs of every score, organ factor and parameter: {node: frozenset(nodes)}."""
+    return {node: formula['inputs'] for node, formula in _formula_graph().items()}
+
+
+@lru_cache(maxsize=None)
+def biomarker_inputs(node):
+    """All biomarker keys a score/organ/parameter node depends on, directly or through other nodes."""
+    graph = _formula_graph()
+    keys = set()
+    for kind, name in graph[node]['inputs']:
+        if kind == 'biomarker':
+            keys.add(name)
+        else:
+            keys |= biomarker_inputs((kind, name))
+    return frozenset(keys)
+
+
+@lru_cache(maxsize=1)
+def dependency_index():
+    """
+    Biomarker → downstream index.
+    Returns {biomarker_key: {'scores': [...], 'organs': [...], 'parameters': [...]}}.
+    """
+    from biomarkers_data import ALL_BIOMARKERS
+
+    index = {key: {'scores': [], 'organs': [], 'parameters': []} for key in ALL_BIOMARKERS}
+    for node in sorted(_formula_graph(), key=lambda n: _formula_graph()[n]['order']):
+        for key in biomarker_inputs(node):
+            index[key][_OUTPUT_CONTAINER[node[0]]].append(node[1])
+    return index
+
+
+@lru_cache(maxsize=1)
+def _downstream_nodes():
+    """Biomarker key -> nodes depending on it, plus the λ-ordering messages in check order."""
+    graph = _formula_graph()
+    ordered = sorted(graph, key=lambda n: graph[n]['order'])
+    downstream = {}
+    for node in ordered:
+        for key in biomarker_inputs(node):
+            downstream.setdefault(key, []).append(node)
+    messages = tuple(m for node in ordered for m in graph[node]['messages'])
+    return downstream, messages
+
+
+def affected_nodes(changed_biomarkers):
+    """Score/organ/parameter nodes that must be recomputed, in evaluation order."""
+    downstream, _ = _downstream_nodes()
+    graph = _formula_graph()
+    nodes = {node for key in changed_biomarkers for node in downstream.get(key, ())}
+    return sorted(nodes, key=lambda n: graph[n]['order'])
+
+
+@lru_cache(maxsize=256)
+def upstream_nodes(targets):
+    """
+    Score/organ/parameter nodes needed to evaluate the target nodes (a tuple),
+    including the targets themselves, in evaluation order.
+    """
+    graph = _formula_graph()
+    needed, stack = set(), list(targets)
+    while stack:
+        node = stack.pop()
+        if node in needed:
+            continue
+        needed.add(node)
+        stack.extend(n for n in graph[node]['inputs'] if n[0] != 'biomarker')
+    return tuple(sorted(needed, key=lambda n: graph[n]['order']))
+
+
+def evaluate_nodes(nodes, biomarkers_use):
+    """
+    Run the compiled formulas for nodes (in evaluation order, e.g. from
+    upstream_nodes) on an imputed biomarker dict.
+    Returns (scores, organs, parameters, constraint_violations) holding only what was evaluated.
+    """
+    graph = _formula_graph()
+    scores, organs, parameters, violations = {}, {}, {}, []
+    for node in nodes:
+        graph[node]['recompute'](biomarkers_use, biomarkers_use, scores, organs, parameters, violations)
+    return scores, organs, parameters, violations
+
+
+def recalculate_incremental(previous_result, previous_biomarkers, biomarkers, core_markers=None):
+    """
+    Update a calculate_all_parameters result after biomarker edits.
+
+    Only the scores, organ factors and parameters that depend on a changed
+    (imputed) biomarker are recomputed; everything else is reused from
+    previous_result. The returned dict has the same layout as
+    calculate_all_parameters plus 'changed_parameters', the names of
+    parameters whose value actually changed.
+    """
+    old_inputs = get_biomarkers_for_calculation(previous_biomarkers, core_markers)
+    new_inputs = get_biomarkers_for_calculation(biomarkers, core_markers)
+    changed = [k for k, v in new_inputs.items() if v != old_inputs[k]]
+
+    scores = dict(previous_result['scores'])
+    organs = dict(previous_result['organs'])
+    parameters = dict(previous_result['parameters'])
+
+    graph = _formula_graph()
+    recomputed = affected_nodes(changed)
+    fired = {}
+    for node in recomputed:
+        violations = []
+        graph[node]['recompute'](new_inputs, new_inputs, scores, organs, parameters, violations)
+        for message in graph[node]['messages']:
+            fired[message] = message in violations
+
+    # Rebuild violations in check order: re-run checks report afresh, others carry over
+    previous_violations = set(previous_result.get('constraint_violations', []))
+    _, all_messages = _downstream_nodes()
+    constraint_violations = [
+        m for m in all_messages if fired.get(m, m in previous_violations)
+    ]
+
+    out = dict(previous_result)
+    out.update({
+        'parameters': parameters,
+        'scores': scores,
+        'organs': organs,
+        'constraint_violations': constraint_violations,
+        'changed_parameters': [
+            name for kind, name in recomputed
+            if kind == 'parameter' and previous_result['parameters'].get(name) != parameters[name]
+        ],
+    })
+    return out
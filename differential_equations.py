@@ -1,10 +1,13 @@
 """
 Differential Equations Module
-Displays all 15 differential equations from Chapter 4
+Displays all 15 differential equations from Chapter 4 (LaTeX generated from
+model_spec.CHAPTER4_MODEL, the specification the simulator runs)
 """
 
 import streamlit as st
 
+from model_spec import CHAPTER4_MODEL
+
 def display_differential_equations():
     """
     Display all 15 differential equations from Chapter 4
@@ -45,14 +48,7 @@ def display_differential_equations():
     **What it models:** Treatment-sensitive cancer cells that respond to therapy. Tracks growth, immune interactions, 
     treatment effects, and transitions to other cell states (quiescent, resistant, senescent).
     """)
-    st.latex(r"""
-    \frac{dN_1}{dt} = \lambda_1 N_1 \left(1 - \frac{N_{\text{total}}}{K}\right) \frac{(1 + 0.1M)}{(1 + \alpha_{\text{acid}} M)} 
-    - \frac{\beta_1 N_1 I_1}{1 + 0.01N_{\text{total}}} - \eta_{\text{treat}} N_1
-    """)
-    st.latex(r"""
-    \quad - \kappa_Q N_1(1 + 0.5H) - \omega_{R1} \eta_{\text{treat}} N_1(2 - G) 
-    - \omega_{R2} \eta_{\text{treat}} N_1(2 - G) - \kappa_S \eta_{\text{treat}} N_1(1.3 - 0.3G)
-    """)
+    st.latex(CHAPTER4_MODEL.latex('N1'))
     st.caption("""
     **Contains:** Logistic growth (λ₁, K) → Metabolic/pH modulation → Immune killing (β₁) → Treatment (η) → 
     Quiescence (κ_Q) → Resistance evolution (ω_R1, ω_R2) → Senescence (κ_S)
@@ -64,11 +60,7 @@ def display_differential_equations():
     **What it models:** Intermediate resistance phenotype with reduced sensitivity to treatment (70%) and immune killing (50%). 
     Acts as transitional state between sensitive and fully resistant cells.
     """)
-    st.latex(r"""
-    \frac{dN_2}{dt} = \lambda_2 N_2 \left(1 - \frac{N_{\text{total}}}{K}\right) \frac{(1 + 0.1M)}{(1 + \alpha_{\text{acid}} M)} 
-    - \frac{0.5\beta_1 N_2 I_1}{1 + 0.01N_{\text{total}}} - 0.7\eta_{\text{treat}} N_2 
-    - \kappa_Q N_2(1 + 0.5H)
-    """)
+    st.latex(CHAPTER4_MODEL.latex('N2'))
     st.caption("""
     **Contains:** Reduced growth (λ₂) → Reduced immune killing (0.5×β₁) → Reduced treatment (0.7×η) → Quiescence entry
     """)
@@ -79,10 +71,7 @@ def display_differential_equations():
     **What it models:** CD8+ T cells and NK cells that kill cancer cells. Includes production, tumor-induced recruitment, 
     regulatory suppression, hypoxia-enhanced death, and immunotherapy enhancement.
     """)
-    st.latex(r"""
-    \frac{dI_1}{dt} = \phi_1 + \frac{\phi_2 N_{\text{total}}}{1 + 0.01N_{\text{total}}} 
-    - \frac{\beta_2 I_1 I_2}{1 + I_1} - \delta_I I_1(1 + 0.2H) + 0.1\eta_I u_I I_1
-    """)
+    st.latex(CHAPTER4_MODEL.latex('I1'))
     st.caption("""
     **Contains:** Basal production (φ₁) → Tumor recruitment (φ₂) → Regulatory suppression (β₂) → 
     Hypoxia-enhanced death (δ_I) → Immunotherapy boost (η_I)
@@ -94,10 +83,7 @@ def display_differential_equations():
     **What it models:** Tregs and MDSCs that suppress immune responses. Recruited by tumors, die under hypoxia, 
     and are depleted by immunotherapy.
     """)
-    st.latex(r"""
-    \frac{dI_2}{dt} = \frac{\phi_3 N_{\text{total}}}{1 + 0.01N_{\text{total}}} 
-    - \delta_I I_2(1 + 0.1H) - 0.1\eta_I u_I I_2
-    """)
+    st.latex(CHAPTER4_MODEL.latex('I2'))
     st.caption("""
     **Contains:** Tumor recruitment (φ₃) → Hypoxia-enhanced death (δ_I) → Immunotherapy depletion
     """)
@@ -108,9 +94,7 @@ def display_differential_equations():
     **What it models:** Invasion capacity and circulating tumor cell seeding. Enhanced by hypoxia and metabolic 
     reprogramming, cleared by immune surveillance.
     """)
-    st.latex(r"""
-    \frac{dP}{dt} = \gamma N_{\text{total}}(1 + 0.5H)(1 + 0.3M) - \delta_P P
-    """)
+    st.latex(CHAPTER4_MODEL.latex('P'))
     st.caption("""
     **Contains:** Seeding rate (γ) → Hypoxia enhancement → Metabolic enhancement → Clearance (δ_P)
     """)
@@ -121,9 +105,7 @@ def display_differential_equations():
     **What it models:** Vascular density and angiogenic factors (VEGF, Ang-2). Induced by tumor burden and hypoxia, 
     degraded naturally. Critical for tumor growth and oxygen supply.
     """)
-    st.latex(r"""
-    \frac{dA}{dt} = \frac{\alpha_A N_{\text{total}}(1 + H)}{1 + 0.01N_{\text{total}}} - \delta_A A
-    """)
+    st.latex(CHAPTER4_MODEL.latex('A'))
     st.caption("""
     **Contains:** Induction (α_A) → Hypoxia enhancement → Saturation kinetics → Degradation (δ_A)
     """)
@@ -134,9 +116,7 @@ def display_differential_equations():
     **What it models:** Dormant cancer cells that stop dividing. Enter quiescence under stress/hypoxia, 
     exit when conditions improve (angiogenesis). Treatment-resistant due to low metabolic activity.
     """)
-    st.latex(r"""
-    \frac{dQ}{dt} = \kappa_Q(N_1 + N_2)(1 + 0.5H) - \frac{\lambda_Q Q(1 + 0.2A)}{1 + 0.5H}
-    """)
+    st.latex(CHAPTER4_MODEL.latex('Q'))
     st.caption("""
     **Contains:** Entry rate (κ_Q) → Hypoxia enhancement → Exit rate (λ_Q) → Angiogenesis promotion → Hypoxia inhibition
     """)
@@ -147,10 +127,7 @@ def display_differential_equations():
     **What it models:** Cells resistant to hormone therapy (ESR1 mutations). Evolve from sensitive cells under 
     treatment pressure, have reduced immune sensitivity (60-90%), and grow independently of estrogen.
     """)
-    st.latex(r"""
-    \frac{dR_1}{dt} = \omega_{R1} \eta_E u_E N_1(2 - G) + \lambda_{R1} R_1 \left(1 - \frac{N_{\text{total}}}{K}\right) 
-    - \frac{\rho_1 \beta_1 R_1 I_1}{1 + 0.01N_{\text{total}}}
-    """)
+    st.latex(CHAPTER4_MODEL.latex('R1'))
     st.caption("""
     **Contains:** Evolution rate (ω_R1) → Treatment pressure → Genetic instability → Growth (λ_R1) → Reduced immune killing (ρ₁)
     """)
@@ -161,10 +138,7 @@ def display_differential_equations():
     **What it models:** Cells with broad resistance (MDR1, efflux pumps). Evolve under chemotherapy pressure, 
     have severely reduced immune sensitivity (30-60%), and slow growth due to fitness costs.
     """)
-    st.latex(r"""
-    \frac{dR_2}{dt} = \omega_{R2} \eta_C u_C N_1(2 - G) + \lambda_{R2} R_2 \left(1 - \frac{N_{\text{total}}}{K}\right) 
-    - \frac{\rho_2 \beta_1 R_2 I_1}{1 + 0.01N_{\text{total}}}
-    """)
+    st.latex(CHAPTER4_MODEL.latex('R2'))
     st.caption("""
     **Contains:** Evolution rate (ω_R2) → Chemotherapy pressure → Genetic instability → Growth (λ_R2) → Highly reduced immune killing (ρ₂)
     """)
@@ -175,9 +149,7 @@ def display_differential_equations():
     **What it models:** Permanently growth-arrested cells from treatment-induced DNA damage. More common with 
     genetic instability. Cleared by immune cells (NK, macrophages).
     """)
-    st.latex(r"""
-    \frac{dS}{dt} = \kappa_S \eta_{\text{treat}} N_1(1.3 - 0.3G) - \delta_S S
-    """)
+    st.latex(CHAPTER4_MODEL.latex('S'))
     st.caption("""
     **Contains:** Senescence induction (κ_S) → Treatment pressure → Genetic instability enhancement → Clearance (δ_S)
     """)
@@ -188,9 +160,7 @@ def display_differential_equations():
     **What it models:** Pharmacokinetics of active drug in plasma. Includes administration, renal elimination, 
     and hepatic metabolism. Derived from organ function biomarkers.
     """)
-    st.latex(r"""
-    \frac{dD}{dt} = \text{dose\_rate}(t) - k_{\text{el}} D - k_{\text{metabolism}} D
-    """)
+    st.latex(CHAPTER4_MODEL.latex('D'))
     st.caption("""
     **Contains:** Drug administration → Renal elimination (k_el) → Hepatic metabolism (k_metabolism)
     """)
@@ -201,9 +171,7 @@ def display_differential_equations():
     **What it models:** Metabolized drug products. Some metabolites retain activity or cause toxicity. 
     Cleared by renal and biliary excretion.
     """)
-    st.latex(r"""
-    \frac{dD_m}{dt} = k_{\text{metabolism}} D - k_{\text{clearance}} D_m
-    """)
+    st.latex(CHAPTER4_MODEL.latex('Dm'))
     st.caption("""
     **Contains:** Input from metabolism → Renal/biliary clearance (k_clearance)
     """)
@@ -214,9 +182,7 @@ def display_differential_equations():
     **What it models:** Genomic integrity (0-1 scale). Decreases with tumor burden and treatment-induced mutations, 
     partially restored by DNA repair. Lower stability accelerates resistance evolution.
     """)
-    st.latex(r"""
-    \frac{dG}{dt} = -\mu N_{\text{total}} - \nu \eta_{\text{treat}}(2 - G) + \delta_G(1 - G)
-    """)
+    st.latex(CHAPTER4_MODEL.latex('G'))
     st.caption("""
     **Contains:** Mutation accumulation (μ) → Treatment mutagenesis (ν) → DNA repair restoration (δ_G)
     """)
@@ -227,9 +193,7 @@ def display_differential_equations():
     **What it models:** Warburg effect and metabolic reprogramming. Enhanced by hypoxia (HIF-1α), 
     derived from glucose, lactate, LDH. Supports rapid growth and metastasis.
     """)
-    st.latex(r"""
-    \frac{dM}{dt} = \kappa_M N_{\text{total}}(1 + 0.5H) - \delta_M M
-    """)
+    st.latex(CHAPTER4_MODEL.latex('M'))
     st.caption("""
     **Contains:** Metabolic reprogramming (κ_M) → Hypoxia enhancement → Normalization (δ_M)
     """)
@@ -240,9 +204,7 @@ def display_differential_equations():
     **What it models:** Oxygen deprivation in tumors. Develops when tumor burden exceeds vascular supply (>50% capacity). 
     Reduced by angiogenesis, cleared by natural oxygenation. Enhances metastasis and metabolic reprogramming.
     """)
-    st.latex(r"""
-    \frac{dH}{dt} = \kappa_H \max\left(0, \frac{N_{\text{total}}}{K} - 0.5\right) - \alpha_A A H - \delta_H H
-    """)
+    st.latex(CHAPTER4_MODEL.latex('H'))
     st.caption("""
     **Contains:** Hypoxia induction (κ_H) → Threshold (50% capacity) → Angiogenesis reduction → Natural clearance (δ_H)
     """)
@@ -0,0 +1,205 @@
+"""
+Events Module
+Event detection for the simulators: an event is a function g(t, y, p) of the
+state and the patient's packed parameters whose sign change marks a decisive
+moment of the run. simulate_patient, simulate_cohort and simulate_fractional
+evaluate their events after every accepted step and, on a sign change, locate
+the crossing by bisection on the solver's own interpolant (the RK45 dense
+output, the implicit stages' dense output or the Caputo grid's linear
+interpolation). A terminal event stops the run at the crossing; any other event
+only records it.
+
+Built-in events (Chapter 5 thresholds):
+    extinction    N_total falls below ε_floor (terminal)
+    progression   N_total rises above a fraction of K (terminal)
+    resistance    (R₁ + R₂)/N_total rises above a threshold (recorded)
+    divergence    max |y| exceeds DIVERGENCE_LIMIT or becomes non-finite (terminal)
+
+Crossings are detected on the integrated trajectory; a jump caused by a bolus
+at a dosing event is not a crossing.
+"""
+
+import numpy as np
+
+from model_spec import TUMOR_STATES
+from simulation import DIVERGENCE_LIMIT, MODEL_PARAMETER_KEYS, STATE_INDEX, pack_parameters
+
+# Smallest population Chapter 5 keeps in any compartment (outcomes.EPSILON_FLOOR)
+EXTINCTION_THRESHOLD = 1e-6
+PROGRESSION_FRACTION = 0.9
+RESISTANCE_THRESHOLD = 0.5
+# Bisection stops when the bracket is below this fraction of |t| (or of 1 day)
+ROOT_TOLERANCE = 1e-12
+MAX_BISECTIONS = 100
+
+_TUMOR = [STATE_INDEX[name] for name in TUMOR_STATES]
+_K = MODEL_PARAMETER_KEYS.index('K')
+
+
+class Event:
+    """
+    A named event function.
+
+    Args:
+        name: key of the event in the results.
+        function: g(t, y, p) with y (..., 15) states and p (..., 38) packed
+            parameters (matching rows), returning (...) values.
+        terminal: stop the run at the first crossing.
+        direction: +1 only rising crossings (g from < 0 to >= 0), -1 only
+            falling ones, 0 both.
+    """
+
+    def __init__(self, name, function, terminal=False, direction=0):
+        if direction not in (-1, 0, 1):
+            raise ValueError("direction must be -1, 0 or +1")
+        self.name = name
+        self.function = function
+        self.terminal = bool(terminal)
+        self.direction = direction
+
+    def bind(self, parameters):
+        """The event for one patient or a cohort: g(t, y) or g(t, y, rows)."""
+        return _BoundEvent(self, pack_parameters(parameters))
+
+    def __repr__(self):
+        kind = 'terminal' if self.terminal else 'recorded'
+        return f"Event({self.name!r}, {kind}, direction={self.direction:+d})"
+
+
+class _BoundEvent:
+    def __init__(self, event, p):
+        self.name, self.terminal, self.direction = event.name, event.terminal, event.direction
+        self.function = event.function
+        self.p = p
+
+    def __call__(self, t, y, rows=None):
+        p = self.p if rows is None else self.p[rows]
+        return np.asarray(self.function(t, y, p), dtype=float)
+
+
+def bind_events(events, parameters):
+    """Bound events for the integrators (empty list without events)."""
+    if not events:
+        return []
+    names = [event.name for event in events]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Event names must be unique, got {names}")
+    return [event.bind(parameters) for event in events]
+
+
+def _tumor(y):
+    return y[..., _TUMOR].sum(axis=-1)
+
+
+def extinction(threshold=EXTINCTION_THRESHOLD, terminal=True):
+    """N_total falls below threshold."""
+    return Event('extinction', lambda t, y, p: _tumor(y) - threshold, terminal, direction=-1)
+
+
+def progression(fraction=PROGRESSION_FRACTION, terminal=True):
+    """N_total rises above fraction × K."""
+    return Event('progression', lambda t, y, p: _tumor(y) - fraction * p[..., _K], terminal, direction=1)
+
+
+def resistance(threshold=RESISTANCE_THRESHOLD, terminal=False):
+    """Resistant fraction (R₁ + R₂)/N_total rises above threshold."""
+    def g(t, y, p):
+        resistant = y[..., STATE_INDEX['R1']] + y[..., STATE_INDEX['R2']]
+        return resistant / np.maximum(_tumor(y), EXTINCTION_THRESHOLD) - threshold
+    return Event('resistance', g, terminal, direction=1)
+
+
+def divergence(limit=DIVERGENCE_LIMIT, terminal=True):
+    """max |y| exceeds limit, or the state becomes non-finite."""
+    def g(t, y, p):
+        size = np.abs(y).max(axis=-1)
+        return np.where(np.isfinite(size), size, np.inf) - limit
+    return Event('divergence', g, terminal, direction=1)
+
+
+def crossed(direction, g_old, g_new):
+    """Sign changes of g between consecutive points that match direction."""
+    rising = (g_old < 0) & (g_new >= 0)
+    falling = (g_old > 0) & (g_new <= 0)
+    if direction > 0:
+        return rising
+    if direction < 0:
+        return falling
+    return rising | falling
+
+
+def locate(g, a, b, g_a, tolerance=ROOT_TOLERANCE):
+    """
+    Bisection for the crossing of g in [a, b] (elementwise for arrays): g(t)
+    is evaluated on the interpolant, g_a = g(a) and g(b) has the other sign.
+    Returns the right end of the final bracket, so the state there is already
+    past the crossing.
+    """
+    a, b, g_a = (np.array(v, dtype=float) for v in (a, b, g_a))
+    for _ in range(MAX_BISECTIONS):
+        if np.all(b - a <= tolerance * np.maximum(1.0, np.abs(b))):
+            break
+        m = 0.5 * (a + b)
+        g_m = g(m)
+        same = (np.sign(g_m) == np.sign(g_a)) & (g_m != 0)
+        a, g_a, b = np.where(same, m, a), np.where(same, g_m, g_a), np.where(same, b, m)
+    return b
+
+
+class EventMonitor:
+    """
+    Events along one trajectory. step() is called after every accepted step
+    with an interpolant t -> y on it and returns the (t, y) to stop at when a
+    terminal event crossed (None otherwise).
+    """
+
+    def __init__(self, events, t0, y0):
+        self.events = list(events)
+        self.g = np.array([event(t0, y0) for event in self.events], dtype=float)
+        self.n_states = len(y0)
+        self.times = [[] for _ in self.events]
+        self.states = [[] for _ in self.events]
+        self.terminated_by = None
+
+    def step(self, t, t_new, y_new, interpolant):
+        if not self.events:
+            return None
+        g_new = np.array([event(t_new, y_new) for event in self.events], dtype=float)
+        roots = []
+        for i, event in enumerate(self.events):
+            if crossed(event.direction, self.g[i], g_new[i]):
+                root = float(locate(lambda s, e=event: e(s, interpolant(s)), t, t_new, self.g[i]))
+                roots.append((root, i))
+        self.g = g_new
+        stop = None
+        for root, i in sorted(roots):
+            if stop is not None and root > stop[0]:
+                break
+            y_root = y_new if root == t_new else interpolant(root)
+            self.times[i].append(root)
+            self.states[i].append(y_root)
+            if self.events[i].terminal and stop is None:
+                stop = (root, y_root)
+                self.terminated_by = self.events[i].name
+        return stop
+
+    def message(self, t):
+        return f"Terminated by event '{self.terminated_by}' at t={t:.6g}."
+
+    def results(self):
+        """name -> {'t': (k,) crossing times, 'y': (k, 15) states}."""
+        return {
+            event.name: {'t': np.array(times), 'y': np.array(states).reshape(len(times), self.n_states)}
+            for event, times, states in zip(self.events, self.times, self.states)
+        }
+
+
+def merge_event_results(runs):
+    """Concatenate EventMonitor results over consecutive pieces of a run."""
+    if not runs:
+        return {}
+    return {
+        name: {'t': np.concatenate([r[name]['t'] for r in runs]),
+               'y': np.concatenate([r[name]['y'] for r in runs])}
+        for name in runs[0]
+    }
@@ -0,0 +1,255 @@
+"""
+Parameter Gradient Module
+Exact ∂parameter/∂biomarker for the Chapter 4 formulas by forward-mode
+differentiation.
+
+The vectorized formulas of batch_calculations are evaluated on dual numbers that
+carry a (N, 47) tangent next to each (N,) value, so one pass yields the full
+37 × 47 Jacobian for every patient. Values are bitwise identical to
+calculate_all_parameters_batch. Where a clamp (or any max/min) is active the
+derivative is exactly zero; at a tie the derivative of the second argument is
+used (one-sided). Biomarkers imputed outside a reduced panel are constants and
+get zero columns.
+"""
+
+import numpy as np
+
+from batch_calculations import (
+    _ORGAN_FORMULAS,
+    _PARAMETER_FORMULAS,
+    _SCORE_FORMULAS,
+    _enforce_growth_hierarchy,
+    biomarkers_to_array,
+    impute_reference_batch,
+)
+from biomarkers_data import BIOMARKER_KEYS, BIOMARKER_INDEX
+from calculations import PARAMETER_NAMES
+
+
+def _parts(x):
+    """(value, tangent) of a dual or a constant (tangent None)."""
+    if isinstance(x, _Dual):
+        return x.value, x.tangent
+    return x, None
+
+
+def _col(v):
+    """Broadcast a value array (N,) or scalar against (N, 47) tangents."""
+    return np.asarray(v)[..., np.newaxis]
+
+
+def _sum_tangents(*terms):
+    total = None
+    for t in terms:
+        if t is not None:
+            total = t if total is None else total + t
+    return total
+
+
+def _select(pick, ta, tb, like):
+    """Tangent of an elementwise choice between two operands (None = zero tangent)."""
+    if ta is None and tb is None:
+        return None
+    zero = np.zeros_like(like)
+    return np.where(_col(pick), zero if ta is None else ta, zero if tb is None else tb)
+
+
+def _add(a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    return _Dual(av + bv, _sum_tangents(at, bt))
+
+
+def _subtract(a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    return _Dual(av - bv, _sum_tangents(at, None if bt is None else -bt))
+
+
+def _multiply(a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    return _Dual(av * bv, _sum_tangents(
+        None if at is None else at * _col(bv),
+        None if bt is None else _col(av) * bt,
+    ))
+
+
+def _divide(a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    return _Dual(av / bv, _sum_tangents(
+        None if at is None else at / _col(bv),
+        None if bt is None else -_col(av / bv ** 2) * bt,
+    ))
+
+
+def _maximum(a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    value = np.maximum(av, bv)
+    tangent = at if at is not None else bt
+    return _Dual(value, None if tangent is None else _select(av > bv, at, bt, tangent))
+
+
+def _minimum(a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    value = np.minimum(av, bv)
+    tangent = at if at is not None else bt
+    return _Dual(value, None if tangent is None else _select(av < bv, at, bt, tangent))
+
+
+def _absolute(a):
+    av, at = _parts(a)
+    return _Dual(np.abs(av), None if at is None else _col(np.sign(av)) * at)
+
+
+def _negative(a):
+    av, at = _parts(a)
+    return _Dual(-av, None if at is None else -at)
+
+
+def _where(condition, a, b):
+    (av, at), (bv, bt) = _parts(a), _parts(b)
+    value = np.where(condition, av, bv)
+    tangent = at if at is not None else bt
+    return _Dual(value, None if tangent is None else _select(condition, at, bt, tangent))
+
+
+_UFUNCS = {
+    np.add: _add,
+    np.subtract: _subtract,
+    np.multiply: _multiply,
+    np.true_divide: _divide,
+    np.maximum: _maximum,
+    np.minimum: _minimum,
+    np.absolute: _absolute,
+    np.negative: _negative,
+}
+
+
+class _Dual:
+    """Value (N,) with tangent (N, 47); supports the operations used by the formulas."""
+
+    __slots__ = ('value', 'tangent')
+
+    def __init__(self, value, tangent):
+        self.value = value
+        self.tangent = tangent
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs or ufunc not in _UFUNCS:
+            return NotImplemented
+        return _UFUNCS[ufunc](*inputs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is np.where and not kwargs:
+            return _where(*args)
+        return NotImplemented
+
+    __add__ = __radd__ = lambda self, other: _add(self, other)
+    __mul__ = __rmul__ = lambda self, other: _multiply(self, other)
+    __sub__ = lambda self, other: _subtract(self, other)
+    __rsub__ = lambda self, other: _subtract(other, self)
+    __truediv__ = lambda self, other: _divide(self, other)
+    __rtruediv__ = lambda self, other: _divide(other, self)
+    __neg__ = lambda self: _negative(self)
+
+    # Comparisons act on values (λ-ordering masks)
+    __le__ = lambda self, other: self.value <= _parts(other)[0]
+    __lt__ = lambda self, other: self.value < _parts(other)[0]
+    __ge__ = lambda self, other: self.value >= _parts(other)[0]
+    __gt__ = lambda self, other: self.value > _parts(other)[0]
+
+
+class _DualColumns:
+    """Biomarker columns as duals seeded with unit tangents, e.g. b['il10']."""
+
+    __slots__ = ('_X', '_seeded')
+
+    def __init__(self, X, seeded):
+        self._X = X
+        self._seeded = seeded
+
+    def __getitem__(self, key):
+        j = BIOMARKER_INDEX[key]
+        if not self._seeded[j]:
+            return self._X[:, j]
+        tangent = np.zeros(self._X.shape)
+        tangent[:, j] = 1.0
+        return _Dual(self._X[:, j], tangent)
+
+
+def _jacobian_rows(x, n):
+    """(N, 47) tangent of a formula output (zeros when it is constant)."""
+    tangent = _parts(x)[1]
+    if tangent is None:
+        return np.zeros((n, len(BIOMARKER_KEYS)))
+    return tangent
+
+
+def parameter_jacobian_batch(data, core_markers=None):
+    """
+    Forward-mode Jacobian of all 37 parameters for a cohort.
+
+    Args:
+        data: anything accepted by calculate_all_parameters_batch (NaN = missing,
+            imputed to reference values).
+        core_markers: optional panel; biomarkers outside it are imputed constants
+            and their Jacobian columns are zero.
+
+    Returns:
+        dict with 'jacobian' (N, 37, 47), 'parameters' (N, 37), 'parameter_names'
+        and 'biomarker_names'.
+    """
+    X = biomarkers_to_array(data)
+    if core_markers:
+        from panels import apply_panel_template, panel_template
+        template = panel_template(core_markers)
+        X = apply_panel_template(X, template)
+        seeded = template.measured
+    else:
+        X = impute_reference_batch(X)
+        seeded = np.ones(len(BIOMARKER_KEYS), dtype=bool)
+    b = _DualColumns(X, seeded)
+
+    scores = {}
+    for name, formula in _SCORE_FORMULAS.items():
+        scores[name] = formula(b, scores)
+    organs = {}
+    for name, formula in _ORGAN_FORMULAS.items():
+        organs[name] = formula(b, organs)
+    parameters = {}
+    for name, formula in _PARAMETER_FORMULAS.items():
+        parameters[name] = formula(b, scores, organs, parameters)
+    _enforce_growth_hierarchy(parameters)
+
+    n = len(X)
+    return {
+        'jacobian': np.stack([_jacobian_rows(parameters[p], n) for p in PARAMETER_NAMES], axis=1),
+        'parameters': np.column_stack([
+            np.broadcast_to(_parts(parameters[p])[0], (n,)) for p in PARAMETER_NAMES
+        ]),
+        'parameter_names': PARAMETER_NAMES,
+        'biomarker_names': BIOMARKER_KEYS,
+    }
+
+
+def parameter_jacobian(biomarkers, core_markers=None):
+    """
+    37 × 47 Jacobian ∂parameter/∂biomarker for one patient.
+
+    Returns:
+        dict with 'jacobian' (37, 47) array (rows PARAMETER_NAMES, columns
+        ALL_BIOMARKERS order), 'parameters' {name: value}, 'parameter_names' and
+        'biomarker_names'.
+    """
+    batch = parameter_jacobian_batch(biomarkers_to_array(biomarkers), core_markers)
+    return {
+        'jacobian': batch['jacobian'][0],
+        'parameters': {n: float(v) for n, v in zip(PARAMETER_NAMES, batch['parameters'][0])},
+        'parameter_names': PARAMETER_NAMES,
+        'biomarker_names': BIOMARKER_KEYS,
+    }
+
+
+def top_sensitivities(jacobian_result, parameter, n=5):
+    """Largest |∂parameter/∂biomarker| entries for one parameter: [(key, derivative), ...]."""
+    row = jacobian_result['jacobian'][PARAMETER_NAMES.index(parameter)]
+    order = np.argsort(-np.abs(row), kind='stable')[:n]
+    return [(BIOMARKER_KEYS[j], float(row[j])) for j in order if row[j] != 0.0]
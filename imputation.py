@@ -0,0 +1,263 @@
+"""
+Cohort Imputation Module
+Category-specific median imputation learned from the stored patient records
+(Chapter 4, Section 4.3: "imputation of missing values with the median value that
+is specific to the category").
+
+Medians are kept per biomarker, pooled over the store and per patient category (a
+record field), optionally stratified further by the panel the record was entered
+with. They are maintained incrementally: only records that are new or changed
+since the last refresh are read, and each record's contribution can be withdrawn
+when it changes or is deleted. Missing means "not measured" (absent key, None/NaN,
+or a key outside the record's panel) and is tracked in an explicit mask; a typed 0
+is a measurement.
+"""
+
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from batch_calculations import REFERENCE_VECTOR
+from biomarkers_data import BIOMARKER_KEYS, BIOMARKER_INDEX
+from patient_data import PATIENT_DATA_DIR
+
+# Fewer observations than this and the median falls back to the next level
+# ((category, panel) → category → pooled store → reference values).
+MIN_OBSERVATIONS = 5
+
+
+def record_to_row(record: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a stored patient record to a (47,) value row and a (47,) missing mask.
+    Keys outside the record's panel (panel_type 'core' / 'optimized') are missing
+    even if the input form stored a 0.0 placeholder for them.
+    """
+    from panels import PANELS
+
+    biomarkers = record.get("biomarkers", {})
+    panel = PANELS.get(record.get("panel_type", "full"), PANELS["full"])
+    values = np.full(len(BIOMARKER_KEYS), np.nan)
+    for key in panel["markers"]:
+        value = biomarkers.get(key)
+        if value is not None:
+            values[BIOMARKER_INDEX[key]] = float(value)
+    return values, np.isnan(values)
+
+
+def records_to_array(records: Iterable[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack records into an (N, 47) array (NaN = missing) and its missing mask."""
+    rows = [record_to_row(r)[0] for r in records]
+    X = np.vstack(rows) if rows else np.empty((0, len(BIOMARKER_KEYS)))
+    return X, np.isnan(X)
+
+
+def impute_with_medians(X: np.ndarray, fill: np.ndarray, missing: Optional[np.ndarray] = None):
+    """
+    Impute a cohort in one masked operation.
+
+    Args:
+        X: (N, 47) values; NaN marks missing when no mask is given.
+        fill: (47,) medians, or (N, 47) per-row medians (e.g. per category).
+        missing: optional (N, 47) bool mask; True entries are replaced.
+
+    Returns:
+        (X_imputed, missing) — the mask is returned alongside the values.
+    """
+    X = np.asarray(X, dtype=float)
+    if missing is None:
+        missing = np.isnan(X)
+    return np.where(missing, fill, X), missing
+
+
+class _SortedColumns:
+    """Sorted observed values per biomarker for one category; supports add/remove."""
+
+    __slots__ = ("values", "_medians", "_fallback")
+
+    def __init__(self):
+        self.values: List[List[float]] = [[] for _ in BIOMARKER_KEYS]
+        self._medians: Optional[np.ndarray] = None
+        self._fallback: Optional[np.ndarray] = None
+
+    def add(self, row: np.ndarray):
+        for j in np.flatnonzero(~np.isnan(row)):
+            insort(self.values[j], row[j])
+        self._medians = None
+
+    def remove(self, row: np.ndarray):
+        for j in np.flatnonzero(~np.isnan(row)):
+            column = self.values[j]
+            del column[bisect_left(column, row[j])]
+        self._medians = None
+
+    def medians(self, fallback: np.ndarray) -> np.ndarray:
+        if self._medians is None or fallback is not self._fallback:
+            medians = fallback.copy()
+            for j, column in enumerate(self.values):
+                n = len(column)
+                if n >= MIN_OBSERVATIONS:
+                    mid = n // 2
+                    medians[j] = column[mid] if n % 2 else (column[mid - 1] + column[mid]) / 2.0
+            self._medians, self._fallback = medians, fallback
+        return self._medians
+
+
+class CohortImputer:
+    """
+    Per-biomarker medians over the patient store: pooled, per patient category,
+    and optionally per (category, panel) stratum on top.
+
+    The category is a record field (category_field, default "category"); records
+    without it only contribute to the pooled level. With stratify_by_panel, each
+    category is further split by the panel the record was entered with
+    (panel_type), and so is the uncategorized remainder.
+
+    refresh() stats the store and reads only new or modified record files;
+    add_record() applies a single record without touching the disk.
+    """
+
+    def __init__(self, data_dir=PATIENT_DATA_DIR, category_field: str = "category",
+                 stratify_by_panel: bool = False):
+        self.data_dir = data_dir
+        self.category_field = category_field
+        self.stratify_by_panel = stratify_by_panel
+        self._pooled = _SortedColumns()
+        # (category, None) per category; (category or None, panel) per panel stratum
+        self._strata: Dict[Tuple[Optional[str], Optional[str]], _SortedColumns] = {}
+        self._records: Dict[str, Tuple[float, Tuple[Tuple, ...], np.ndarray]] = {}  # id -> (mtime, strata, row)
+
+    def __len__(self):
+        return len(self._records)
+
+    def _stratum(self, key: Tuple[Optional[str], Optional[str]]) -> _SortedColumns:
+        if key not in self._strata:
+            self._strata[key] = _SortedColumns()
+        return self._strata[key]
+
+    def _strata_for(self, category: Optional[str], panel: Optional[str]) -> Tuple[Tuple, ...]:
+        """Stratum keys from the coarsest to the finest level for a category/panel pair."""
+        keys = []
+        if category is not None:
+            keys.append((category, None))
+        if self.stratify_by_panel and panel is not None:
+            keys.append((category, panel))
+        return tuple(keys)
+
+    def add_record(self, record: Dict[str, Any], record_id: Optional[str] = None, mtime: float = 0.0):
+        """Add (or replace) one record's observed values."""
+        record_id = record_id or record.get("patient_id", "")
+        self.remove_record(record_id)
+        row, _ = record_to_row(record)
+        category = record.get(self.category_field)
+        strata = self._strata_for(
+            None if category is None else str(category), str(record.get("panel_type", "full")),
+        )
+        self._pooled.add(row)
+        for key in strata:
+            self._stratum(key).add(row)
+        self._records[record_id] = (mtime, strata, row)
+
+    def remove_record(self, record_id: str):
+        """Withdraw a record's values; no-op if it was never added."""
+        entry = self._records.pop(record_id, None)
+        if entry is None:
+            return
+        _, strata, row = entry
+        self._pooled.remove(row)
+        for key in strata:
+            self._strata[key].remove(row)
+
+    def refresh(self) -> int:
+        """Sync with the store; returns the number of record files (re)read or dropped."""
+        import json
+
+        seen = set()
+        updated = 0
+        for path in self.data_dir.glob("*.json"):
+            record_id = path.stem
+            seen.add(record_id)
+            mtime = path.stat().st_mtime
+            known = self._records.get(record_id)
+            if known is not None and known[0] == mtime:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                continue
+            self.add_record(record, record_id, mtime)
+            updated += 1
+        for record_id in set(self._records) - seen:
+            self.remove_record(record_id)
+            updated += 1
+        return updated
+
+    def medians(self, category: Optional[str] = None, panel: Optional[str] = None) -> np.ndarray:
+        """
+        (47,) medians in ALL_BIOMARKERS order for the finest stratum available.
+
+        Levels fall back from (category, panel) to category to the pooled store to
+        reference values: a biomarker observed fewer than MIN_OBSERVATIONS times at
+        one level takes the median of the next coarser level. panel is only used
+        when the imputer stratifies by panel.
+        """
+        medians = self._pooled.medians(REFERENCE_VECTOR)
+        for key in self._strata_for(category, panel):
+            if key in self._strata:
+                medians = self._strata[key].medians(medians)
+        return medians
+
+    def category_medians(self) -> Dict[str, Dict[str, float]]:
+        """{category: {biomarker_key: median}} for every category seen in the store."""
+        return {
+            name: dict(zip(BIOMARKER_KEYS, self.medians(name).tolist()))
+            for name in sorted(category for category, panel in self._strata if panel is None)
+        }
+
+    def impute(self, X: np.ndarray, missing: Optional[np.ndarray] = None, categories=None, panels=None):
+        """
+        Impute an (N, 47) cohort with store medians.
+
+        Args:
+            X: values, NaN = missing unless a mask is passed.
+            missing: optional (N, 47) bool mask.
+            categories: optional length-N sequence of category names (None for
+                uncategorized rows) for category-specific medians.
+            panels: optional panel name, or length-N sequence of panel names, for
+                panel-stratified medians (ignored unless stratify_by_panel).
+
+        Returns:
+            (X_imputed, missing)
+        """
+        if categories is None and panels is None:
+            return impute_with_medians(X, self.medians(), missing)
+        n = len(X)
+        categories = [None] * n if categories is None else list(categories)
+        panels = [panels] * n if panels is None or isinstance(panels, str) else list(panels)
+        strata = list(zip(categories, panels))
+        names = list(dict.fromkeys(strata))
+        table = np.vstack([self.medians(category, panel) for category, panel in names])
+        lookup = {stratum: i for i, stratum in enumerate(names)}
+        rows = np.array([lookup[stratum] for stratum in strata], dtype=np.intp)
+        return impute_with_medians(X, table[rows], missing)
+
+    def impute_biomarkers(self, biomarkers: Dict[str, Any], panel_type: str = "full",
+                          category: Optional[str] = None) -> Dict[str, float]:
+        """Scalar convenience: impute one biomarker dict (panel-aware) with stratum medians."""
+        row, missing = record_to_row({"biomarkers": biomarkers, "panel_type": panel_type})
+        filled, _ = impute_with_medians(row, self.medians(category, panel_type), missing)
+        return dict(zip(BIOMARKER_KEYS, filled.tolist()))
+
+
+_COHORT_IMPUTER: Optional[CohortImputer] = None
+
+
+def cohort_imputer(refresh: bool = True) -> CohortImputer:
+    """Shared imputer for the patient store, refreshed incrementally on each call."""
+    global _COHORT_IMPUTER
+    if _COHORT_IMPUTER is None:
+        _COHORT_IMPUTER = CohortImputer()
+    if refresh:
+        _COHORT_IMPUTER.refresh()
+    return _COHORT_IMPUTER
@@ -0,0 +1,101 @@
+"""
+Log Space Module
+Positivity-preserving change of variables for the cell populations.
+
+The tumor compartments N₁, N₂, Q, R₁, R₂ and S span many orders of magnitude
+and must stay non-negative. Clamping y ← max(y, ε) after each step (Chapter 5)
+fights the step-size controller and loses accuracy near extinction. Instead,
+simulate_patient(..., state_space='log') integrates
+
+    z_i = log(y_i / y_i(t₀))     for the populations (so y_i = y_i(t₀) e^{z_i} > 0),
+    w_j = y_j / c_j              for the other states, c_j = max(|y_j(t₀)|, 1),
+
+on each piece starting at t₀, i.e. dz_i/dt = f_i(y)/y_i and dw_j/dt = f_j(y)/c_j.
+Positivity holds by construction and the solver's tolerances act on relative
+changes of the populations (z starts at 0 on every piece), so near-extinction
+phases are resolved to the same relative accuracy as the bulk tumor. A
+population that is zero at the start (e.g. R₁ = R₂ = S = 0 at presentation)
+starts at POSITIVE_FLOOR instead, Chapter 5's ε_floor; positive values are
+never raised to it, so a population is free to keep decaying (there is no
+clamp) and only stops at UNDERFLOW_FLOOR, where y_i(t₀) e^{z_i} would
+underflow to 0.
+
+Outputs, reducers and events see the states in linear space.
+"""
+
+import numpy as np
+
+from model_spec import TUMOR_STATES
+from simulation import _StateTransform
+
+# Starting value of a population that is zero (Chapter 5 ε_floor, outcomes.EPSILON_FLOOR)
+POSITIVE_FLOOR = 1e-6
+# A population that keeps decaying would reach e^z = 0 in floating point; it is
+# held at this level instead so its per-capita rate f_i/y_i stays finite
+UNDERFLOW_FLOOR = 1e-250
+LOG_STATES = TUMOR_STATES
+
+
+def _floor(y):
+    """Populations with non-positive values replaced by POSITIVE_FLOOR (positive ones are kept as they are)."""
+    return np.where(y > 0, y, POSITIVE_FLOOR)
+
+
+class LogSpace(_StateTransform):
+    """
+    A system y' = fun(t, y) in the variables above.
+
+    Args:
+        fun: right-hand side on the vector integrated so far (all 15 states, or
+            the 13 of pharmacokinetics.AnalyticPK).
+        state_names: names of that vector's entries.
+        y0: its value at the start of the piece.
+    """
+
+    def __init__(self, fun, state_names, y0):
+        self.fun = fun
+        self.log = np.array([i for i, name in enumerate(state_names) if name in LOG_STATES])
+        self.linear = np.array([i for i, name in enumerate(state_names) if name not in LOG_STATES])
+        y0 = np.asarray(y0, dtype=float)
+        self.scale = np.maximum(np.abs(y0), 1.0)
+        self.scale[self.log] = _floor(y0[self.log])
+
+    def transform(self, y):
+        """(…, n) states -> (…, n) integration variables (non-positive populations start at POSITIVE_FLOOR)."""
+        y = np.asarray(y, dtype=float)
+        v = y / self.scale
+        v[..., self.log] = np.log(_floor(y[..., self.log]) / self.scale[self.log])
+        return v
+
+    def expand(self, t, v):
+        """Integration variables back to states (t unused; same signature as AnalyticPK.expand)."""
+        v = np.asarray(v, dtype=float)
+        y = v * self.scale
+        y[..., self.log] = np.maximum(self.scale[self.log] * np.exp(v[..., self.log]), UNDERFLOW_FLOOR)
+        return y
+
+    def _states(self, t, v):
+        """States for evaluating fun and the slope g' (= y on the populations, the scale elsewhere)."""
+        y = self.expand(t, v)
+        slope = self.scale.copy()
+        slope[self.log] = y[self.log]
+        return y, slope
+
+    def rhs(self, t, v):
+        y, slope = self._states(t, v)
+        return self.fun(t, y) / slope
+
+    def jacobian(self, jac):
+        """
+        J(t, v) from a Jacobian jac(t, y) of fun:
+        diag(1/g') J_y diag(g') − diag(f/y) on the populations.
+        """
+        log = self.log
+
+        def J(t, v):
+            y, slope = self._states(t, v)
+            Jv = jac(t, y) * slope[None, :] / slope[:, None]
+            Jv[log, log] -= self.fun(t, y)[log] / y[log]
+            return Jv
+
+        return J
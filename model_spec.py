@@ -0,0 +1,546 @@
+"""
+Model Spec Module
+Declarative specification of the 15-state Chapter 4 system, from which the
+simulator's right-hand side, the analytic Jacobian and the LaTeX display are
+generated.
+
+Each equation is a list of terms written with the symbols below (states,
+parameters, controls) and named auxiliary quantities (N_total, η_treat, the
+crowding and saturation factors, …). From the one specification:
+
+    rhs_kernel        Python source with every symbol unpacked into a local,
+                      each auxiliary computed once and the 15 derivatives
+                      returned as a tuple: straight-line arithmetic with no
+                      dict lookups; for one patient (floats) it creates no
+                      arrays at all, for a cohort it runs on state columns.
+    jacobian_kernel   the same for the structurally non-zero entries of
+                      ∂f/∂y, differentiated symbolically term by term.
+    latex(state)      the equation as displayed in differential_equations.py.
+
+so a term added to an equation (ModelSpec.with_term) appears in all three.
+simulation._derivatives and jacobian.jacobian are the kernels generated from
+CHAPTER4_MODEL.
+"""
+
+import linecache
+
+import numpy as np
+
+from calculations import PARAMETER_NAMES
+
+# Compartments that make up N_total = N₁ + N₂ + Q + R₁ + R₂ + S
+TUMOR_STATES = ('N1', 'N2', 'Q', 'R1', 'R2', 'S')
+
+# Operator precedence for parenthesization: sum < product/quotient < atom
+_SUM, _PRODUCT, _ATOM = 1, 2, 3
+
+
+def _expr(value):
+    return value if isinstance(value, Expr) else Const(float(value))
+
+
+class Expr:
+    """Node of a model expression; built with + - * / on symbols and numbers."""
+
+    precedence = _ATOM
+
+    def __add__(self, other):
+        return add(self, _expr(other))
+
+    def __radd__(self, other):
+        return add(_expr(other), self)
+
+    def __sub__(self, other):
+        return add(self, neg(_expr(other)))
+
+    def __rsub__(self, other):
+        return add(_expr(other), neg(self))
+
+    def __mul__(self, other):
+        return mul(self, _expr(other))
+
+    def __rmul__(self, other):
+        return mul(_expr(other), self)
+
+    def __truediv__(self, other):
+        return div(self, _expr(other))
+
+    def __rtruediv__(self, other):
+        return div(_expr(other), self)
+
+    def __neg__(self):
+        return neg(self)
+
+    def diff(self, symbol):
+        """∂self/∂symbol as a simplified expression."""
+        raise NotImplementedError
+
+    def code(self):
+        """Python source (floats or NumPy arrays)."""
+        raise NotImplementedError
+
+    def latex(self):
+        raise NotImplementedError
+
+    def named(self):
+        """Named auxiliaries this expression refers to (directly or through other auxiliaries)."""
+        return set()
+
+
+class Const(Expr):
+    def __init__(self, value):
+        self.value = float(value)
+
+    def diff(self, symbol):
+        return ZERO
+
+    def code(self):
+        return repr(self.value)
+
+    def latex(self):
+        return f"{self.value:g}"
+
+
+ZERO, ONE = Const(0.0), Const(1.0)
+
+
+class Symbol(Expr):
+    """A state, parameter or control, unpacked into a local variable named `name`."""
+
+    def __init__(self, name, kind, latex):
+        self.name, self.kind, self._latex = name, kind, latex
+
+    def diff(self, symbol):
+        return ONE if symbol is self else ZERO
+
+    def code(self):
+        return self.name
+
+    def latex(self):
+        return self._latex
+
+
+class Named(Expr):
+    """
+    Auxiliary quantity computed once per call (a local variable in the
+    kernels). Displayed as its own symbol when latex is given, otherwise
+    written out in place.
+    """
+
+    def __init__(self, name, expr, latex=None):
+        self.name, self.expr, self._latex = name, _expr(expr), latex
+        self.precedence = _ATOM if latex is not None else self.expr.precedence
+
+    def diff(self, symbol):
+        return self.expr.diff(symbol)
+
+    def code(self):
+        return self.name
+
+    def latex(self):
+        return self._latex if self._latex is not None else self.expr.latex()
+
+    def named(self):
+        return {self} | self.expr.named()
+
+
+class Sum(Expr):
+    precedence = _SUM
+
+    def __init__(self, terms):
+        self.terms = tuple(terms)
+
+    def diff(self, symbol):
+        return add(*(term.diff(symbol) for term in self.terms))
+
+    def _render(self, render):
+        parts = []
+        for i, term in enumerate(self.terms):
+            negative = _is_negative(term)
+            body = render(neg(term) if negative else term)
+            if i == 0:
+                parts.append(f"-{body}" if negative else body)
+            else:
+                parts.append(f" - {body}" if negative else f" + {body}")
+        return "".join(parts)
+
+    def code(self):
+        return self._render(lambda e: e.code())
+
+    def latex(self):
+        return self._render(lambda e: e.latex())
+
+    def named(self):
+        return set().union(*(term.named() for term in self.terms))
+
+
+class Product(Expr):
+    precedence = _PRODUCT
+
+    def __init__(self, factors):
+        self.factors = tuple(factors)
+
+    @property
+    def coefficient(self):
+        first = self.factors[0]
+        return first.value if isinstance(first, Const) else 1.0
+
+    def diff(self, symbol):
+        terms = []
+        for i, factor in enumerate(self.factors):
+            d = factor.diff(symbol)
+            if d is not ZERO:
+                terms.append(mul(*self.factors[:i], d, *self.factors[i + 1:]))
+        return add(*terms)
+
+    def code(self):
+        factors = [_paren(f.code(), _code_precedence(f) < _PRODUCT) for f in self.factors]
+        if isinstance(self.factors[0], Const) and self.coefficient == -1.0:
+            return "-" + " * ".join(factors[1:])
+        return " * ".join(factors)
+
+    def latex(self):
+        factors = list(self.factors)
+        sign = ""
+        if isinstance(factors[0], Const) and factors[0].value in (1.0, -1.0):
+            sign = "-" if factors[0].value < 0 else ""
+            factors = factors[1:]
+        parts = [rf"\left({f.latex()}\right)" if f.precedence < _PRODUCT else f.latex() for f in factors]
+        return sign + " ".join(parts)
+
+    def named(self):
+        return set().union(*(factor.named() for factor in self.factors))
+
+
+class Quotient(Expr):
+    precedence = _PRODUCT
+
+    def __init__(self, numerator, denominator):
+        self.numerator, self.denominator = numerator, denominator
+
+    def diff(self, symbol):
+        a, b = self.numerator, self.denominator
+        da, db = a.diff(symbol), b.diff(symbol)
+        if db is ZERO:
+            return div(da, b)
+        return add(div(da, b), neg(div(mul(a, db), mul(b, b))))
+
+    def code(self):
+        a, b = self.numerator, self.denominator
+        return f"{_paren(a.code(), _code_precedence(a) < _PRODUCT)} / {_paren(b.code(), _code_precedence(b) <= _PRODUCT)}"
+
+    def latex(self):
+        return rf"\frac{{{self.numerator.latex()}}}{{{self.denominator.latex()}}}"
+
+    def named(self):
+        return self.numerator.named() | self.denominator.named()
+
+
+class Max0(Expr):
+    """max(0, x), written as (x + |x|)/2 so it also works on arrays."""
+
+    def __init__(self, arg):
+        self.arg = _expr(arg)
+
+    def diff(self, symbol):
+        d = self.arg.diff(symbol)
+        return ZERO if d is ZERO else mul(Step(self.arg), d)
+
+    def code(self):
+        x = self.arg.code()
+        return f"0.5 * ({x} + abs({x}))"
+
+    def latex(self):
+        return rf"\max\left(0, {self.arg.latex()}\right)"
+
+    def named(self):
+        return self.arg.named()
+
+
+class Step(Expr):
+    """Heaviside step 1[x > 0] (derivative of Max0)."""
+
+    def __init__(self, arg):
+        self.arg = arg
+
+    def diff(self, symbol):
+        return ZERO
+
+    def code(self):
+        return f"(({self.arg.code()}) > 0) * 1.0"
+
+    def latex(self):
+        return rf"\mathbb{{1}}\left[{self.arg.latex()} > 0\right]"
+
+    def named(self):
+        return self.arg.named()
+
+
+def _paren(text, needed):
+    return f"({text})" if needed else text
+
+
+def _code_precedence(expr):
+    # An auxiliary is a local variable in the generated code, whatever its expression
+    return _ATOM if isinstance(expr, Named) else expr.precedence
+
+
+def _is_negative(expr):
+    if isinstance(expr, Const):
+        return expr.value < 0
+    if isinstance(expr, Product):
+        return expr.coefficient < 0
+    if isinstance(expr, Quotient):
+        return _is_negative(expr.numerator)
+    return False
+
+
+def add(*terms):
+    """Sum with nested sums flattened, zeros dropped and constants folded."""
+    flat = []
+    for term in terms:
+        flat.extend(term.terms if isinstance(term, Sum) else [term])
+    constant, kept, position = 0.0, [], None
+    for term in flat:
+        if isinstance(term, Const):
+            constant += term.value
+            position = len(kept) if position is None else position
+        else:
+            kept.append(term)
+    if constant != 0.0:
+        kept.insert(position, Const(constant))
+    if not kept:
+        return ZERO
+    return kept[0] if len(kept) == 1 else Sum(kept)
+
+
+def mul(*factors):
+    """Product with nested products flattened and constants folded into a leading coefficient."""
+    flat = []
+    for factor in factors:
+        flat.extend(factor.factors if isinstance(factor, Product) else [factor])
+    coefficient, kept = 1.0, []
+    for factor in flat:
+        if isinstance(factor, Const):
+            coefficient *= factor.value
+        else:
+            kept.append(factor)
+    if coefficient == 0.0:
+        return ZERO
+    if not kept:
+        return Const(coefficient)
+    if coefficient != 1.0:
+        kept.insert(0, Const(coefficient))
+    return kept[0] if len(kept) == 1 else Product(kept)
+
+
+def neg(expr):
+    if isinstance(expr, Quotient):
+        return div(neg(expr.numerator), expr.denominator)
+    return mul(Const(-1.0), expr)
+
+
+def div(numerator, denominator):
+    if numerator is ZERO or (isinstance(numerator, Const) and numerator.value == 0.0):
+        return ZERO
+    if isinstance(denominator, Const):
+        return mul(Const(1.0 / denominator.value), numerator)
+    return Quotient(numerator, denominator)
+
+
+class ModelSpec:
+    """
+    A system dy/dt = f(y, p, u) given term by term.
+
+    Args:
+        states, parameters, controls: Symbols in packed order (y, p and u).
+        auxiliaries: Named quantities, each after the ones it uses.
+        equations: mapping state name -> list of terms.
+    """
+
+    def __init__(self, states, parameters, controls, auxiliaries, equations):
+        self.states, self.parameters, self.controls = tuple(states), tuple(parameters), tuple(controls)
+        self.auxiliaries = tuple(auxiliaries)
+        self.state_names = tuple(s.name for s in self.states)
+        self.parameter_names = tuple(s.name for s in self.parameters)
+        self.control_names = tuple(s.name for s in self.controls)
+        missing = set(self.state_names) ^ set(equations)
+        if missing:
+            raise ValueError(f"Equations and states differ: {sorted(missing)}")
+        self.equations = {name: tuple(_expr(t) for t in equations[name]) for name in self.state_names}
+        self._kernels = {}
+
+    def symbol(self, name):
+        """The state, parameter or control symbol called name (for writing new terms)."""
+        for symbol in self.states + self.parameters + self.controls:
+            if symbol.name == name:
+                return symbol
+        raise KeyError(name)
+
+    def with_term(self, state, term):
+        """A copy of the model with term added to the equation for state."""
+        equations = dict(self.equations)
+        equations[state] = equations[state] + (_expr(term),)
+        return ModelSpec(self.states, self.parameters, self.controls, self.auxiliaries, equations)
+
+    def derivative(self, state):
+        """Right-hand side of d(state)/dt as one expression."""
+        return add(*self.equations[state])
+
+    def jacobian_entries(self):
+        """(row, column, ∂f_row/∂y_column) for every structurally non-zero entry."""
+        if 'entries' not in self._kernels:
+            self._kernels['entries'] = [
+                (i, j, d)
+                for i, name in enumerate(self.state_names)
+                for j, state in enumerate(self.states)
+                if (d := self.derivative(name).diff(state)) is not ZERO
+            ]
+        return self._kernels['entries']
+
+    def sparsity(self):
+        """(15, 15) boolean structural pattern of ∂f/∂y."""
+        pattern = np.zeros((len(self.states), len(self.states)), dtype=bool)
+        for i, j, _ in self.jacobian_entries():
+            pattern[i, j] = True
+        pattern.setflags(write=False)
+        return pattern
+
+    def _source(self, name, expressions, doc):
+        used = set().union(*(e.named() for e in expressions))
+        lines = [f"def {name}(y, p, u):", f'    """{doc}"""']
+        for symbols, arg in ((self.states, 'y'), (self.parameters, 'p'), (self.controls, 'u')):
+            lines.append(f"    ({', '.join(s.name for s in symbols)},) = {arg}")
+        lines += [f"    {aux.name} = {aux.expr.code()}" for aux in self.auxiliaries if aux in used]
+        lines.append("    return (")
+        lines += [f"        {e.code()}," for e in expressions]
+        lines.append("    )")
+        return "\n".join(lines) + "\n"
+
+    def rhs_source(self):
+        """Python source of rhs_kernel(y, p, u) -> the derivatives in state order."""
+        return self._source('rhs_kernel', [self.derivative(n) for n in self.state_names],
+                            "dy/dt in state order (generated from the model spec).")
+
+    def jacobian_source(self):
+        """Python source of jacobian_kernel(y, p, u) -> the jacobian_entries values."""
+        return self._source('jacobian_kernel', [d for _, _, d in self.jacobian_entries()],
+                            "Non-zero entries of df/dy in jacobian_entries order (generated from the model spec).")
+
+    def _compile(self, name, source):
+        if name not in self._kernels:
+            filename = f"<model_spec {name} {id(self):x}>"
+            linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+            namespace = {}
+            exec(compile(source, filename, 'exec'), namespace)
+            self._kernels[name] = namespace[name]
+        return self._kernels[name]
+
+    @property
+    def rhs_kernel(self):
+        return self._compile('rhs_kernel', self.rhs_source())
+
+    @property
+    def jacobian_kernel(self):
+        return self._compile('jacobian_kernel', self.jacobian_source())
+
+    def latex(self, state, terms_per_line=3):
+        """d(state)/dt = … in LaTeX, broken into aligned lines of terms_per_line terms."""
+        symbol = self.states[self.state_names.index(state)]
+        lhs = rf"\frac{{d{symbol.latex()}}}{{dt}}"
+        pieces = []
+        for i, term in enumerate(self.equations[state]):
+            negative = _is_negative(term)
+            body = (neg(term) if negative else term).latex()
+            pieces.append(("- " if negative else ("" if i == 0 else "+ ")) + body)
+        if len(pieces) <= terms_per_line:
+            return f"{lhs} = " + " ".join(pieces)
+        lines = [" ".join(pieces[k:k + terms_per_line]) for k in range(0, len(pieces), terms_per_line)]
+        return r"\begin{aligned}" + f"{lhs} = {{}} & " + r" \\ & ".join(lines) + r"\end{aligned}"
+
+
+def _symbols(kind, names, latex):
+    missing = [name for name in names if name not in latex]
+    if missing:
+        raise ValueError(f"No LaTeX for {kind} {missing}")
+    return tuple(Symbol(name, kind, latex[name]) for name in names)
+
+
+_STATE_LATEX = {
+    'N1': 'N_1', 'N2': 'N_2', 'I1': 'I_1', 'I2': 'I_2', 'P': 'P', 'A': 'A', 'Q': 'Q', 'R1': 'R_1',
+    'R2': 'R_2', 'S': 'S', 'D': 'D', 'Dm': 'D_m', 'G': 'G', 'M': 'M', 'H': 'H',
+}
+_PARAMETER_LATEX = {
+    'lambda1': r'\lambda_1', 'lambda2': r'\lambda_2', 'lambdaR1': r'\lambda_{R1}', 'lambdaR2': r'\lambda_{R2}',
+    'K': 'K', 'beta1': r'\beta_1', 'beta2': r'\beta_2', 'phi1': r'\phi_1', 'phi2': r'\phi_2', 'phi3': r'\phi_3',
+    'deltaI': r'\delta_I', 'omegaR1': r'\omega_{R1}', 'omegaR2': r'\omega_{R2}', 'etaE': r'\eta_E',
+    'etaC': r'\eta_C', 'etaH': r'\eta_H', 'etaI': r'\eta_I', 'kel': r'k_{\text{el}}',
+    'k_metabolism': r'k_{\text{metabolism}}', 'k_clearance': r'k_{\text{clearance}}', 'alphaA': r'\alpha_A',
+    'deltaA': r'\delta_A', 'kappaQ': r'\kappa_Q', 'lambdaQ': r'\lambda_Q', 'kappaS': r'\kappa_S',
+    'deltaS': r'\delta_S', 'gamma': r'\gamma', 'deltaP': r'\delta_P', 'mu': r'\mu', 'nu': r'\nu',
+    'deltaG': r'\delta_G', 'kappaM': r'\kappa_M', 'deltaM': r'\delta_M', 'kappaH': r'\kappa_H',
+    'deltaH': r'\delta_H', 'rho1': r'\rho_1', 'rho2': r'\rho_2', 'alpha_acid': r'\alpha_{\text{acid}}',
+}
+_CONTROL_LATEX = {'u_E': 'u_E', 'u_C': 'u_C', 'u_H': 'u_H', 'u_I': 'u_I', 'dose_rate': r'\text{dose\_rate}(t)'}
+
+
+def _chapter4_model():
+    states = _symbols('state', tuple(_STATE_LATEX), _STATE_LATEX)
+    parameters = _symbols('parameter', tuple(PARAMETER_NAMES) + ('alpha_acid',), _PARAMETER_LATEX)
+    controls = _symbols('control', tuple(_CONTROL_LATEX), _CONTROL_LATEX)
+    N1, N2, I1, I2, P, A, Q, R1, R2, S, D, Dm, G, M, H = states
+    k = {s.name: s for s in parameters}
+    u_E, u_C, u_H, u_I, dose_rate = controls
+
+    N_total = Named('N_total', add(*(s for s in states if s.name in TUMOR_STATES)), r'N_{\text{total}}')
+    eta_treat = Named('eta_treat', k['etaE'] * u_E + k['etaC'] * u_C + k['etaH'] * u_H + k['etaI'] * u_I,
+                      r'\eta_{\text{treat}}')
+    crowding = Named('crowding', 1 - N_total / k['K'])
+    saturation = Named('saturation', 1 + 0.01 * N_total)
+    metabolic = Named('metabolic', (1 + 0.1 * M) / (1 + k['alpha_acid'] * M))
+    instability = Named('instability', 2 - G)
+    stress = Named('stress', 1 + 0.5 * H)
+    immunotherapy = Named('immunotherapy', 0.1 * k['etaI'] * u_I)
+    excess = Named('excess', N_total / k['K'] - 0.5)
+    auxiliaries = (N_total, eta_treat, crowding, saturation, metabolic, instability, stress, immunotherapy, excess)
+
+    equations = {
+        'N1': [k['lambda1'] * N1 * crowding * metabolic,
+               -k['beta1'] * N1 * I1 / saturation,
+               -eta_treat * N1,
+               -k['kappaQ'] * N1 * stress,
+               -(k['omegaR1'] + k['omegaR2']) * eta_treat * N1 * instability,
+               -k['kappaS'] * eta_treat * N1 * (1.3 - 0.3 * G)],
+        'N2': [k['lambda2'] * N2 * crowding * metabolic,
+               -0.5 * k['beta1'] * N2 * I1 / saturation,
+               -0.7 * eta_treat * N2,
+               -k['kappaQ'] * N2 * stress],
+        'I1': [k['phi1'],
+               k['phi2'] * N_total / saturation,
+               -k['beta2'] * I1 * I2 / (1 + I1),
+               -k['deltaI'] * I1 * (1 + 0.2 * H),
+               immunotherapy * I1],
+        'I2': [k['phi3'] * N_total / saturation,
+               -k['deltaI'] * I2 * (1 + 0.1 * H),
+               -immunotherapy * I2],
+        'P': [k['gamma'] * N_total * stress * (1 + 0.3 * M), -k['deltaP'] * P],
+        'A': [k['alphaA'] * N_total * (1 + H) / saturation, -k['deltaA'] * A],
+        'Q': [k['kappaQ'] * (N1 + N2) * stress, -k['lambdaQ'] * Q * (1 + 0.2 * A) / stress],
+        'R1': [k['omegaR1'] * k['etaE'] * u_E * N1 * instability,
+               k['lambdaR1'] * R1 * crowding,
+               -k['rho1'] * k['beta1'] * R1 * I1 / saturation],
+        'R2': [k['omegaR2'] * k['etaC'] * u_C * N1 * instability,
+               k['lambdaR2'] * R2 * crowding,
+               -k['rho2'] * k['beta1'] * R2 * I1 / saturation],
+        'S': [k['kappaS'] * eta_treat * N1 * (1.3 - 0.3 * G), -k['deltaS'] * S],
+        'D': [dose_rate, -k['kel'] * D, -k['k_metabolism'] * D],
+        'Dm': [k['k_metabolism'] * D, -k['k_clearance'] * Dm],
+        'G': [-k['mu'] * N_total, -k['nu'] * eta_treat * instability, k['deltaG'] * (1 - G)],
+        'M': [k['kappaM'] * N_total * stress, -k['deltaM'] * M],
+        'H': [k['kappaH'] * Max0(excess), -k['alphaA'] * A * H, -k['deltaH'] * H],
+    }
+    return ModelSpec(states, parameters, controls, auxiliaries, equations)
+
+
+# The Chapter 4 system (states in simulation.STATE_NAMES order, parameters in MODEL_PARAMETER_KEYS order)
+CHAPTER4_MODEL = _chapter4_model()
@@ -0,0 +1,210 @@
+"""
+Outcomes Module
+Chapter 5 treatment efficacy metric from the start and end of a trajectory:
+
+    E = 0.4 R_T + 0.2 R_I + 0.2 (1 − R_R) + 0.15 (1 − R_M) + 0.05 (1 − R_S)
+
+with R_T = 1 − N_total(t_f)/N_total(0) (tumor reduction), R_I = I₁(t_f)/I₁(0)
+(immune enhancement), R_R = (R₁ + R₂)(t_f)/(R₁ + R₂)(0) (resistance),
+R_M = P(t_f)/P(0) (metastatic potential) and R_S = S(t_f)/S(0) (senescence).
+
+The ratios need non-zero R₁, R₂, P and S at t = 0, which the default
+presentation (simulation.default_initial_state) does not have, so
+efficacy_initial_state seeds them. Denominators are floored at Chapter 5's
+ε_floor = 1e-6.
+
+Reducers accumulate outcomes while a run is integrated instead of from a stored
+trajectory: simulate_patient, simulate_cohort and simulate_fractional accept
+reducers={name: Reducer} and feed every accepted solver step to them, returning
+the results as 'reductions'. With t_eval=[] nothing is stored per step, so a
+run needs O(1) memory however long it is. EfficacyReducer gives E and its
+components; AUCReducer and PeakReducer integrate or track the maximum of any
+quantity (a state name, a tuple of names summed, or a callable on states).
+Custom reducers subclass Reducer.
+"""
+
+import copy
+
+import numpy as np
+
+from model_spec import TUMOR_STATES
+from simulation import MODEL_PARAMETER_KEYS, STATE_INDEX, default_initial_state, pack_parameters
+
+EFFICACY_WEIGHTS = {'R_T': 0.4, 'R_I': 0.2, 'R_R': 0.2, 'R_M': 0.15, 'R_S': 0.05}
+# Smallest population Chapter 5 keeps in any compartment
+EPSILON_FLOOR = 1e-6
+# Resistant and senescent populations at presentation, as fractions of K
+EFFICACY_SEED = {'R1': 0.001, 'R2': 0.001, 'S': 0.001}
+
+_TUMOR = [STATE_INDEX[name] for name in TUMOR_STATES]
+
+
+def efficacy_initial_state(parameters):
+    """
+    default_initial_state plus the EFFICACY_SEED populations and P at its
+    quasi-steady level γ N_total(0) / δ_P, so every efficacy ratio is defined.
+    """
+    y0 = default_initial_state(parameters)
+    p = pack_parameters(parameters)
+    K = p[..., MODEL_PARAMETER_KEYS.index('K')]
+    for name, fraction in EFFICACY_SEED.items():
+        y0[..., STATE_INDEX[name]] = fraction * K
+    y0[..., STATE_INDEX['P']] = (
+        p[..., MODEL_PARAMETER_KEYS.index('gamma')] * y0[..., _TUMOR].sum(axis=-1)
+        / p[..., MODEL_PARAMETER_KEYS.index('deltaP')]
+    )
+    return y0
+
+
+def _ratio(final, initial):
+    return final / np.maximum(initial, EPSILON_FLOOR)
+
+
+def treatment_efficacy(y_initial, y_final):
+    """
+    Efficacy E and its components from the initial and final states
+    ((15,) or (..., 15) arrays in STATE_NAMES order).
+
+    Returns:
+        dict with 'E', 'R_T', 'R_I', 'R_R', 'R_M' and 'R_S' (floats, or arrays
+        for stacked states).
+    """
+    y0 = np.asarray(y_initial, dtype=float)
+    yf = np.asarray(y_final, dtype=float)
+
+    def resistant(y):
+        return y[..., STATE_INDEX['R1']] + y[..., STATE_INDEX['R2']]
+
+    components = {
+        'R_T': 1.0 - _ratio(yf[..., _TUMOR].sum(axis=-1), y0[..., _TUMOR].sum(axis=-1)),
+        'R_I': _ratio(yf[..., STATE_INDEX['I1']], y0[..., STATE_INDEX['I1']]),
+        'R_R': _ratio(resistant(yf), resistant(y0)),
+        'R_M': _ratio(yf[..., STATE_INDEX['P']], y0[..., STATE_INDEX['P']]),
+        'R_S': _ratio(yf[..., STATE_INDEX['S']], y0[..., STATE_INDEX['S']]),
+    }
+    w = EFFICACY_WEIGHTS
+    E = (w['R_T'] * components['R_T'] + w['R_I'] * components['R_I'] + w['R_R'] * (1 - components['R_R'])
+         + w['R_M'] * (1 - components['R_M']) + w['R_S'] * (1 - components['R_S']))
+    result = {'E': E, **components}
+    if y0.ndim == 1:
+        result = {key: float(value) for key, value in result.items()}
+    return result
+
+
+def tumor_burden(y):
+    """N_total: the sum of the tumor compartments of (..., 15) states."""
+    return np.asarray(y)[..., _TUMOR].sum(axis=-1)
+
+
+def _quantity(quantity):
+    """Callable (..., 15) states -> (...) for a state name, a tuple of names or a callable."""
+    if callable(quantity):
+        return quantity
+    names = (quantity,) if isinstance(quantity, str) else tuple(quantity)
+    columns = [STATE_INDEX[name] for name in names]
+    return lambda y: np.asarray(y)[..., columns].sum(axis=-1)
+
+
+class Reducer:
+    """
+    Accumulates a result along a run. start(t, y) is called once with the
+    initial state ((15,) for one patient, (N, 15) for a cohort), then
+    step(t0, y0, t1, y1, rows) for every accepted step: y0 and y1 are the
+    states at the ends of the step (after any bolus at t0), and for a cohort
+    t0, t1 are (n,) and y0, y1 (n, 15) for the patients `rows`
+    (Ellipsis for one patient). result() returns the accumulated value.
+    """
+
+    def start(self, t, y):
+        raise NotImplementedError
+
+    def step(self, t0, y0, t1, y1, rows=Ellipsis):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+def _scalar(value, single):
+    return float(value) if single else value
+
+
+class EfficacyReducer(Reducer):
+    """Chapter 5 efficacy (treatment_efficacy) from the initial and last states."""
+
+    def start(self, t, y):
+        self.initial = np.array(y, dtype=float)
+        self.last = self.initial.copy()
+
+    def step(self, t0, y0, t1, y1, rows=Ellipsis):
+        self.last[rows] = y1
+
+    def result(self):
+        return treatment_efficacy(self.initial, self.last)
+
+
+class AUCReducer(Reducer):
+    """Area under quantity(t) (trapezoidal rule over the solver steps)."""
+
+    def __init__(self, quantity=tumor_burden):
+        self.quantity = _quantity(quantity)
+
+    def start(self, t, y):
+        y = np.asarray(y, dtype=float)
+        self.single = y.ndim == 1
+        self.value = np.zeros(y.shape[:-1])
+
+    def step(self, t0, y0, t1, y1, rows=Ellipsis):
+        self.value[rows] += 0.5 * (t1 - t0) * (self.quantity(y0) + self.quantity(y1))
+
+    def result(self):
+        return _scalar(self.value, self.single)
+
+
+class PeakReducer(Reducer):
+    """Maximum of quantity(t) over the solver steps, and when it was reached."""
+
+    def __init__(self, quantity='D'):
+        self.quantity = _quantity(quantity)
+
+    def start(self, t, y):
+        y = np.asarray(y, dtype=float)
+        self.single = y.ndim == 1
+        self.peak = np.array(self.quantity(y), dtype=float)
+        self.time = np.full(y.shape[:-1], float(np.min(t)))
+
+    def step(self, t0, y0, t1, y1, rows=Ellipsis):
+        # Both ends: y0 includes a bolus given at t0
+        for t, y in ((t0, y0), (t1, y1)):
+            value = self.quantity(y)
+            higher = value > self.peak[rows]
+            self.peak[rows] = np.where(higher, value, self.peak[rows])
+            self.time[rows] = np.where(higher, t, self.time[rows])
+
+    def result(self):
+        return {'peak': _scalar(self.peak, self.single), 'time': _scalar(self.time, self.single)}
+
+
+class ReducerSet:
+    """Named reducers fed together; used by the simulators for their reducers= argument."""
+
+    def __init__(self, reducers):
+        self.reducers = dict(reducers)
+        for name, reducer in self.reducers.items():
+            if not isinstance(reducer, Reducer):
+                raise TypeError(f"Reducer {name!r} must be a Reducer, got {type(reducer).__name__}")
+
+    def start(self, t, y):
+        for reducer in self.reducers.values():
+            reducer.start(t, y)
+
+    def step(self, t0, y0, t1, y1, rows=Ellipsis):
+        for reducer in self.reducers.values():
+            reducer.step(t0, y0, t1, y1, rows)
+
+    def copy(self):
+        """Independent copy (the stiff solver cascade feeds one per attempt)."""
+        return copy.deepcopy(self)
+
+    def results(self):
+        return {name: reducer.result() for name, reducer in self.reducers.items()}
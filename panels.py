@@ -0,0 +1,150 @@
+"""
+Testing Panel Module
+Full / Optimized / Core biomarker panels, per-parameter coverage derived from the
+formula dependencies, and precompiled imputation templates for reduced panels.
+
+A panel is just a list of measured biomarker keys; site-specific panels can be
+scored by passing their key list anywhere a panel is accepted.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from biomarkers_data import BIOMARKER_KEYS, BIOMARKER_INDEX
+from calculations import REFERENCE_VALUES_FOR_IMPUTATION
+from dependency_graph import biomarker_inputs, formula_inputs
+
+# Core panel: top 15 by selection frequency (Chapter 4 feature selection)
+CORE_PANEL_MARKERS = [
+    'ca153', 'cd8', 'pik3ca', 'albumin', 'cea', 'cd4',
+    'esr1_protein', 'il10', 'glucose', 'her2_mutations',
+    'tk1', 'nk', 'lactate', 'mdr1', 'ifn_gamma',
+]
+
+# Optimized panel (provisional): Chapter 4 does not enumerate the 25, and its
+# R² = 0.93 refers to the chapter's own list. Core 15 plus the ten markers
+# that move the most parameters off reference-only inputs: ctDNA/TP53 (genetic
+# scores), survivin (both resistance factors), PD-L1 (η_I, s_suppress), the
+# organ markers behind every PK parameter, and VEGF for α_A.
+OPTIMIZED_PANEL_MARKERS = CORE_PANEL_MARKERS + [
+    'ctdna', 'tp53', 'survivin', 'pdl1_ctc',
+    'creatinine', 'bun', 'alt', 'ast', 'bilirubin', 'vegf',
+]
+
+PANELS = {
+    'full': {
+        'label': "Full Panel (47 biomarkers)",
+        'markers': list(BIOMARKER_KEYS),
+        'r2': 0.98,
+        'use_case': "complex cases, research protocols",
+        'provisional': False,
+    },
+    'optimized': {
+        'label': "Optimized Panel (25 biomarkers)",
+        'markers': OPTIMIZED_PANEL_MARKERS,
+        'r2': 0.93,
+        'use_case': "treatment planning, resistance monitoring",
+        'provisional': True,
+    },
+    'core': {
+        'label': "Core Panel (15 biomarkers)",
+        'markers': CORE_PANEL_MARKERS,
+        'r2': 0.87,
+        'use_case': "routine screening, basic treatment selection",
+        'provisional': False,
+    },
+}
+
+# Shown wherever a provisional panel is selected (sidebar, results page, CLI)
+PROVISIONAL_PANEL_NOTE = (
+    "Provisional marker list: Chapter 4 reports R² = {r2} for its 25-biomarker panel but does not "
+    "list the markers, so this panel is a stand-in (Core 15 + 10) and that R² does not apply to it."
+)
+
+# A parameter is "core_driven" when more than this share of the biomarkers behind it
+# (through its composite scores and organ factors) are measured by the panel.
+CORE_DRIVEN_SHARE = 0.5
+
+_KNOWN_KEYS = frozenset(BIOMARKER_KEYS)
+
+
+class PanelTemplate(NamedTuple):
+    """Precompiled imputation for one panel."""
+    markers: Tuple[str, ...]   # measured keys, in BIOMARKER_KEYS order
+    measured: np.ndarray       # (47,) bool, True for measured columns
+    fill: np.ndarray           # (47,) reference values used for everything not measured
+    reference: Dict[str, float]  # same fill as a dict, for the scalar path
+
+
+def _panel_key(panel_markers: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Canonical key for a panel: measured markers in column order (all 47 when None/empty)."""
+    if not panel_markers:
+        return BIOMARKER_KEYS
+    selected = set(panel_markers)
+    unknown = selected - _KNOWN_KEYS
+    if unknown:
+        raise ValueError(f"Unknown biomarker keys in panel: {sorted(unknown)}")
+    return tuple(k for k in BIOMARKER_KEYS if k in selected)
+
+
+@lru_cache(maxsize=32)
+def _template(markers: Tuple[str, ...]) -> PanelTemplate:
+    measured = np.zeros(len(BIOMARKER_KEYS), dtype=bool)
+    measured[[BIOMARKER_INDEX[k] for k in markers]] = True
+    fill = np.array([REFERENCE_VALUES_FOR_IMPUTATION.get(k, 0.0) for k in BIOMARKER_KEYS])
+    measured.flags.writeable = False
+    fill.flags.writeable = False
+    reference = {k: REFERENCE_VALUES_FOR_IMPUTATION.get(k, 0.0) for k in BIOMARKER_KEYS}
+    return PanelTemplate(markers, measured, fill, reference)
+
+
+@lru_cache(maxsize=64)
+def _template_for(panel_markers: Tuple[str, ...]) -> PanelTemplate:
+    return _template(_panel_key(panel_markers))
+
+
+def panel_template(panel_markers: Optional[Iterable[str]] = None) -> PanelTemplate:
+    """Return the cached imputation template for a panel (Full panel when None)."""
+    return _template_for(tuple(panel_markers) if panel_markers else ())
+
+
+def apply_panel_template(X: np.ndarray, template: PanelTemplate) -> np.ndarray:
+    """
+    Impute an (N, 47) cohort for a panel in one array fill: measured, non-missing
+    entries are kept and every other entry takes the reference value.
+    """
+    return np.where(template.measured & ~np.isnan(X), X, template.fill)
+
+
+@lru_cache(maxsize=32)
+def _coverage(markers: Tuple[str, ...]) -> Dict[str, str]:
+    panel = set(markers)
+    coverage = {}
+    for node in formula_inputs():
+        kind, name = node
+        if kind != 'parameter':
+            continue
+        inputs = biomarker_inputs(node)
+        share = len(inputs & panel) / len(inputs) if inputs else 0.0
+        if share > CORE_DRIVEN_SHARE:
+            coverage[name] = 'core_driven'
+        elif share > 0:
+            coverage[name] = 'partly_core'
+        else:
+            coverage[name] = 'imputed_only'
+    return coverage
+
+
+def parameter_coverage(panel_markers: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    Classify every parameter for a panel by walking the formula dependencies:
+    - "core_driven": more than half of its biomarker inputs are measured by the panel.
+    - "partly_core": some inputs measured, the rest imputed.
+    - "imputed_only": no measured biomarker reaches the formula.
+    """
+    return dict(_coverage(_panel_key(panel_markers)))
+
+
+CORE_PANEL_PARAMETER_COVERAGE = parameter_coverage(CORE_PANEL_MARKERS)
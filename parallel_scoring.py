@@ -0,0 +1,164 @@
+"""
+Parallel Scoring Module
+Multi-core cohort scoring with shared-memory buffers.
+
+The (N, 47) input and the (N, 37) parameter / (N, 3) λ-correction outputs live in
+multiprocessing.shared_memory blocks. Each worker attaches once, scores row
+slices in place and writes its rows directly into the output block; only slice
+bounds are sent between processes, so nothing is pickled per patient and the
+result order is fixed by row index regardless of which worker finishes first.
+"""
+
+import os
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from batch_calculations import (
+    GROWTH_HIERARCHY,
+    biomarkers_to_array,
+    calculate_all_parameters_batch,
+)
+from biomarkers_data import BIOMARKER_KEYS
+from calculations import PARAMETER_NAMES, calculate_all_parameters
+
+# Slices are sized from the worker count: several tasks per worker keep the load
+# balanced, and a cap bounds the memory of one vectorized slice on large cohorts.
+SLICES_PER_WORKER = 4
+MAX_SLICE_ROWS = 50_000
+# With the default worker count, small cohorts use fewer processes than cores
+MIN_ROWS_PER_WORKER = 1_000
+
+_WORKER = {}
+
+
+def _shared_array(shape, dtype, data=None):
+    """Allocate a shared-memory block and an ndarray view on it (optionally filled from data)."""
+    dtype = np.dtype(dtype)
+    shm = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if data is not None:
+        array[...] = data
+    return shm, array
+
+
+def _attach(specs, core_markers, engine):
+    """Worker initializer: map the shared blocks once per process."""
+    _WORKER['blocks'] = []
+    for key, (name, shape, dtype) in specs.items():
+        shm = SharedMemory(name=name)
+        _WORKER['blocks'].append(shm)
+        _WORKER[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _WORKER['core_markers'] = core_markers
+    _WORKER['engine'] = engine
+
+
+def _score_rows(X, parameters, violations, start, stop, core_markers, engine):
+    """Score rows [start, stop) of X into the output arrays."""
+    if engine == 'scalar':
+        for i in range(start, stop):
+            row = {k: v for k, v in zip(BIOMARKER_KEYS, X[i].tolist()) if v == v}  # drop NaN (missing)
+            result = calculate_all_parameters(row, core_markers=core_markers)
+            parameters[i] = [result['parameters'][n] for n in PARAMETER_NAMES]
+            fired = set(result['constraint_violations'])
+            violations[i] = [message in fired for _, _, message in GROWTH_HIERARCHY]
+        return
+    batch = calculate_all_parameters_batch(X[start:stop], core_markers=core_markers)
+    parameters[start:stop] = batch['parameters']
+    violations[start:stop] = batch['constraint_violations']
+
+
+def _score_slice(bounds):
+    start, stop = bounds
+    _score_rows(
+        _WORKER['X'], _WORKER['parameters'], _WORKER['violations'],
+        start, stop, _WORKER['core_markers'], _WORKER['engine'],
+    )
+    return stop - start
+
+
+def plan_slices(n, workers=None, slice_rows=None):
+    """
+    Split n rows into tasks for a worker pool.
+
+    Explicit workers are used as given (capped at n); the default is os.cpu_count(),
+    capped so each process gets at least MIN_ROWS_PER_WORKER rows. Unless slice_rows
+    overrides it, each worker gets about SLICES_PER_WORKER slices of at most
+    MAX_SLICE_ROWS rows.
+
+    Returns:
+        (workers, [(start, stop), ...]) with slices in row order.
+    """
+    if n == 0:
+        return 1, []
+    if workers is None:
+        workers = min(os.cpu_count() or 1, -(-n // MIN_ROWS_PER_WORKER))
+    workers = max(1, min(workers, n))
+    if slice_rows is None:
+        slice_rows = min(MAX_SLICE_ROWS, -(-n // (workers * SLICES_PER_WORKER)))
+    slices = [(start, min(n, start + slice_rows)) for start in range(0, n, slice_rows)]
+    return min(workers, len(slices)), slices
+
+
+def score_parallel(data, core_markers=None, workers=None, slice_rows=None, engine='batch'):
+    """
+    Score a cohort across worker processes.
+
+    Args:
+        data: (N, 47) array or anything accepted by biomarkers_to_array (NaN = missing).
+        core_markers: optional panel (Core / Optimized), as in calculate_all_parameters.
+        workers: number of processes (default: os.cpu_count(), fewer for small
+            cohorts); 1 scores in-process.
+        slice_rows: optional rows per task; by default sized from the worker
+            count (see plan_slices).
+        engine: 'batch' (vectorized formulas per slice) or 'scalar'
+            (calculate_all_parameters per patient); both give identical values.
+
+    Returns:
+        dict with 'parameters' (N, 37), 'constraint_violations' (N, 3) boolean mask,
+        'parameter_names' and 'constraint_messages', rows in input order.
+    """
+    if engine not in ('batch', 'scalar'):
+        raise ValueError(f"Unknown engine: {engine}")
+    X = biomarkers_to_array(data)
+    n = len(X)
+    workers, slices = plan_slices(n, workers, slice_rows)
+    core_markers = list(core_markers) if core_markers else None
+    out = {
+        'parameter_names': PARAMETER_NAMES,
+        'constraint_messages': tuple(message for _, _, message in GROWTH_HIERARCHY),
+    }
+
+    if workers == 1:
+        parameters = np.empty((n, len(PARAMETER_NAMES)))
+        violations = np.empty((n, len(GROWTH_HIERARCHY)), dtype=bool)
+        for start, stop in slices:
+            _score_rows(X, parameters, violations, start, stop, core_markers, engine)
+        out.update({'parameters': parameters, 'constraint_violations': violations})
+        return out
+
+    blocks, views = [], {}
+    try:
+        for key, shape, dtype, fill in (
+            ('X', X.shape, np.float64, X),
+            ('parameters', (n, len(PARAMETER_NAMES)), np.float64, None),
+            ('violations', (n, len(GROWTH_HIERARCHY)), np.bool_, None),
+        ):
+            shm, views[key] = _shared_array(shape, dtype, fill)
+            blocks.append(shm)
+        specs = {key: (shm.name, views[key].shape, views[key].dtype) for key, shm in zip(views, blocks)}
+        with get_context().Pool(workers, initializer=_attach, initargs=(specs, core_markers, engine)) as pool:
+            done = sum(pool.imap_unordered(_score_slice, slices))
+        if done != n:
+            raise RuntimeError(f"Parallel scoring covered {done} of {n} rows")
+        out.update({
+            'parameters': views['parameters'].copy(),
+            'constraint_violations': views['violations'].copy(),
+        })
+        return out
+    finally:
+        views.clear()  # release buffer exports before closing the blocks
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
@@ -8,7 +8,9 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Mapping, Optional, Any
+
+from records import BiomarkerVector, as_biomarker_vector
 
 # Storage directory (relative to project root)
 PATIENT_DATA_DIR = Path(__file__).parent / "patient_data"
@@ -21,14 +23,17 @@ def _sanitize_id(patient_id: str) -> str:
 
 
 def save_patient(
-    biomarkers: Dict[str, float],
+    biomarkers: Mapping[str, float],
     patient_id: str = "",
     patient_name: str = "",
     notes: str = "",
     panel_type: str = "full",
+    category: Optional[str] = None,
 ) -> str:
     """
     Save patient biomarker data with metadata.
+    category (e.g. the tumor subtype) is stored when given; imputation.CohortImputer
+    uses it for category-specific medians.
     Returns the stored record ID.
     """
     if not patient_id and not patient_name:
@@ -44,8 +49,10 @@ def save_patient(
         "date": datetime.now().isoformat(),
         "notes": notes,
         "panel_type": panel_type,
-        "biomarkers": biomarkers,
+        "biomarkers": dict(biomarkers),
     }
+    if category:
+        record["category"] = category
 
     filepath = PATIENT_DATA_DIR / f"{patient_id}.json"
     with open(filepath, "w", encoding="utf-8") as f:
@@ -91,9 +98,16 @@ def delete_patient(patient_id: str) -> bool:
     return False
 
 
+def _json_default(value):
+    """json.dumps fallback: mappings such as BiomarkerVector serialize as plain dicts."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 def export_to_json(record: Dict[str, Any]) -> str:
     """Serialize a patient record to JSON string for download."""
-    return json.dumps(record, indent=2, ensure_ascii=False)
+    return json.dumps(record, indent=2, ensure_ascii=False, default=_json_default)
 
 
 def import_from_json(json_str: str) -> Optional[Dict[str, Any]]:
@@ -107,6 +121,6 @@ def import_from_json(json_str: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def load_record_for_import(record: Dict[str, Any]) -> Dict[str, float]:
-    """Extract biomarkers dict from a loaded/imported record."""
-    return record.get("biomarkers", {})
+def load_record_for_import(record: Dict[str, Any]) -> BiomarkerVector:
+    """Extract the biomarkers of a loaded/imported record as a BiomarkerVector."""
+    return as_biomarker_vector(record.get("biomarkers", {}))
@@ -15,12 +15,15 @@ from patient_data import (
     load_record_for_import,
 )
 from patient_comparison import compute_comparison, get_summary_stats
+from records import BiomarkerVector
 
 
 def _apply_biomarkers_to_session(biomarkers: dict):
     """Load biomarkers into session state and clear widget cache for refresh."""
     from biomarkers_data import ALL_BIOMARKERS
-    st.session_state.biomarkers = {k: float(biomarkers.get(k, 0) or 0) for k in ALL_BIOMARKERS}
+    st.session_state.biomarkers = BiomarkerVector.from_mapping(
+        {k: float(biomarkers.get(k, 0) or 0) for k in ALL_BIOMARKERS}
+    )
     for key in ALL_BIOMARKERS:
         widget_key = f"input_{key}"
         if widget_key in st.session_state:
@@ -33,7 +36,7 @@ def display_patient_save_load():
     Returns (load_triggered, loaded_biomarkers) or (False, None).
     """
     patients = list_patients()
-    panel_type = "core" if st.session_state.get("panel_core_markers") else "full"
+    panel_type = st.session_state.get("panel_name", "full")
 
     with st.sidebar.expander("Patient data", expanded=True):
         st.caption("Save, load, or compare biomarker records")
@@ -44,6 +47,8 @@ def display_patient_save_load():
                 pid = st.text_input("Patient ID (optional)", placeholder="e.g. P001")
                 pname = st.text_input("Patient name (optional)", placeholder="e.g. John Doe")
                 notes = st.text_area("Notes (optional)", placeholder="Visit, treatment, etc.")
+                category = st.text_input("Category (optional)", placeholder="e.g. luminal, HER2+, TNBC",
+                                         help="Used for category-specific median imputation")
                 if st.button("Save"):
                     rid = save_patient(
                         st.session_state.biomarkers,
@@ -51,6 +56,7 @@ def display_patient_save_load():
                         patient_name=pname or None,
                         notes=notes,
                         panel_type=panel_type,
+                        category=category.strip() or None,
                     )
                     st.success(f"Saved as {rid}")
                     st.rerun()
@@ -82,7 +88,7 @@ def display_patient_save_load():
                 "date": __import__("datetime").datetime.now().isoformat(),
                 "notes": "",
                 "panel_type": panel_type,
-                "biomarkers": st.session_state.biomarkers,
+                "biomarkers": dict(st.session_state.biomarkers),
             }
             json_str = export_to_json(rec)
             st.download_button(
@@ -0,0 +1,149 @@
+"""
+Pharmacokinetics Module
+Closed-form solution of the drug compartments between dosing events.
+
+D and Dₘ obey a linear system with constant coefficients,
+
+    dD/dt  = dose_rate − (k_el + k_metabolism) D
+    dDₘ/dt = k_metabolism D − k_clearance Dₘ
+
+and nothing else in the Chapter 4 system feeds back into them. With the
+dose rate constant between events (a schedules.DosingSchedule piece) they are
+known exactly from their values at the start of the piece:
+
+    D(t)  = D* + (D₀ − D*) e^{−a τ}
+    Dₘ(t) = Dₘ₀ e^{−c τ} + m [(D₀ − D*) ψ(a, c, τ) + D* φ(c, τ)]
+
+with τ = t − t₀, a = k_el + k_metabolism > 0, m = k_metabolism,
+c = k_clearance, D* = dose_rate / a, φ(k, τ) = (1 − e^{−k τ})/k and
+ψ(a, c, τ) = (e^{−a τ} − e^{−c τ})/(c − a) = e^{−a τ} φ(c − a, τ) (φ is
+evaluated without cancellation as k τ → 0, so c = a needs no special case).
+
+simulate_patient(..., pk='analytic') integrates only the other 13 states and
+feeds D and Dₘ to their equations as these functions of time, so the drug
+time scales no longer limit the step size; outputs, reducers and events still
+see the full 15-state trajectory.
+"""
+
+import math
+
+import numpy as np
+
+from simulation import (
+    CONTROL_NAMES,
+    MODEL_PARAMETER_KEYS,
+    STATE_INDEX,
+    STATE_NAMES,
+    _derivatives,
+    _StateTransform,
+    pack_parameters,
+)
+
+PK_STATES = ('D', 'Dm')
+# D precedes Dₘ, so inserting them in this order restores STATE_NAMES order
+_D, _DM = STATE_INDEX['D'], STATE_INDEX['Dm']
+# The states still integrated numerically, in STATE_NAMES order
+_REST = np.array([i for i, name in enumerate(STATE_NAMES) if name not in PK_STATES])
+_REST_LIST = _REST.tolist()
+_DOSE = CONTROL_NAMES.index('dose_rate')
+# Below this |k τ| the series of φ is used instead of expm1(−k τ)/k
+_SERIES = 1e-8
+
+
+def pk_rates(parameters):
+    """(a, m, c) = (k_el + k_metabolism, k_metabolism, k_clearance) of one patient or a cohort."""
+    p = pack_parameters(parameters)
+    kel, k_metabolism, k_clearance = (p[..., MODEL_PARAMETER_KEYS.index(k)]
+                                      for k in ('kel', 'k_metabolism', 'k_clearance'))
+    return kel + k_metabolism, k_metabolism, k_clearance
+
+
+def _phi(k, tau):
+    """(1 − e^{−k τ})/k, → τ as k τ → 0."""
+    x = k * tau
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(np.abs(x) < _SERIES, tau * (1 - 0.5 * x), -np.expm1(-x) / k)
+
+
+def _phi_scalar(k, tau):
+    x = k * tau
+    return tau * (1 - 0.5 * x) if abs(x) < _SERIES else -math.expm1(-x) / k
+
+
+def propagate(D0, Dm0, dose_rate, tau, rates):
+    """
+    Exact (D, Dₘ) a time tau after (D0, Dm0) under a constant dose_rate.
+
+    Args:
+        tau: elapsed time(s) (scalar or array, broadcast with the rest).
+        rates: (a, m, c) from pk_rates.
+
+    Returns:
+        (D, Dm) arrays.
+    """
+    a, m, c = rates
+    tau = np.asarray(tau, dtype=float)
+    steady = dose_rate / a
+    decay = np.exp(-a * tau)
+    D = steady + (D0 - steady) * decay
+    Dm = Dm0 * np.exp(-c * tau) + m * ((D0 - steady) * decay * _phi(c - a, tau) + steady * _phi(c, tau))
+    return D, Dm
+
+
+class AnalyticPK(_StateTransform):
+    """
+    One piece of a run with D and Dₘ in closed form from (t0, y0).
+
+    rhs(t, x) is the 13-state system seen by the solver (x = y without D and
+    Dₘ, in state_names order); expand(t, x) rebuilds the 15 states.
+
+    Args:
+        parameters: one patient's parameters.
+        schedule: the piece's schedule (its dose rate must be constant).
+        t0, y0: start of the piece (after any bolus) and the full state there.
+    """
+
+    def __init__(self, parameters, schedule, t0, y0):
+        self.t0 = float(t0)
+        self.D0, self.Dm0 = float(y0[_D]), float(y0[_DM])
+        # Controls are constant on a piece: unpack them and the parameters once
+        self._controls = np.asarray(schedule(self.t0), dtype=float).tolist()
+        p = pack_parameters(parameters)
+        self._p = p.tolist()
+        self.dose_rate = self._controls[_DOSE]
+        self.rates = tuple(float(r) for r in pk_rates(p))
+        self.state_names = tuple(STATE_NAMES[i] for i in _REST_LIST)
+
+    def transform(self, y):
+        """The integrated states of y (..., 15) -> (..., 13)."""
+        return np.asarray(y)[..., _REST]
+
+    def expand(self, t, x):
+        """
+        Full states from integrated ones: t scalar with x (13,), or t (n,) with
+        x (n, 13). Rows of x that are not finite stay NaN.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.empty(x.shape[:-1] + (len(STATE_NAMES),))
+        y[..., _REST] = x
+        y[..., _D], y[..., _DM] = propagate(self.D0, self.Dm0, self.dose_rate, np.asarray(t) - self.t0, self.rates)
+        if x.ndim > 1:
+            y[~np.isfinite(x).all(axis=-1)] = np.nan
+        return y
+
+    def rhs(self, t, x):
+        a, m, c = self.rates
+        tau = t - self.t0
+        steady = self.dose_rate / a
+        decay = math.exp(-a * tau)
+        y = x.tolist()
+        y.insert(_D, steady + (self.D0 - steady) * decay)
+        y.insert(_DM, self.Dm0 * math.exp(-c * tau) + m * ((self.D0 - steady) * decay * _phi_scalar(c - a, tau)
+                                                           + steady * _phi_scalar(c, tau)))
+        f = _derivatives(y, self._p, self._controls)
+        return np.array([f[i] for i in _REST_LIST])
+
+    def jacobian(self, jac):
+        """J(t, x) of the 13-state system from the full jac(t, y) (D and Dₘ are functions of t, not states)."""
+        block = np.ix_(_REST, _REST)
+        return lambda t, x: jac(t, self.expand(t, x))[block]
@@ -0,0 +1,151 @@
+"""
+Record Types Module
+Compact array-backed biomarker and parameter records.
+
+BiomarkerVector and ParameterSet store their values in one float64 array with a
+fixed column order (ALL_BIOMARKERS / the calculate_all_parameters keys) instead of
+a dict of Python floats, and behave as mutable mappings so code written against
+Dict[str, float] keeps working. NaN marks an absent entry: it is skipped by
+iteration and len(), and .get(key, default) returns the default for it. A typed
+0.0 is a value like any other.
+
+ParameterSet is opt-in: calculate_all_parameters and the other public result
+builders return plain dicts (JSON-serializable, NaN kept as a value); wrap one
+with ParameterSet.from_mapping(result['parameters']) to hold many results compactly.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from biomarkers_data import BIOMARKER_KEYS, BIOMARKER_INDEX
+from calculations import PARAMETER_NAMES
+
+
+class _ArrayRecord(MutableMapping):
+    """Mapping over a fixed key tuple backed by a float64 array (NaN = absent)."""
+
+    __slots__ = ('_values',)
+    KEYS = ()
+    INDEX = {}
+
+    def __init__(self, values=None):
+        if isinstance(values, np.ndarray):
+            if values.shape != (len(self.KEYS),):
+                raise ValueError(f"Expected shape ({len(self.KEYS)},), got {values.shape}")
+            self._values = values.astype(float, copy=True)
+            return
+        self._values = np.full(len(self.KEYS), np.nan)
+        if values:
+            self.update(values)
+
+    @classmethod
+    def from_array(cls, values: np.ndarray):
+        """Wrap a row without copying (e.g. a row of a batch result)."""
+        record = cls.__new__(cls)
+        record._values = values
+        return record
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping):
+        """Build from any mapping in one pass over KEYS (keys outside KEYS are ignored)."""
+        return cls.from_array(np.array([mapping.get(k, np.nan) for k in cls.KEYS], dtype=float))
+
+    @property
+    def array(self) -> np.ndarray:
+        """Underlying (len(KEYS),) array in KEYS order; NaN = absent."""
+        return self._values
+
+    def __getitem__(self, key):
+        value = self._values[self.INDEX[key]]
+        if value != value:
+            raise KeyError(key)
+        return float(value)
+
+    def __setitem__(self, key, value):
+        idx = self.INDEX.get(key)
+        if idx is None:
+            raise KeyError(f"{key!r} is not a {type(self).__name__} key")
+        self._values[idx] = np.nan if value is None else value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._values[self.INDEX[key]] = np.nan
+
+    def __contains__(self, key):
+        idx = self.INDEX.get(key)
+        return idx is not None and not np.isnan(self._values[idx])
+
+    def __iter__(self) -> Iterator[str]:
+        keys = self.KEYS
+        return (keys[i] for i in np.flatnonzero(~np.isnan(self._values)))
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self._values)))
+
+    def get(self, key, default=None):
+        idx = self.INDEX.get(key)
+        if idx is None:
+            return default
+        value = self._values[idx]
+        return default if value != value else float(value)
+
+    def copy(self):
+        return type(self).from_array(self._values.copy())
+
+    def to_dict(self) -> Dict[str, float]:
+        """Plain dict of present entries (for JSON and Streamlit widgets)."""
+        return {self.KEYS[i]: float(self._values[i]) for i in np.flatnonzero(~np.isnan(self._values))}
+
+    def __eq__(self, other):
+        if isinstance(other, _ArrayRecord) and type(other) is type(self):
+            return bool(np.array_equal(self._values, other._values, equal_nan=True))
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __getstate__(self):
+        return self._values
+
+    def __setstate__(self, state):
+        self._values = state
+
+
+class BiomarkerVector(_ArrayRecord):
+    """The 47 biomarkers of one patient in ALL_BIOMARKERS order."""
+
+    __slots__ = ()
+    KEYS = BIOMARKER_KEYS
+    INDEX = BIOMARKER_INDEX
+
+
+# calculate_all_parameters reports G first and α_acid last around the 37 parameters
+PARAMETER_SET_KEYS = ('G',) + tuple(PARAMETER_NAMES) + ('alpha_acid',)
+
+
+class ParameterSet(_ArrayRecord):
+    """The 37 parameters plus G and α_acid, in calculate_all_parameters order."""
+
+    __slots__ = ()
+    KEYS = PARAMETER_SET_KEYS
+    INDEX = {key: idx for idx, key in enumerate(PARAMETER_SET_KEYS)}
+
+    @property
+    def core(self) -> np.ndarray:
+        """The 37 model parameters in PARAMETER_NAMES order (view)."""
+        return self._values[1:-1]
+
+
+def as_biomarker_vector(biomarkers: Optional[Mapping]) -> BiomarkerVector:
+    """Return biomarkers as a BiomarkerVector (no copy if it already is one); unknown keys are dropped."""
+    if isinstance(biomarkers, BiomarkerVector):
+        return biomarkers
+    values = {k: (np.nan if v is None else v) for k, v in (biomarkers or {}).items()}
+    return BiomarkerVector.from_mapping(values)
@@ -7,8 +7,10 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
-from calculations import assess_mathematical_stability
+from simulation import pack_parameters
+from stability import analyze_stability, stability_message
 from calculations import calculate_composite_scores
+from panels import PANELS, PROVISIONAL_PANEL_NOTE
 
 def display_results(calc_results, biomarkers, progress):
     """
@@ -20,6 +22,8 @@ def display_results(calc_results, biomarkers, progress):
     violations = calc_results['constraint_violations']
     imputed_core = calc_results.get('imputed_core_panel', False)
     parameter_coverage = calc_results.get('parameter_coverage') or {}
+    # Set by dependency_graph.recalculate_incremental: parameters whose value changed with the last edit
+    changed_parameters = set(calc_results.get('changed_parameters') or ())
 
     def _core_badge(key):
         """When Core panel is used, show Core-informed / Partly Core / Reference only per parameter."""
@@ -34,16 +38,27 @@ def display_results(calc_results, biomarkers, progress):
             return " — 📕 Reference only"
         return ""
 
+    def _badges(key):
+        """Core-panel coverage badge plus a marker on parameters updated by the last biomarker edit."""
+        return _core_badge(key) + (" — 🔄 Updated" if key in changed_parameters else "")
+
     st.header("📊 Calculation Results")
     st.subheader("Personalized Model Parameters Derived from Blood Biomarkers")
     if imputed_core:
+        n_panel = len(st.session_state.get("panel_core_markers") or []) or 15
+        panel_r2 = st.session_state.get("panel_r2", 0.87)
+        panel = PANELS.get(st.session_state.get("panel_name"), {})
+        validation = (
+            PROVISIONAL_PANEL_NOTE.format(r2=panel_r2) if panel.get('provisional')
+            else f"validation R² ≈ {panel_r2} for this panel (Chapter 4)."
+        )
         st.info(
-            "**Core Panel used:** Parameters were calculated from your 15 entered biomarkers. "
-            "The other 32 biomarkers were imputed to reference values (per Chapter 4 preprocessing: "
-            "imputation of missing values). Same Chapter 4 formulas; validation R² ≈ 0.87 for this panel (Chapter 4)."
+            f"**Reduced panel used:** Parameters were calculated from your {n_panel} entered biomarkers. "
+            f"The other {len(biomarkers) - n_panel} biomarkers were imputed to reference values (per Chapter 4 preprocessing: "
+            f"imputation of missing values). Same Chapter 4 formulas; {validation}"
         )
         st.caption(
-            "**Parameter labels (Core panel):** 📗 Core-informed = main inputs from your 15 biomarkers. "
+            f"**Parameter labels (reduced panel):** 📗 Core-informed = main inputs from your {n_panel} biomarkers. "
             "📙 Partly Core = some inputs from Core, some imputed. 📕 Reference only = all inputs imputed (consider Full panel for these)."
         )
     # Progress summary
@@ -55,6 +70,12 @@ def display_results(calc_results, biomarkers, progress):
     with col3:
         st.metric("Model Confidence", f"{calculate_confidence(biomarkers):.1f}%")
     
+    if changed_parameters:
+        st.caption(
+            f"🔄 Your last edit changed {len(changed_parameters)} parameter(s), marked Updated below; "
+            "the others were reused from the previous calculation."
+        )
+
     # Constraint violations warning
     if violations:
         st.warning(f"⚠️ Constraint Violations (auto-corrected): {', '.join(violations)}")
@@ -98,7 +119,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in param_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
     
@@ -146,7 +167,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in immune_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
     
@@ -176,7 +197,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in resistance_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
     
@@ -230,7 +251,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in treatment_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             if 'sub_formulas' in info:
                 st.write("**Where:**")
@@ -264,7 +285,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in pk_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
     
@@ -324,7 +345,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in micro_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
     
@@ -372,7 +393,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in genetic_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
     
@@ -396,7 +417,7 @@ def display_results(calc_results, biomarkers, progress):
     }
     
     for key, info in immune_sens_formulas.items():
-        with st.expander(f"**{info['name']}** = {info['value']}{_core_badge(key)}", expanded=False):
+        with st.expander(f"**{info['name']}** = {info['value']}{_badges(key)}", expanded=False):
             st.latex(info['formula'])
             st.caption(info['source'])
 
@@ -635,12 +656,21 @@ def display_resistance_monitoring(parameters, biomarkers):
         st.caption("Reference (synthetic cohort): < 0.002")
 
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def _stability_analysis(packed_parameters):
+    """analyze_stability for a tuple of packed model parameters, cached across reruns."""
+    return analyze_stability(packed_parameters)
+
+
 def display_stability_assessment(parameters):
     """
-    Display mathematical stability assessment based on Chapter 4 parameters.
+    Display mathematical stability assessment: equilibria of the 15-ODE system and
+    the eigenvalues of the Jacobian at each (Chapter 4 stability analysis).
     """
     st.subheader("🧮 Mathematical Stability Analysis")
-    stability_status, message = assess_mathematical_stability(parameters)
+    # The multi-start Newton search takes ~0.1 s; rerun it only when the parameters change
+    analysis = _stability_analysis(tuple(pack_parameters(parameters).tolist()))
+    stability_status, message = stability_message(analysis)
 
     if stability_status == "STABLE":
         st.success(message)
@@ -652,7 +682,27 @@ def display_stability_assessment(parameters):
         st.error(message)
         st.write("Clinical Implication: Aggressive disease likely, require frequent reassessment")
 
-    st.caption("Based on 46.7% stability rate from 5,000 synthetic patient analysis.")
+    if analysis['equilibria']:
+        rows = [
+            {
+                'Tumor burden (N_total)': e['tumor_burden'],
+                'Classification': e['classification'],
+                'Stable eigenvalues': f"{e['n_stable']}/{len(e['eigenvalues'])}",
+                'Max Re(λ)': e['max_real'],
+                'Trace': e['trace'],
+                'Determinant': e['determinant'],
+                'Condition number': e['condition_number'],
+            }
+            for e in analysis['equilibria']
+        ]
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+    st.caption(
+        "Non-negative equilibria of the untreated 15-ODE system (multi-start Newton), classified by the "
+        "eigenvalues of the analytic Jacobian (stable: all Re λ < -1e-6; unstable: any Re λ > 1e-6; "
+        "marginal: largest Re λ within ±1e-6 of zero). Chapter 4 reports 46.7% of "
+        "synthetic parameter sets fully stable."
+    )
 
 
 def generate_clinical_report(biomarkers, parameters, patient_id: str = ""):
@@ -0,0 +1,186 @@
+"""
+Schedules Module
+Dosing schedules for the 15-state system: bolus, infusion, cyclic and holiday
+regimens over the controls (u_E, u_C, u_H, u_I, dose_rate).
+
+A DosingSchedule holds piecewise-constant treatment windows (their controls
+add up where they overlap), instantaneous boluses into the drug compartment D,
+and holidays during which every control is zero and no bolus is given. It is
+called like any other schedule (t -> controls, for a scalar time or an array
+of times), and it also lists its dosing events so simulation.simulate_patient
+and simulate_cohort can integrate between them and restart exactly at each
+event instead of stepping across the discontinuity.
+
+Example (u_H = 1 on days 0-21 of each 28-day cycle):
+    cyclic(treatment_window(0.0, 21.0, u_H=1.0), period=28.0)
+
+protocol_schedule builds the five Chapter 5 protocols (PROTOCOLS). Chapter 5
+gives each protocol its own η_H; here the patient's η_H comes from the
+biomarkers, so the protocol's η_H is folded into u_H relative to the
+Continuous protocol (η_H = 0.8), which keeps u_H = 1.
+"""
+
+import numpy as np
+
+from simulation import CONTROL_NAMES, DEFAULT_T_SPAN
+
+# Cycle length of the Chapter 5 Standard protocol (days)
+STANDARD_CYCLE = 28.0
+
+PROTOCOLS = ('Continuous', 'Adaptive', 'Standard', 'Hyperthermia', 'Combined')
+# Protocol η_H values are expressed relative to the Continuous protocol's
+CONTINUOUS_ETA_H = 0.8
+# Hyperthermia: two 60-minute sessions per week at T_hyper = 0.5
+HYPERTHERMIA_SESSION = 1.0 / 24.0
+HYPERTHERMIA_DAYS = (0.0, 3.5)
+T_HYPER = 0.5
+
+
+def _controls(u_E=0.0, u_C=0.0, u_H=0.0, u_I=0.0, dose_rate=0.0):
+    return np.array([u_E, u_C, u_H, u_I, dose_rate], dtype=float)
+
+
+class DosingSchedule:
+    """
+    Piecewise-constant controls plus boluses.
+
+    Args:
+        windows: sequence of (start, end, controls) with controls a (5,) vector
+            in CONTROL_NAMES order, active on [start, end).
+        boluses: sequence of (time, amount); amount is added to D at time.
+        holidays: sequence of (start, end) intervals with all treatment paused.
+    """
+
+    def __init__(self, windows=(), boluses=(), holidays=()):
+        self.windows = tuple((float(s), float(e), np.asarray(c, dtype=float)) for s, e, c in windows)
+        self.boluses = tuple(sorted((float(t), float(a)) for t, a in boluses))
+        self.holidays = tuple((float(s), float(e)) for s, e in holidays)
+        for start, end, controls in self.windows:
+            if end <= start or controls.shape != (len(CONTROL_NAMES),):
+                raise ValueError(f"Invalid treatment window ({start}, {end}, {controls})")
+        for start, end in self.holidays:
+            if end <= start:
+                raise ValueError(f"Invalid holiday ({start}, {end})")
+
+        # Controls are constant between consecutive change times; _table[k] holds
+        # the controls on [_times[k - 1], _times[k]) (row 0: before the first change)
+        edges = [s for s, _, _ in self.windows] + [e for _, e, _ in self.windows]
+        edges += [s for s, _ in self.holidays] + [e for _, e in self.holidays]
+        self._times = np.unique([t for t in edges if np.isfinite(t)])
+        left = np.concatenate([[-np.inf], self._times])
+        self._table = np.array([self._controls_at(t) for t in left]).reshape(len(left), len(CONTROL_NAMES))
+        self._table.setflags(write=False)
+
+    def _on_holiday(self, t):
+        return any(start <= t < end for start, end in self.holidays)
+
+    def _controls_at(self, t):
+        controls = np.zeros(len(CONTROL_NAMES))
+        if not self._on_holiday(t):
+            for start, end, c in self.windows:
+                if start <= t < end:
+                    controls = controls + c
+        return controls
+
+    def __call__(self, t):
+        """Controls at t: (5,) for a scalar time, (n, 5) for an array of times."""
+        return self._table[np.searchsorted(self._times, t, side='right')]
+
+    def __add__(self, other):
+        if not isinstance(other, DosingSchedule):
+            return NotImplemented
+        return DosingSchedule(self.windows + other.windows, self.boluses + other.boluses,
+                              self.holidays + other.holidays)
+
+    def doses(self, t0, tf):
+        """Boluses given in [t0, tf) as (time, amount) pairs (holidays skipped)."""
+        return [(t, a) for t, a in self.boluses if t0 <= t < tf and not self._on_holiday(t)]
+
+    def events(self, t0, tf):
+        """Sorted times in (t0, tf) where the controls change or a bolus is given."""
+        times = [t for t in self._times if t0 < t < tf]
+        times += [t for t, _ in self.doses(t0, tf) if t > t0]
+        controls = self(np.array(times))
+        before = self(np.nextafter(np.array(times), -np.inf))
+        bolus_times = {t for t, _ in self.doses(t0, tf)}
+        return sorted({t for t, c, b in zip(times, controls, before) if t in bolus_times or np.any(c != b)})
+
+    def pieces(self, t0, tf):
+        """
+        The schedule split at its events: a list of (start, end, controls, bolus)
+        covering [t0, tf], with constant controls on each piece and the bolus
+        amount (possibly 0) to add to D at its start.
+        """
+        cuts = [float(t0)] + self.events(t0, tf) + [float(tf)]
+        amounts = {}
+        for t, amount in self.doses(t0, tf):
+            amounts[t] = amounts.get(t, 0.0) + amount
+        return [(a, b, self(a), amounts.get(a, 0.0)) for a, b in zip(cuts[:-1], cuts[1:])]
+
+    def __repr__(self):
+        return (f"DosingSchedule({len(self.windows)} windows, {len(self.boluses)} boluses, "
+                f"{len(self.holidays)} holidays)")
+
+
+def treatment_window(start=0.0, end=np.inf, u_E=0.0, u_C=0.0, u_H=0.0, u_I=0.0, dose_rate=0.0):
+    """Constant controls on [start, end)."""
+    return DosingSchedule(windows=[(start, end, _controls(u_E, u_C, u_H, u_I, dose_rate))])
+
+
+def infusion(rate, start=0.0, duration=np.inf, **controls):
+    """Infusion of rate (D units per day) over [start, start + duration), with optional u_* controls."""
+    return treatment_window(start, start + duration, dose_rate=rate, **controls)
+
+
+def bolus(times, amount):
+    """Instantaneous doses of amount into D at each of times."""
+    return DosingSchedule(boluses=[(t, amount) for t in np.atleast_1d(times)])
+
+
+def cyclic(cycle, period=STANDARD_CYCLE, n_cycles=None, start=0.0, until=DEFAULT_T_SPAN[1]):
+    """
+    Repeat cycle (a DosingSchedule defined on [0, period)) every period days
+    from start, for n_cycles cycles or until the horizon `until`.
+    """
+    if period <= 0:
+        raise ValueError("period must be positive")
+    if n_cycles is None:
+        n_cycles = int(np.ceil((until - start) / period))
+    windows, boluses, holidays = [], [], []
+    for k in range(n_cycles):
+        offset = start + k * period
+        end = offset + period
+        windows += [(offset + s, min(offset + e, end), c) for s, e, c in cycle.windows if s < period]
+        boluses += [(offset + t, a) for t, a in cycle.boluses if t < period]
+        holidays += [(offset + s, min(offset + e, end)) for s, e in cycle.holidays if s < period]
+    return DosingSchedule(windows, boluses, holidays)
+
+
+def with_holidays(schedule, holidays):
+    """schedule with treatment paused over each (start, end) in holidays."""
+    return DosingSchedule(schedule.windows, schedule.boluses, schedule.holidays + tuple(holidays))
+
+
+def _adaptive_schedule(t):
+    """Chapter 5 Adaptive protocol: u_H = 0.5 + 0.5 sin(πt/30) with η_H = 0.6 + 0.2 sin(πt/30)."""
+    phase = np.sin(np.pi * np.asarray(t, dtype=float) / 30.0)
+    controls = np.zeros(np.shape(t) + (len(CONTROL_NAMES),))
+    controls[..., CONTROL_NAMES.index('u_H')] = (0.5 + 0.5 * phase) * (0.6 + 0.2 * phase) / CONTINUOUS_ETA_H
+    return controls
+
+
+def protocol_schedule(name, until=DEFAULT_T_SPAN[1]):
+    """Schedule for one of the Chapter 5 PROTOCOLS over [0, until]."""
+    if name == 'Continuous':
+        return treatment_window(u_H=1.0)
+    if name == 'Adaptive':
+        return _adaptive_schedule
+    if name == 'Standard':
+        return cyclic(treatment_window(0.0, 21.0, u_H=0.5 / CONTINUOUS_ETA_H), STANDARD_CYCLE, until=until)
+    if name == 'Hyperthermia':
+        boost = 0.7 * 0.3 * T_HYPER / CONTINUOUS_ETA_H
+        sessions = [treatment_window(day, day + HYPERTHERMIA_SESSION, u_H=boost) for day in HYPERTHERMIA_DAYS]
+        return treatment_window(u_H=0.7 / CONTINUOUS_ETA_H) + cyclic(sum(sessions[1:], sessions[0]), 7.0, until=until)
+    if name == 'Combined':
+        return treatment_window(u_H=0.75 / CONTINUOUS_ETA_H, u_I=0.5)
+    raise ValueError(f"Unknown protocol: {name} (expected one of {PROTOCOLS})")
@@ -0,0 +1,225 @@
+"""
+Cohort Scoring CLI
+Headless scorer for lab exports: reads a CSV or JSONL file of biomarker records in
+fixed-size chunks, imputes and scores each chunk with the batch parameter engine,
+and streams parameters, composite scores, organ factors and λ-ordering flags to
+CSV or JSONL. Memory use depends on the chunk size, not on the file size.
+
+Usage:
+    python score_cohort.py labs.csv -o scored.csv
+    python score_cohort.py labs.jsonl -o - --format jsonl --panel core --id-column patient_id
+    python score_cohort.py labs.csv -o scored.csv --impute store --stratify-panel
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_calculations import GROWTH_HIERARCHY, calculate_all_parameters_batch
+from biomarkers_data import BIOMARKER_INDEX, BIOMARKER_KEYS
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Output column names for the λ-ordering auto-corrections, in GROWTH_HIERARCHY order
+VIOLATION_COLUMNS = tuple(f"corrected_{lower}" for _, lower, _ in GROWTH_HIERARCHY)
+
+
+def _detect_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return "jsonl" if str(path).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, fmt=None):
+    """Yield DataFrame chunks of at most chunk_size rows from a CSV or JSONL file ('-' = stdin)."""
+    source = sys.stdin if path == "-" else path
+    try:
+        if _detect_format(path, fmt) == "jsonl":
+            reader = pd.read_json(source, lines=True, chunksize=chunk_size)
+        else:
+            reader = pd.read_csv(source, chunksize=chunk_size)
+    except pd.errors.EmptyDataError:
+        return  # empty CSV: no header, no rows
+    with reader:
+        yield from reader
+
+
+def chunk_to_array(chunk):
+    """
+    Extract the (N, 47) biomarker array from a DataFrame chunk.
+
+    Columns are matched by biomarker key; absent columns and empty cells are NaN.
+    Returns (X, coerced), where coerced is a (47,) count per biomarker of non-empty
+    cells that were not numbers and became missing.
+    Raises ValueError when no column matches a biomarker key (e.g. misspelled headers),
+    since every row would otherwise be scored from reference values alone.
+    """
+    matched = [key for key in BIOMARKER_KEYS if key in chunk.columns]
+    if not matched:
+        raise ValueError(
+            f"No biomarker columns recognised in input (expected keys such as {', '.join(BIOMARKER_KEYS[:3])}); "
+            f"got columns: {list(chunk.columns)[:10]}"
+        )
+    X = np.full((len(chunk), len(BIOMARKER_KEYS)), np.nan)
+    coerced = np.zeros(len(BIOMARKER_KEYS), dtype=np.int64)
+    for key in matched:
+        j = BIOMARKER_INDEX[key]
+        column = chunk[key]
+        X[:, j] = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+        coerced[j] = int((column.notna().to_numpy() & np.isnan(X[:, j])).sum())
+    return X, coerced
+
+
+def score_chunk(chunk, panel_markers=None, id_columns=(), imputer=None, panel=None):
+    """
+    Score one DataFrame chunk. Biomarker columns are matched by key; absent or
+    non-numeric entries are missing and imputed (see chunk_to_array). Returns the
+    output DataFrame.
+
+    Missing values take reference values, or with an imputation.CohortImputer the
+    store medians for each row's category (the imputer's category_field column,
+    when present) and, if the imputer stratifies by panel, for the named panel.
+    """
+    X, _ = chunk_to_array(chunk)
+    return _score_array(chunk, X, panel_markers, id_columns, imputer, panel)
+
+
+def _score_array(chunk, X, panel_markers, id_columns, imputer, panel):
+    if imputer is not None:
+        if panel_markers:
+            from panels import panel_template
+            X[:, ~panel_template(panel_markers).measured] = np.nan  # outside the panel = not measured
+        categories = None
+        if imputer.category_field in chunk.columns:
+            categories = [None if pd.isna(c) else str(c) for c in chunk[imputer.category_field]]
+        X, _ = imputer.impute(X, categories=categories, panels=panel)
+        panel_markers = None
+
+    batch = calculate_all_parameters_batch(X, core_markers=panel_markers)
+
+    columns = {name: chunk[name].to_numpy() for name in id_columns}
+    columns.update(zip(batch["parameter_names"], batch["parameters"].T))
+    columns["alpha_acid"] = batch["alpha_acid"]
+    columns.update(zip(batch["score_names"], batch["scores"].T))
+    columns.update(zip(batch["organ_names"], batch["organs"].T))
+    columns.update(zip(VIOLATION_COLUMNS, batch["constraint_violations"].T))
+    return pd.DataFrame(columns, copy=False)
+
+
+def score_file(input_path, output, panel_markers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+               input_format=None, output_format="csv", id_columns=(), imputer=None, panel=None):
+    """
+    Stream-score input_path into the open text stream output (imputer and panel
+    as for score_chunk).
+    Returns a summary dict with rows, chunks, seconds, rows_per_second,
+    constraint_corrections (rows with at least one λ-ordering correction) and
+    coerced ({biomarker_key: non-numeric cells treated as missing}, non-zero only).
+    """
+    start = time.perf_counter()
+    rows = chunks = corrected = 0
+    coerced = np.zeros(len(BIOMARKER_KEYS), dtype=np.int64)
+    for chunk in read_chunks(input_path, chunk_size, input_format):
+        missing_ids = [c for c in id_columns if c not in chunk.columns]
+        if missing_ids:
+            raise ValueError(f"ID column(s) not found in input: {missing_ids}")
+        X, chunk_coerced = chunk_to_array(chunk)
+        coerced += chunk_coerced
+        scored = _score_array(chunk, X, panel_markers, id_columns, imputer, panel)
+        if output_format == "jsonl":
+            scored.to_json(output, orient="records", lines=True, double_precision=15)
+        else:
+            scored.to_csv(output, header=(chunks == 0), index=False)
+        rows += len(scored)
+        chunks += 1
+        corrected += int(scored[list(VIOLATION_COLUMNS)].any(axis=1).sum())
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "chunks": chunks,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else float("inf"),
+        "constraint_corrections": corrected,
+        "coerced": {key: int(n) for key, n in zip(BIOMARKER_KEYS, coerced) if n},
+    }
+
+
+def main(argv=None):
+    from panels import PANELS, PROVISIONAL_PANEL_NOTE
+
+    parser = argparse.ArgumentParser(description="Score a biomarker cohort (CSV/JSONL) with the Chapter 4 formulas.")
+    parser.add_argument("input", help="CSV or JSONL file with one patient per row ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' for stdout, default)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="output format (default: from output extension, else csv)")
+    parser.add_argument("--input-format", choices=("csv", "jsonl"), help="input format (default: from input extension)")
+    parser.add_argument("--panel", choices=tuple(PANELS), default="full",
+                        help="testing panel; biomarkers outside it are imputed to reference values")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk (default %(default)s)")
+    parser.add_argument("--id-column", action="append", default=[], help="input column copied to the output (repeatable)")
+    parser.add_argument("--impute", choices=("reference", "store"), default="reference",
+                        help="fill missing biomarkers with reference values (default) or with medians "
+                             "learned from saved patient records")
+    parser.add_argument("--patient-store", help="directory of saved patient records for --impute store "
+                                                "(default: the app's patient_data)")
+    parser.add_argument("--category-field", default="category",
+                        help="record field / input column holding the patient category (default %(default)s)")
+    parser.add_argument("--stratify-panel", action="store_true",
+                        help="with --impute store, use medians of records entered with the same panel")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.input == "-" and not args.input_format:
+        args.input_format = "csv"
+    output_format = args.format or (_detect_format(args.output) if args.output != "-" else "csv")
+    panel_markers = None if args.panel == "full" else PANELS[args.panel]["markers"]
+    if PANELS[args.panel]["provisional"]:
+        print(f"Note: {PROVISIONAL_PANEL_NOTE.format(r2=PANELS[args.panel]['r2'])}", file=sys.stderr)
+
+    imputer = None
+    if args.impute == "store":
+        from pathlib import Path
+        from imputation import CohortImputer
+        from patient_data import PATIENT_DATA_DIR
+
+        store = Path(args.patient_store) if args.patient_store else PATIENT_DATA_DIR
+        imputer = CohortImputer(store, category_field=args.category_field, stratify_by_panel=args.stratify_panel)
+        print(f"Imputing from {imputer.refresh():,} stored patient record(s) in {store}", file=sys.stderr)
+    elif args.patient_store or args.stratify_panel:
+        parser.error("--patient-store and --stratify-panel need --impute store")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        summary = score_file(
+            args.input, output, panel_markers, args.chunk_size,
+            args.input_format, output_format, tuple(args.id_column), imputer, args.panel,
+        )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if summary["chunks"] == 0:
+        print("Warning: input is empty; nothing was scored", file=sys.stderr)
+    if summary["coerced"]:
+        counts = ", ".join(f"{key}: {n:,}" for key, n in summary["coerced"].items())
+        print(
+            f"Warning: {sum(summary['coerced'].values()):,} non-numeric value(s) treated as missing ({counts})",
+            file=sys.stderr,
+        )
+
+    print(
+        f"Scored {summary['rows']:,} rows in {summary['chunks']} chunk(s), "
+        f"{summary['seconds']:.2f}s ({summary['rows_per_second']:,.0f} rows/s); "
+        f"λ-ordering corrected in {summary['constraint_corrections']:,} rows",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,989 @@
+"""
+Simulation Module
+Executable form of the Chapter 4 system: integrates the 15 state variables
+N₁ … H from a patient's 37 parameters plus α_acid.
+
+The right-hand side is generated from the model specification (model_spec) as
+straight-line code on state columns, so the same kernel serves a single patient
+(y of shape (15,)) and a cohort (y of shape (N, 15)).
+simulate_patient integrates one patient with an adaptive Dormand–Prince RK45
+scheme (embedded 4th-order error estimate, 4th-order dense output) and returns
+the trajectory on a dense time grid. simulate_cohort advances a whole cohort
+with the same scheme in one NumPy pass per stage: every patient keeps its own
+time and step size, and patients that finish, diverge or fail leave the active
+set so the remaining ones are not slowed down by them.
+
+Treatment enters through a schedule: a callable t -> controls in CONTROL_NAMES
+order (u_E, u_C, u_H, u_I, dose_rate). η_treat integrates the active modalities
+as Σ η_k u_k over endocrine, chemotherapy, HER2-targeted and immunotherapy.
+Bolus, infusion, cyclic and holiday regimens (schedules.DosingSchedule) are
+integrated between their dosing events, restarting at each one.
+
+Outcomes can be accumulated during the run instead of from the returned
+trajectory: reducers (outcomes.Reducer, e.g. the Chapter 5 efficacy metric) see
+every accepted step and their results are returned as 'reductions'.
+"""
+
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+from model_spec import CHAPTER4_MODEL
+
+STATE_NAMES = CHAPTER4_MODEL.state_names
+STATE_INDEX = {name: idx for idx, name in enumerate(STATE_NAMES)}
+
+# The 37 Chapter 4 parameters followed by α_acid, in packed-vector order
+MODEL_PARAMETER_KEYS = CHAPTER4_MODEL.parameter_names
+
+CONTROL_NAMES = CHAPTER4_MODEL.control_names
+
+# Version of the model equations; stored with saved trajectories (trajectory_store)
+MODEL_VERSION = 'chapter4-1.0'
+
+# Default presentation, as fractions of the carrying capacity K
+INITIAL_BURDEN = {'N1': 0.1, 'N2': 0.01, 'Q': 0.01}
+
+DEFAULT_T_SPAN = (0.0, 365.0)
+DEFAULT_RTOL = 1e-6
+DEFAULT_ATOL = 1e-8
+MAX_STEPS = 100_000
+# simulate_cohort: a patient whose |state| exceeds this is reported as diverged
+DIVERGENCE_LIMIT = 1e12
+# simulate_cohort status codes (index into COHORT_STATUS)
+COHORT_STATUS = ('finished', 'step_too_small', 'diverged', 'max_steps', 'event')
+
+# Dormand–Prince 5(4) tableau (FSAL) with the 4th-order dense-output polynomial
+_C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0])
+_A = tuple(np.array(row) for row in (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+))
+_B = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+_E = np.array([-71 / 57600, 0.0, 71 / 16695, -71 / 1920, 17253 / 339200, -22 / 525, 1 / 40])
+_P = np.array([
+    [1.0, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+    [0.0, 0.0, 0.0, 0.0],
+    [0.0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+    [0.0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+    [0.0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+    [0.0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+    [0.0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423],
+])
+_SAFETY = 0.9
+_MIN_FACTOR = 0.2
+_MAX_FACTOR = 10.0
+
+
+def pack_parameters(parameters) -> np.ndarray:
+    """
+    Parameters as a float array in MODEL_PARAMETER_KEYS order.
+
+    Accepts a mapping (dict or ParameterSet with the 37 parameters and
+    'alpha_acid'), a (38,) array, an (N, 38) array, or a sequence of mappings
+    (one per patient, giving (N, 38)).
+    """
+    if isinstance(parameters, Mapping):
+        missing = [k for k in MODEL_PARAMETER_KEYS if parameters.get(k) is None]
+        if missing:
+            raise ValueError(f"Missing model parameters: {missing}")
+        return np.array([parameters[k] for k in MODEL_PARAMETER_KEYS], dtype=float)
+    if isinstance(parameters, np.ndarray):
+        p = parameters.astype(float, copy=False)
+    else:
+        parameters = list(parameters)
+        if parameters and isinstance(parameters[0], Mapping):
+            return np.stack([pack_parameters(p) for p in parameters])
+        p = np.asarray(parameters, dtype=float)
+    if p.shape[-1] != len(MODEL_PARAMETER_KEYS) or p.ndim > 2:
+        raise ValueError(f"Expected (..., {len(MODEL_PARAMETER_KEYS)}) parameters, got shape {p.shape}")
+    return p
+
+
+def default_initial_state(parameters) -> np.ndarray:
+    """
+    Initial state for a newly presenting patient: N₁, N₂ and Q at INITIAL_BURDEN × K,
+    I₁ at its tumor-free baseline φ₁/δ_I, G at the patient's biomarker-derived G
+    (1.0 if not given), all other compartments at zero.
+    """
+    if not isinstance(parameters, (Mapping, np.ndarray)):
+        parameters = list(parameters)
+        if parameters and isinstance(parameters[0], Mapping):
+            return np.stack([default_initial_state(p) for p in parameters])
+    p = pack_parameters(parameters)
+    K = p[..., MODEL_PARAMETER_KEYS.index('K')]
+    y0 = np.zeros(p.shape[:-1] + (len(STATE_NAMES),))
+    for name, fraction in INITIAL_BURDEN.items():
+        y0[..., STATE_INDEX[name]] = fraction * K
+    y0[..., STATE_INDEX['I1']] = (
+        p[..., MODEL_PARAMETER_KEYS.index('phi1')] / p[..., MODEL_PARAMETER_KEYS.index('deltaI')]
+    )
+    G = parameters.get('G') if isinstance(parameters, Mapping) else None
+    y0[..., STATE_INDEX['G']] = 1.0 if G is None else G
+    return y0
+
+
+def constant_schedule(u_E=0.0, u_C=0.0, u_H=0.0, u_I=0.0, dose_rate=0.0):
+    """Schedule with fixed controls over the whole horizon."""
+    controls = np.array([u_E, u_C, u_H, u_I, dose_rate], dtype=float)
+    controls.setflags(write=False)
+
+    def schedule(t):
+        return controls
+
+    return schedule
+
+
+NO_TREATMENT = constant_schedule()
+
+
+# The 15 Chapter 4 equations on unpacked columns (floats for one patient, arrays
+# for a cohort), generated from model_spec.CHAPTER4_MODEL; returns the
+# derivatives in STATE_NAMES order.
+_derivatives = CHAPTER4_MODEL.rhs_kernel
+
+
+def rhs(t, y, parameters, controls=None):
+    """
+    dY/dt of the Chapter 4 system.
+
+    Args:
+        t: time in days (unused; the system is autonomous given the controls).
+        y: state of shape (15,) or (N, 15) in STATE_NAMES order.
+        parameters: anything accepted by pack_parameters ((38,) or (N, 38)).
+        controls: (5,) or (N, 5) controls in CONTROL_NAMES order (default: untreated).
+
+    Returns:
+        Array with the shape of y.
+    """
+    y = np.asarray(y, dtype=float)
+    p = pack_parameters(parameters)
+    u = np.zeros(len(CONTROL_NAMES)) if controls is None else np.asarray(controls, dtype=float)
+    if y.ndim == 1 and p.ndim == 1 and u.ndim == 1:
+        return np.array(_derivatives(y.tolist(), p.tolist(), u.tolist()))
+    columns = _derivatives(y.T, p.T, u.T)
+    return np.stack(np.broadcast_arrays(*columns), axis=-1)
+
+
+def patient_rhs(parameters, schedule=None):
+    """f(t, y) for one patient with the parameters unpacked once (fast scalar path)."""
+    p = pack_parameters(parameters)
+    if p.ndim != 1:
+        raise ValueError("patient_rhs expects a single patient's parameters")
+    p = p.tolist()
+    schedule = schedule or NO_TREATMENT
+
+    def f(t, y):
+        return np.array(_derivatives(y.tolist(), p, np.asarray(schedule(t), dtype=float).tolist()))
+
+    return f
+
+
+def _rms_norm(x):
+    return float(np.sqrt(np.mean(x * x)))
+
+
+def _initial_step(fun, t0, y0, f0, rtol, atol):
+    """Starting step from the local Lipschitz estimate (Hairer, Nørsett & Wanner, II.4)."""
+    scale = atol + np.abs(y0) * rtol
+    d0, d1 = _rms_norm(y0 / scale), _rms_norm(f0 / scale)
+    h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+    f1 = fun(t0 + h0, y0 + h0 * f0)
+    d2 = _rms_norm((f1 - f0) / scale) / h0
+    if d1 <= 1e-15 and d2 <= 1e-15:
+        h1 = max(1e-6, h0 * 1e-3)
+    else:
+        h1 = (0.01 / max(d1, d2)) ** (1 / 5)
+    return min(100 * h0, h1)
+
+
+def integrate_rk45(fun, t_span, y0, t_eval=None, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL,
+                   max_step=np.inf, first_step=None, max_steps=MAX_STEPS, on_step=None, events=None):
+    """
+    Adaptive Dormand–Prince RK45 integration of y' = fun(t, y) forward in time.
+
+    Steps are accepted when the RMS of the embedded error estimate, scaled by
+    atol + rtol·|y|, is at most 1. Outputs at t_eval are interpolated inside each
+    accepted step with the 4th-order dense-output polynomial. on_step(t, y,
+    t_new, y_new) is called after every accepted step. events (bound
+    events.Event objects, g(t, y)) are checked after every accepted step and
+    their crossings located on the dense output; a terminal one ends the run
+    at the crossing.
+
+    Returns:
+        dict with 't' (t_eval), 'y' (len(t_eval), n) (NaN beyond a failure or
+        a terminal event), 'success', 'message', 'n_steps', 'n_rejected',
+        'nfev', 't_final', 'h_next' (the step size proposed after the last
+        step, for restarts), 'events' (name -> {'t', 'y'} crossings) and
+        'terminated_by' (terminal event name or None).
+    """
+    t, tf = float(t_span[0]), float(t_span[1])
+    if tf <= t:
+        raise ValueError("t_span must be increasing")
+    y = np.array(y0, dtype=float)
+    t_eval = np.array([t, tf]) if t_eval is None else np.asarray(t_eval, dtype=float)
+    if t_eval.size and (np.any(np.diff(t_eval) < 0) or t_eval[0] < t or t_eval[-1] > tf):
+        raise ValueError("t_eval must be sorted and within t_span")
+    ys = np.full((len(t_eval), y.size), np.nan)
+
+    f = fun(t, y)
+    nfev = 1
+    if first_step is None:
+        h = _initial_step(fun, t, y, f, rtol, atol)
+        nfev += 1
+    else:
+        h = float(first_step)
+    K = np.empty((7, y.size))
+    n_steps = n_rejected = 0
+    next_out = int(np.searchsorted(t_eval, t, side='left'))
+    while next_out < len(t_eval) and t_eval[next_out] == t:
+        ys[next_out] = y
+        next_out += 1
+    monitor = None
+    if events:
+        from events import EventMonitor
+        monitor = EventMonitor(events, t, y)
+
+    success, message = True, "Reached the end of the interval."
+    while t < tf:
+        if n_steps >= max_steps:
+            success, message = False, f"Exceeded max_steps ({max_steps})."
+            break
+        min_step = 10 * np.spacing(t)
+        h = min(max(h, min_step), max_step)
+        rejected = False
+        while True:
+            h_step = min(h, tf - t)
+            t_new = t + h_step if h_step < tf - t else tf
+            K[0] = f
+            for s in range(1, 6):
+                K[s] = fun(t + _C[s] * h_step, y + h_step * (_A[s] @ K[:s]))
+            y_new = y + h_step * (_B @ K[:6])
+            f_new = fun(t_new, y_new)
+            K[6] = f_new
+            nfev += 6
+            scale = atol + np.maximum(np.abs(y), np.abs(y_new)) * rtol
+            error = _rms_norm(h_step * (_E @ K) / scale)
+            if error <= 1.0:
+                break
+            n_rejected += 1
+            rejected = True
+            if not np.isfinite(error):
+                factor = _MIN_FACTOR
+            else:
+                factor = max(_MIN_FACTOR, _SAFETY * error ** -0.2)
+            h = h_step * factor
+            if h < min_step:
+                break
+        if error > 1.0:
+            success, message = False, f"Step size fell below {min_step:.3g} at t={t:.6g}."
+            break
+
+        terminal = None
+        if monitor is not None:
+            Q = h_step * (K.T @ _P)
+
+            def interpolant(s, t=t, y=y, h_step=h_step, Q=Q):
+                return y + Q @ ((s - t) / h_step) ** np.arange(1, 5)
+
+            terminal = monitor.step(t, t_new, y_new, interpolant)
+            if terminal is not None:  # end the step at the terminal event
+                t_new, y_new = terminal
+
+        # Dense output for the evaluation points inside (t, t_new]
+        stop = int(np.searchsorted(t_eval, t_new, side='right'))
+        if stop > next_out:
+            x = (t_eval[next_out:stop] - t) / h_step
+            powers = np.cumprod(np.repeat(x[None, :], 4, axis=0), axis=0)
+            ys[next_out:stop] = (y[:, None] + h_step * (K.T @ _P) @ powers).T
+            if t_eval[stop - 1] == t_new:
+                ys[stop - 1] = y_new
+            next_out = stop
+
+        if on_step is not None:
+            on_step(t, y, t_new, y_new)
+        t, y, f = t_new, y_new, f_new
+        n_steps += 1
+        if terminal is not None:
+            message = monitor.message(t)
+            break
+        if error == 0.0:
+            factor = _MAX_FACTOR
+        else:
+            factor = min(_MAX_FACTOR, _SAFETY * error ** -0.2)
+        if rejected:
+            factor = min(1.0, factor)
+        h = h_step * factor
+
+    return {
+        't': t_eval,
+        'y': ys,
+        'success': success,
+        'message': message,
+        'n_steps': n_steps,
+        'n_rejected': n_rejected,
+        'nfev': nfev,
+        't_final': t,
+        'h_next': h,
+        'events': monitor.results() if monitor else {},
+        'terminated_by': monitor.terminated_by if monitor else None,
+    }
+
+
+def _schedule_pieces(schedule, t0, tf):
+    """
+    (start, end, schedule, bolus) pieces between the schedule's dosing events.
+    Schedules with a pieces() method (schedules.DosingSchedule) are split at
+    every event with constant controls on each piece; any other callable is
+    integrated as a single piece.
+    """
+    if hasattr(schedule, 'pieces'):
+        return [(a, b, constant_schedule(*u), amount) for a, b, u, amount in schedule.pieces(t0, tf)]
+    return [(t0, tf, schedule, 0.0)]
+
+
+def _piece_outputs(t_eval, a, b, last):
+    """Slice of t_eval that belongs to the piece [a, b) ([a, b] for the last one), and the
+    piece's output times (with b appended so the state at the event is available)."""
+    lo = int(np.searchsorted(t_eval, a, side='left'))
+    hi = int(np.searchsorted(t_eval, b, side='right' if last else 'left'))
+    times = t_eval[lo:hi]
+    if not times.size or times[-1] != b:
+        times = np.append(times, b)
+    return lo, hi, times
+
+
+def _observer(reducers, t0, y0):
+    """outcomes.ReducerSet over the reducers, started at (t0, y0); None without reducers."""
+    if not reducers:
+        return None
+    from outcomes import ReducerSet
+    observer = ReducerSet(reducers)
+    observer.start(t0, y0)
+    return observer
+
+
+class _StateTransform:
+    """
+    Base of the changes of variables applied per piece (pharmacokinetics.AnalyticPK,
+    log_space.LogSpace): the solver integrates v, expand(t, v) gives the
+    states. Events, reducers and results are translated through expand.
+    """
+
+    def expand(self, t, v):
+        raise NotImplementedError
+
+    def events(self, events):
+        """Bound events evaluated on the expanded states."""
+        return [_TransformedEvent(event, self) for event in events]
+
+    def observer(self, observer):
+        """Reducer set fed the expanded states (None stays None)."""
+        return None if observer is None else _TransformedObserver(observer, self)
+
+    def expand_result(self, result, t_eval):
+        """Replace the outputs, event states and observer of a solver result by expanded ones."""
+        result['y'] = self.expand(t_eval, result['y'])
+        result['events'] = {name: {'t': found['t'], 'y': self.expand(found['t'], found['y'])}
+                            for name, found in result.get('events', {}).items()}
+        if isinstance(result.get('observer'), _TransformedObserver):
+            result['observer'] = result['observer'].observer
+        return result
+
+
+class _TransformedEvent:
+    def __init__(self, event, transform):
+        self.name, self.terminal, self.direction = event.name, event.terminal, event.direction
+        self.event, self.transform = event, transform
+
+    def __call__(self, t, v, rows=None):
+        return self.event(t, self.transform.expand(t, v), rows)
+
+
+class _TransformedObserver:
+    def __init__(self, observer, transform):
+        self.observer, self.transform = observer, transform
+
+    def step(self, t0, v0, t1, v1, rows=Ellipsis):
+        self.observer.step(t0, self.transform.expand(t0, v0), t1, self.transform.expand(t1, v1), rows)
+
+    def copy(self):
+        return _TransformedObserver(self.observer.copy(), self.transform)
+
+
+def _merge_telemetry(runs, wall_time):
+    """Telemetry over the pieces of a scheduled run."""
+    telemetry = dict(runs[-1])
+    telemetry['solver'] = '/'.join(dict.fromkeys(r['solver'] for r in runs))
+    for key in ('n_steps', 'nfev', 'njev', 'nlu'):
+        telemetry[key] = sum(r[key] for r in runs)
+    rejected = [r['n_rejected'] for r in runs]
+    telemetry['n_rejected'] = None if None in rejected else sum(rejected)
+    if any('attempts' in r for r in runs):
+        telemetry['attempts'] = [a for r in runs for a in r.get('attempts', [r])]
+    telemetry['n_segments'] = len(runs)
+    telemetry['wall_time'] = wall_time
+    return telemetry
+
+
+def simulate_patient(parameters, initial_state=None, t_span=DEFAULT_T_SPAN, schedule=None,
+                     t_eval=None, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL, max_step=np.inf, method='RK45',
+                     reducers=None, events=None, pk='numeric', state_space='linear', checkpoints=None,
+                     resume=None):
+    """
+    Integrate the 15-state system for one patient.
+
+    Args:
+        parameters: mapping with the 37 parameters and 'alpha_acid' (e.g. the
+            'parameters' dict from calculate_all_parameters, or a ParameterSet) or a (38,) array.
+        initial_state: (15,) array or mapping by STATE_NAMES
+            (default: default_initial_state(parameters)).
+        t_span: (t0, tf) in days.
+        schedule: callable t -> controls (u_E, u_C, u_H, u_I, dose_rate); default
+            untreated. A schedules.DosingSchedule is integrated piece by piece:
+            the solver restarts at every dosing event and boluses are added to D
+            there (outputs at an event time are taken after the dose).
+        t_eval: output times (default: every day from t0, plus tf).
+        rtol, atol: tolerances for method='RK45'.
+        method: 'RK45' (integrate_rk45) or 'cascade' (stiff_solvers.solve_cascade:
+            Radau → BDF → LSODA → RK45 with the Chapter 5 tolerances and the
+            analytic Jacobian).
+        reducers: optional mapping name -> outcomes.Reducer, fed every accepted
+            step from t0 (the cascade feeds only its successful stage). With
+            t_eval=[] no trajectory is kept.
+        events: optional sequence of events.Event (e.g. events.extinction());
+            crossings are recorded and a terminal one ends the run there
+            (outputs after it are NaN).
+        pk: 'numeric' integrates all 15 states; 'analytic' takes D and Dₘ in
+            closed form between dosing events (pharmacokinetics.AnalyticPK)
+            and integrates the other 13, which needs a piecewise-constant
+            dose rate (no schedule or a schedules.DosingSchedule).
+        state_space: 'linear', or 'log' to integrate the tumor populations as
+            logarithms and the other states scaled to O(1)
+            (log_space.LogSpace): populations stay positive by construction
+            (those starting at zero start at log_space.POSITIVE_FLOOR).
+        checkpoints: optional times in (t0, tf] at which to save the solver
+            state (checkpoints.Checkpoint); the run restarts there as at a
+            dosing event.
+        resume: a Checkpoint of an earlier run to continue from, with this
+            call's schedule from its time on (instead of initial_state and
+            t_span[0]). Reducers continue from the checkpoint unless new ones
+            are given; earlier event crossings are kept.
+
+    Returns:
+        dict with 't', 'y' (len(t), 15), 'state_names', 'success', 'message',
+        'n_steps', 'n_rejected', 'nfev', 't_final', 'reductions' (name -> result,
+        up to t_final), 'events' (name -> {'t': (k,) crossing times, 'y': (k, 15)}),
+        'terminated_by' (terminal event name or None), 'telemetry' (solver,
+        n_steps, n_rejected, nfev, njev, nlu, wall_time, n_segments) and
+        'checkpoints' (time -> Checkpoint for those reached).
+    """
+    if resume is not None:
+        if initial_state is not None:
+            raise ValueError("initial_state cannot be given with resume")
+        if resume.alpha != 1.0:
+            raise ValueError("resume needs a checkpoint of simulate_patient (simulate_fractional resumes its own)")
+        y0 = resume.y.copy()
+    elif initial_state is None:
+        y0 = default_initial_state(parameters)
+    elif isinstance(initial_state, Mapping):
+        y0 = default_initial_state(parameters)
+        for name, value in initial_state.items():
+            y0[STATE_INDEX[name]] = value
+    else:
+        y0 = np.asarray(initial_state, dtype=float)
+    if y0.shape != (len(STATE_NAMES),):
+        raise ValueError(f"initial_state must have {len(STATE_NAMES)} entries, got shape {y0.shape}")
+    if method not in ('RK45', 'cascade'):
+        raise ValueError(f"Unknown method: {method}")
+    if pk not in ('numeric', 'analytic'):
+        raise ValueError(f"Unknown pk mode: {pk}")
+    if state_space not in ('linear', 'log'):
+        raise ValueError(f"Unknown state_space: {state_space}")
+    if pk == 'analytic' and schedule is not None and not hasattr(schedule, 'pieces'):
+        raise ValueError("pk='analytic' needs a piecewise-constant dose rate (a schedules.DosingSchedule)")
+
+    t0 = resume.t if resume is not None else float(t_span[0])
+    tf = float(t_span[1])
+    if tf <= t0:
+        raise ValueError("t_span must be increasing")
+    t_eval = np.append(np.arange(t0, tf, 1.0), tf) if t_eval is None else np.asarray(t_eval, dtype=float)
+    if t_eval.size and (np.any(np.diff(t_eval) < 0) or t_eval[0] < t0 or t_eval[-1] > tf):
+        raise ValueError("t_eval must be sorted and within t_span")
+
+    start = time.perf_counter()
+    pieces = _schedule_pieces(schedule or NO_TREATMENT, t0, tf)
+    cuts, saved = [], {}
+    if checkpoints is not None or resume is not None:
+        from checkpoints import Checkpoint, checkpoint_times, split_pieces
+        cuts = checkpoint_times(checkpoints or (), t0, tf)
+        pieces = split_pieces(pieces, cuts)
+    ys = np.full((len(t_eval), len(STATE_NAMES)), np.nan)
+    y = y0.copy()
+    observer = resume.reducer_state() if resume is not None and not reducers else _observer(reducers, t0, y0)
+    bound = []
+    if events:
+        from events import bind_events, merge_event_results
+        bound = bind_events(events, parameters)
+    runs, found = [], []
+    if resume is not None and bound:
+        found.append(resume.event_results([event.name for event in bound]))
+    # RK45 restarts with the step size it had reached before the event
+    h = resume.h if resume is not None else None
+    packed = pack_parameters(parameters)  # once, not per piece
+    for k, (a, b, piece_schedule, amount) in enumerate(pieces):
+        if a in cuts:
+            saved[a] = Checkpoint(a, y, h, observer, merge_event_results(found) if bound else {})
+        y[STATE_INDEX['D']] += amount
+        lo, hi, times = _piece_outputs(t_eval, a, b, k == len(pieces) - 1)
+        run = _integrate_piece(packed, piece_schedule, (a, b), y, times, rtol, atol, max_step, method, h,
+                               observer, bound, pk, state_space)
+        h = run.get('h_next')
+        observer = run.get('observer', observer)
+        runs.append(run['telemetry'])
+        found.append(run.get('events', {}))
+        ys[lo:hi] = run['y'][:hi - lo]
+        if not run['success'] or run.get('terminated_by'):
+            break
+        y = run['y'][-1].copy()
+    else:
+        if tf in cuts:
+            saved[tf] = Checkpoint(tf, y, h, observer, merge_event_results(found) if bound else {})
+
+    telemetry = _merge_telemetry(runs, time.perf_counter() - start)
+    return {
+        't': t_eval,
+        'y': ys,
+        'state_names': STATE_NAMES,
+        'success': telemetry['success'],
+        'message': run['message'],
+        'n_steps': telemetry['n_steps'],
+        'n_rejected': telemetry['n_rejected'],
+        'nfev': telemetry['nfev'],
+        't_final': telemetry['t_final'],
+        'reductions': observer.results() if observer else {},
+        'events': merge_event_results(found) if bound else {},
+        'terminated_by': run.get('terminated_by'),
+        'telemetry': telemetry,
+        'checkpoints': saved,
+    }
+
+
+def _integrate_piece(parameters, schedule, t_span, y0, t_eval, rtol, atol, max_step, method, first_step=None,
+                     observer=None, events=None, pk='numeric', state_space='linear'):
+    """
+    One integration between dosing events with the requested method; result with
+    'telemetry'. first_step is used by RK45 only (the cascade's solvers pick their own).
+    The cascade feeds a copy of observer and returns it as 'observer'. With
+    pk='analytic' the solver sees the 13 states other than D and Dₘ, with
+    state_space='log' the log-transformed populations (both may be combined);
+    the result is expanded back to the 15 states.
+    """
+    fun, v0, layers = patient_rhs(parameters, schedule), y0, []
+    if pk == 'analytic':
+        from pharmacokinetics import AnalyticPK
+        layers.append(AnalyticPK(parameters, schedule, t_span[0], y0))
+        fun, v0 = layers[-1].rhs, layers[-1].transform(y0)
+    if state_space == 'log':
+        from log_space import LogSpace
+        names = layers[-1].state_names if layers else STATE_NAMES
+        layers.append(LogSpace(fun, names, v0))
+        fun, v0 = layers[-1].rhs, layers[-1].transform(v0)
+    events = events or []
+    for layer in layers:
+        observer, events = layer.observer(observer), layer.events(events)
+
+    def jac():  # built only for the cascade
+        from jacobian import patient_jacobian
+        J = patient_jacobian(parameters, schedule)
+        for layer in layers:
+            J = layer.jacobian(J)
+        return J
+
+    result = _integrate_system(fun, jac, t_span, v0, t_eval, rtol, atol, max_step, method, first_step, observer,
+                               events)
+    for layer in reversed(layers):
+        result = layer.expand_result(result, t_eval)
+    return result
+
+
+def _integrate_system(fun, jac, t_span, y0, t_eval, rtol, atol, max_step, method, first_step, observer, events):
+    """_integrate_piece for a given right-hand side; jac() builds the Jacobian for the cascade."""
+    if method == 'cascade':
+        from stiff_solvers import solve_cascade
+        return solve_cascade(fun, t_span, y0, t_eval, jac=jac(), max_step=max_step, observer=observer,
+                             events=events)
+    start = time.perf_counter()
+    result = integrate_rk45(fun, t_span, y0, t_eval, rtol=rtol, atol=atol, max_step=max_step, first_step=first_step,
+                            on_step=observer.step if observer else None, events=events)
+    result['telemetry'] = {
+        'solver': 'RK45',
+        'rtol': rtol,
+        'atol': atol,
+        'success': result['success'],
+        'message': result['message'],
+        't_final': result['t_final'],
+        'n_steps': result['n_steps'],
+        'n_rejected': result['n_rejected'],
+        'nfev': result['nfev'],
+        'njev': 0,
+        'nlu': 0,
+        'wall_time': time.perf_counter() - start,
+    }
+    return result
+
+
+def cohort_rhs(parameters, schedule=None):
+    """
+    f(t, Y, rows) for an ensemble: t (n,) patient times, Y (15, n) states of the
+    patients `rows` (indices into the cohort). The schedule is called with the
+    array of patient times and may return (5,) or (n, 5) controls.
+    """
+    P = pack_parameters(parameters)
+    P = np.ascontiguousarray(np.atleast_2d(P).T)
+    schedule = schedule or NO_TREATMENT
+    active = {'rows': None, 'P': P}
+
+    def f(t, Y, rows):
+        if active['rows'] is not rows:  # the active set changed; gather its parameters once
+            active['rows'], active['P'] = rows, P[:, rows]
+        u = np.asarray(schedule(t), dtype=float)
+        return np.array(_derivatives(Y, active['P'], u.T if u.ndim == 2 else u))
+
+    return f
+
+
+def _rms_columns(x):
+    return np.sqrt(np.mean(x * x, axis=0))
+
+
+def _initial_step_ensemble(fun, t0, Y0, F0, rows, rtol, atol):
+    """Vectorized _initial_step, one starting step per column."""
+    scale = atol + np.abs(Y0) * rtol
+    d0, d1 = _rms_columns(Y0 / scale), _rms_columns(F0 / scale)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01 * d0 / d1)
+        F1 = fun(t0 + h0, Y0 + h0 * F0, rows)
+        d2 = _rms_columns((F1 - F0) / scale) / h0
+        h1 = np.where(
+            (d1 <= 1e-15) & (d2 <= 1e-15),
+            np.maximum(1e-6, h0 * 1e-3),
+            (0.01 / np.maximum(d1, d2)) ** (1 / 5),
+        )
+    return np.minimum(100 * h0, h1)
+
+
+def integrate_rk45_ensemble(fun, t_span, y0, t_eval=None, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL,
+                            max_step=np.inf, max_steps=MAX_STEPS, divergence_limit=DIVERGENCE_LIMIT,
+                            first_step=None, on_step=None, events=None):
+    """
+    Dormand–Prince RK45 for N independent systems with per-system step control.
+
+    Each stage evaluates fun(t, Y, rows) once for all active systems (Y is
+    (15, n), state-major). Step acceptance, step size and dense output follow
+    integrate_rk45 column by column. A system leaves the active set when it
+    reaches t_span[1], when its step size underflows, when it exceeds max_steps,
+    or when its state becomes non-finite or exceeds divergence_limit.
+    first_step (scalar or (N,)) replaces the starting-step estimate.
+    on_step(t, y, t_new, y_new, rows) is called once per pass with the (n,)
+    times and (n, n_states) states of the systems `rows` that accepted a step.
+    events (bound events.Event objects, g(t, y, rows) on (n, n_states) states)
+    are located on each system's dense output; a terminal one stops that
+    system with status 'event'.
+
+    Returns:
+        dict with 't' (t_eval), 'y' (N, len(t_eval), n_states) (NaN after a
+        system stopped early), 'status' (N,) codes into COHORT_STATUS,
+        'success' (N,) (finished or stopped by an event), 'n_steps' (N,),
+        'n_rejected' (N,), 't_final' (N,), 'h_next' (N,), 'nfev'
+        (single-system RHS evaluations), 'events' (name -> {'t': (N,) first
+        crossing or NaN, 'y': (N, n_states), 'count': (N,)}) and
+        'terminated_by' (N,) (terminal event name or None).
+    """
+    t0, tf = float(t_span[0]), float(t_span[1])
+    if tf <= t0:
+        raise ValueError("t_span must be increasing")
+    Y = np.array(np.atleast_2d(y0), dtype=float).T.copy()  # (n_states, N)
+    n_states, N = Y.shape
+    t_eval = np.array([t0, tf]) if t_eval is None else np.asarray(t_eval, dtype=float)
+    if t_eval.size and (np.any(np.diff(t_eval) < 0) or t_eval[0] < t0 or t_eval[-1] > tf):
+        raise ValueError("t_eval must be sorted and within t_span")
+    m = len(t_eval)
+    ys = np.full((N, m, n_states), np.nan)
+    status = np.zeros(N, dtype=int)
+    n_steps = np.zeros(N, dtype=int)
+    n_rejected = np.zeros(N, dtype=int)
+    t_final = np.full(N, t0)
+    h_next = np.full(N, np.nan)
+
+    rows = np.arange(N)
+    t = np.full(N, t0)
+    F = fun(t, Y, rows)
+    if first_step is None:
+        h = np.minimum(_initial_step_ensemble(fun, t, Y, F, rows, rtol, atol), max_step)
+        nfev = 2 * N
+    else:
+        h = np.minimum(np.broadcast_to(np.asarray(first_step, dtype=float), (N,)), max_step)
+        nfev = N
+    first = int(np.searchsorted(t_eval, t0, side='right'))
+    ys[:, :first] = Y.T[:, None, :]
+    next_out = np.full(N, first)
+    rejected = np.zeros(N, dtype=bool)
+    K = np.empty((7, n_states, N))
+    events = list(events or ())
+    if events:
+        from events import crossed, locate
+        G = np.array([event(t, Y.T, rows) for event in events]).reshape(len(events), N)
+    event_t = np.full((len(events), N), np.nan)
+    event_y = np.full((len(events), N, n_states), np.nan)
+    event_count = np.zeros((len(events), N), dtype=int)
+    terminated_by = np.full(N, None, dtype=object)
+
+    def powers(x):
+        return np.cumprod(np.repeat(x[None, :], 4, axis=0), axis=0)
+
+    while rows.size:
+        n = rows.size
+        remaining = tf - t
+        hs = np.minimum(h, remaining)
+        t_new = np.where(h >= remaining, tf, t + hs)
+        K[0] = F
+        for s in range(1, 6):
+            K[s] = fun(t + _C[s] * hs, Y + hs * np.tensordot(_A[s], K[:s], 1), rows)
+        Y_new = Y + hs * np.tensordot(_B, K[:6], 1)
+        F_new = fun(t_new, Y_new, rows)
+        K[6] = F_new
+        nfev += 6 * n
+        scale = atol + np.maximum(np.abs(Y), np.abs(Y_new)) * rtol
+        with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+            error = _rms_columns(hs * np.tensordot(_E, K, 1) / scale)
+            error[~np.isfinite(error)] = np.inf
+            factor = np.where(error == 0.0, _MAX_FACTOR, _SAFETY * error ** -0.2)
+        accept = error <= 1.0
+        factor = np.clip(factor, _MIN_FACTOR, _MAX_FACTOR)
+        factor[accept & rejected] = np.minimum(1.0, factor[accept & rejected])
+        h = np.minimum(hs * factor, max_step)
+        rejected = ~accept
+        n_rejected[rows[rejected]] += 1
+
+        accepted = np.flatnonzero(accept)
+        Q = None
+        terminated = np.zeros(rows.size, dtype=bool)
+        if accepted.size and events:
+            Q = np.einsum('skn,sp->pkn', K, _P)
+
+            def y_at(s, cols):
+                x = (s - t[cols]) / hs[cols]
+                return (Y[:, cols] + hs[cols] * np.einsum('pkn,pn->kn', Q[:, :, cols], powers(x))).T
+
+            G_new = np.array([event(t_new[accepted], Y_new[:, accepted].T, rows[accepted]) for event in events])
+            G_new = G_new.reshape(len(events), accepted.size)
+            crossings = []
+            stop_t = np.full(rows.size, np.inf)
+            stop_event = np.full(rows.size, -1)
+            for i, event in enumerate(events):
+                cols = accepted[crossed(event.direction, G[i, accepted], G_new[i])]
+                if not cols.size:
+                    continue
+                roots = locate(lambda s: event(s, y_at(s, cols), rows[cols]), t[cols], t_new[cols], G[i, cols])
+                crossings.append((i, cols, roots))
+                if event.terminal:
+                    earlier = roots < stop_t[cols]
+                    stop_t[cols[earlier]] = roots[earlier]
+                    stop_event[cols[earlier]] = i
+            G[:, accepted] = G_new
+            for i, cols, roots in crossings:  # keep the crossings up to a terminal stop
+                keep = roots <= stop_t[cols]
+                cols, roots = cols[keep], roots[keep]
+                patients = rows[cols]
+                first = np.isnan(event_t[i, patients])
+                event_t[i, patients[first]] = roots[first]
+                event_y[i, patients[first]] = y_at(roots, cols)[first]
+                event_count[i, patients] += 1
+            terminated = stop_event >= 0
+            if terminated.any():  # end those steps at the event
+                cols = np.flatnonzero(terminated)
+                Y_new[:, cols] = y_at(stop_t[cols], cols).T
+                t_new[cols] = stop_t[cols]
+                terminated_by[rows[cols]] = [events[i].name for i in stop_event[cols]]
+
+        if accepted.size:
+            # Dense output for the evaluation points inside (t, t_new] of each accepted column
+            idx = accepted
+            while idx.size:
+                j = next_out[idx]
+                inside = j < m
+                inside[inside] = t_eval[j[inside]] <= t_new[idx[inside]]
+                idx, j = idx[inside], j[inside]
+                if not idx.size:
+                    break
+                if Q is None:
+                    Q = np.einsum('skn,sp->pkn', K, _P)
+                x = (t_eval[j] - t[idx]) / hs[idx]
+                values = Y[:, idx] + hs[idx] * np.einsum('pkn,pn->kn', Q[:, :, idx], powers(x))
+                exact = t_eval[j] == t_new[idx]
+                values[:, exact] = Y_new[:, idx[exact]]
+                ys[rows[idx], j] = values.T
+                next_out[idx] += 1
+            if on_step is not None:
+                on_step(t[accepted], Y[:, accepted].T, t_new[accepted], Y_new[:, accepted].T, rows[accepted])
+            Y[:, accepted] = Y_new[:, accepted]
+            F[:, accepted] = F_new[:, accepted]
+            t[accepted] = t_new[accepted]
+            n_steps[rows[accepted]] += 1
+
+        # Drop finished, failed and diverged systems from the active set
+        with np.errstate(invalid='ignore'):
+            diverged = accept & ~(np.abs(Y) <= divergence_limit).all(axis=0)
+        done = accept & (t >= tf)
+        too_small = rejected & (h < 10 * np.spacing(np.abs(t)))
+        exhausted = n_steps[rows] >= max_steps
+        drop = done | diverged | too_small | exhausted | terminated
+        if drop.any():
+            status[rows[too_small]] = COHORT_STATUS.index('step_too_small')
+            status[rows[exhausted & ~done & ~terminated]] = COHORT_STATUS.index('max_steps')
+            status[rows[diverged & ~terminated]] = COHORT_STATUS.index('diverged')
+            status[rows[terminated]] = COHORT_STATUS.index('event')
+            t_final[rows[drop]] = t[drop]
+            h_next[rows[drop]] = h[drop]
+            keep = ~drop
+            rows, Y, F, t, h = rows[keep], Y[:, keep], F[:, keep], t[keep], h[keep]
+            next_out, rejected = next_out[keep], rejected[keep]
+            K = np.empty((7, n_states, rows.size))
+            if events:
+                G = G[:, keep]
+
+    return {
+        't': t_eval,
+        'y': ys,
+        'status': status,
+        'success': (status == 0) | (status == COHORT_STATUS.index('event')),
+        'n_steps': n_steps,
+        'n_rejected': n_rejected,
+        'nfev': nfev,
+        't_final': t_final,
+        'h_next': h_next,
+        'events': {event.name: {'t': event_t[i], 'y': event_y[i], 'count': event_count[i]}
+                   for i, event in enumerate(events)},
+        'terminated_by': terminated_by,
+    }
+
+
+def simulate_cohort(parameters, initial_state=None, t_span=DEFAULT_T_SPAN, schedule=None,
+                    t_eval=None, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL, max_step=np.inf,
+                    divergence_limit=DIVERGENCE_LIMIT, reducers=None, events=None):
+    """
+    Integrate the 15-state system for a cohort at once.
+
+    Args:
+        parameters: (N, 38) array or a sequence of per-patient mappings
+            (e.g. ParameterSets).
+        initial_state: (N, 15) array (default: default_initial_state per patient).
+        t_span: (t0, tf) in days, shared by the cohort.
+        schedule: callable t -> controls; called with the (n,) array of patient
+            times, returns (5,) or (n, 5). Default untreated. A
+            schedules.DosingSchedule is shared by the cohort and integrated
+            piece by piece, restarting at every dosing event as in simulate_patient.
+        t_eval: output times (default: t0 and tf only; the output holds
+            N × len(t_eval) × 15 floats).
+        reducers: optional mapping name -> outcomes.Reducer, fed with the
+            cohort's states; results are (N,) arrays up to each t_final.
+        events: optional sequence of events.Event; a patient reaching a
+            terminal one stops there with status 'event'.
+
+    Returns:
+        dict with 't', 'y' (N, len(t), 15), 'state_names', per-patient 'status'
+        (COHORT_STATUS codes), 'success' (finished or stopped by an event),
+        'n_steps', 'n_rejected', 't_final', the total 'nfev', 'reductions'
+        (name -> result), 'events' (name -> {'t': (N,) first crossing or NaN,
+        'y': (N, 15), 'count': (N,)}) and 'terminated_by' (N,).
+    """
+    if not isinstance(parameters, np.ndarray):
+        parameters = list(parameters)
+    P = np.atleast_2d(pack_parameters(parameters))
+    y0 = default_initial_state(parameters) if initial_state is None else np.asarray(initial_state, dtype=float)
+    y0 = np.atleast_2d(y0)
+    if y0.shape != (len(P), len(STATE_NAMES)):
+        raise ValueError(f"initial_state must have shape ({len(P)}, {len(STATE_NAMES)}), got {y0.shape}")
+    t0, tf = float(t_span[0]), float(t_span[1])
+    observer = _observer(reducers, t0, y0)
+    if events:
+        from events import bind_events
+    pieces = _schedule_pieces(schedule or NO_TREATMENT, t0, tf)
+    if len(pieces) == 1:
+        result = integrate_rk45_ensemble(cohort_rhs(P, schedule), t_span, y0, t_eval, rtol=rtol, atol=atol,
+                                         max_step=max_step, divergence_limit=divergence_limit,
+                                         on_step=observer.step if observer else None,
+                                         events=bind_events(events, P) if events else None)
+        result['state_names'] = STATE_NAMES
+        result['reductions'] = observer.results() if observer else {}
+        return result
+
+    t_eval = np.array([t0, tf]) if t_eval is None else np.asarray(t_eval, dtype=float)
+    if t_eval.size and (np.any(np.diff(t_eval) < 0) or t_eval[0] < t0 or t_eval[-1] > tf):
+        raise ValueError("t_eval must be sorted and within t_span")
+    N = len(P)
+    ys = np.full((N, len(t_eval), len(STATE_NAMES)), np.nan)
+    status = np.zeros(N, dtype=int)
+    n_steps = np.zeros(N, dtype=int)
+    n_rejected = np.zeros(N, dtype=int)
+    t_final = np.full(N, t0)
+    nfev = 0
+    event_results = {event.name: {'t': np.full(N, np.nan), 'y': np.full((N, len(STATE_NAMES)), np.nan),
+                                  'count': np.zeros(N, dtype=int)} for event in events or ()}
+    terminated_by = np.full(N, None, dtype=object)
+    y = y0.astype(float, copy=True)
+    h = None  # per-patient step sizes carried across events
+    alive = np.arange(N)
+    for k, (a, b, piece_schedule, amount) in enumerate(pieces):
+        if not alive.size:
+            break
+        y[alive, STATE_INDEX['D']] += amount
+        lo, hi, times = _piece_outputs(t_eval, a, b, k == len(pieces) - 1)
+
+        def observer_step(t, Y, t_new, Y_new, rows, alive=alive):
+            # the ensemble's rows index the patients still running
+            observer.step(t, Y, t_new, Y_new, alive[rows])
+
+        on_step = observer_step if observer else None
+        run = integrate_rk45_ensemble(cohort_rhs(P[alive], piece_schedule), (a, b), y[alive], times,
+                                      rtol=rtol, atol=atol, max_step=max_step, divergence_limit=divergence_limit,
+                                      first_step=h, on_step=on_step,
+                                      events=bind_events(events, P[alive]) if events else None)
+        ys[alive, lo:hi] = run['y'][:, :hi - lo]
+        status[alive] = run['status']
+        n_steps[alive] += run['n_steps']
+        n_rejected[alive] += run['n_rejected']
+        t_final[alive] = run['t_final']
+        nfev += run['nfev']
+        y[alive] = run['y'][:, -1]
+        for name, found in run['events'].items():
+            merged = event_results[name]
+            first = np.isnan(merged['t'][alive]) & ~np.isnan(found['t'])
+            merged['t'][alive[first]] = found['t'][first]
+            merged['y'][alive[first]] = found['y'][first]
+            merged['count'][alive] += found['count']
+        terminated_by[alive] = run['terminated_by']
+        running = run['status'] == COHORT_STATUS.index('finished')
+        h = run['h_next'][running]
+        alive = alive[running]
+
+    return {
+        't': t_eval,
+        'y': ys,
+        'state_names': STATE_NAMES,
+        'status': status,
+        'success': (status == 0) | (status == COHORT_STATUS.index('event')),
+        'n_steps': n_steps,
+        'n_rejected': n_rejected,
+        'nfev': nfev,
+        't_final': t_final,
+        'reductions': observer.results() if observer else {},
+        'events': event_results,
+        'terminated_by': terminated_by,
+    }
@@ -0,0 +1,239 @@
+"""
+Stability Module
+Equilibria and eigenvalue stability analysis of the 15-state system
+(Chapter 4, Stability Analysis).
+
+Equilibria (dY/dt = 0) are located with damped Newton iterations on the
+analytic Jacobian, started from the tumor-free steady state and a set of
+multi-start seeds spread over the biologically realistic state space; all seeds
+are iterated together as one batch. At each non-negative equilibrium the
+Jacobian spectrum is summarized as in Chapter 4: maximum real part, trace,
+determinant and condition number, with ε = 1e-6 separating stable from
+unstable eigenvalues. spectrum_summary accepts stacked (..., 15, 15) Jacobians
+for cohort-scale use.
+"""
+
+import numpy as np
+
+from jacobian import jacobian
+from model_spec import TUMOR_STATES
+from simulation import CONTROL_NAMES, MODEL_PARAMETER_KEYS, STATE_INDEX, STATE_NAMES, pack_parameters, rhs
+
+# Real parts below -EPSILON count as stable (numerical precision margin, Chapter 4)
+EPSILON = 1e-6
+N_STARTS = 32
+MAX_ITERATIONS = 60
+# Scaled RMS residual at which a Newton iterate is accepted as an equilibrium
+TOLERANCE = 1e-8
+# Newton keeps polishing a converged root until its relative correction is below this
+STEP_TOLERANCE = 1e-12
+# Roots closer than this (relative) are the same equilibrium
+DUPLICATE_TOLERANCE = 1e-6
+
+_TUMOR = [STATE_INDEX[name] for name in TUMOR_STATES]
+_KEY = {name: idx for idx, name in enumerate(MODEL_PARAMETER_KEYS)}
+
+
+def _scaled_residual(F, Y):
+    return np.sqrt(np.mean((F / (1.0 + np.abs(Y))) ** 2, axis=-1))
+
+
+def tumor_free_state(parameters, controls=None):
+    """The tumor-free steady state (N_total = 0), in closed form."""
+    p = pack_parameters(parameters)
+    u = np.zeros(len(CONTROL_NAMES)) if controls is None else np.asarray(controls, dtype=float)
+    k = {name: p[..., idx] for name, idx in _KEY.items()}
+    u_E, u_C, u_H, u_I, dose_rate = (u[..., i] for i in range(len(CONTROL_NAMES)))
+    eta_treat = k['etaE'] * u_E + k['etaC'] * u_C + k['etaH'] * u_H + k['etaI'] * u_I
+    y = np.zeros(np.broadcast_shapes(p.shape[:-1], u.shape[:-1]) + (len(STATE_NAMES),))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y[..., STATE_INDEX['I1']] = k['phi1'] / (k['deltaI'] - 0.1 * k['etaI'] * u_I)
+        y[..., STATE_INDEX['D']] = dose_rate / (k['kel'] + k['k_metabolism'])
+        y[..., STATE_INDEX['Dm']] = k['k_metabolism'] * y[..., STATE_INDEX['D']] / k['k_clearance']
+        y[..., STATE_INDEX['G']] = (k['deltaG'] - 2 * k['nu'] * eta_treat) / (k['deltaG'] - k['nu'] * eta_treat)
+    return y
+
+
+def _seeds(p, u, n_starts, rng):
+    """Tumor-free state plus n_starts random states with tumor burden up to K."""
+    base = tumor_free_state(p, u)
+    seeds = np.repeat(base[None, :], n_starts + 1, axis=0)
+    K = p[_KEY['K']]
+    random = seeds[1:]
+    burden = K * 10.0 ** rng.uniform(-3.0, 0.0, size=(n_starts, len(_TUMOR)))
+    burden[rng.random((n_starts, len(_TUMOR))) < 0.5] = 0.0
+    random[:, _TUMOR] = burden
+    for name in ('I1', 'I2', 'P', 'A', 'M'):
+        random[:, STATE_INDEX[name]] = 10.0 ** rng.uniform(-2.0, 4.0, size=n_starts)
+    random[:, STATE_INDEX['H']] = rng.uniform(0.0, 1.0, size=n_starts)
+    random[:, STATE_INDEX['G']] = rng.uniform(-1.0, 1.0, size=n_starts) * 10.0 ** rng.uniform(0.0, 4.0, size=n_starts)
+    return seeds
+
+
+def newton(Y, parameters, controls=None, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+    """
+    Damped Newton iterations for f(Y) = 0 on a batch of states.
+
+    Args:
+        Y: (M, 15) starting states.
+        parameters: (38,) or (M, 38) parameters.
+        controls: (5,) or (M, 5) controls (default: untreated).
+
+    Returns:
+        (Y, residual, converged): final states, scaled RMS residuals and a boolean mask.
+    """
+    Y = np.array(Y, dtype=float)
+    p = pack_parameters(parameters)
+    u = np.zeros(len(CONTROL_NAMES)) if controls is None else np.asarray(controls, dtype=float)
+    F = rhs(0.0, Y, p, u)
+    residual = _scaled_residual(F, Y)
+    active = np.isfinite(residual)
+    with np.errstate(all='ignore'):
+        for _ in range(max_iterations):
+            idx = np.flatnonzero(active)
+            if not idx.size:
+                break
+            pa = p if p.ndim == 1 else p[idx]
+            ua = u if u.ndim == 1 else u[idx]
+            J = jacobian(0.0, Y[idx], pa, ua)
+            try:
+                delta = np.linalg.solve(J, F[idx][..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                delta = (np.linalg.pinv(J) @ F[idx][..., None])[..., 0]
+            # Backtracking: halve the step until the residual decreases
+            step = np.ones(len(idx))
+            pending = np.ones(len(idx), dtype=bool)
+            for _ in range(12):
+                trial = Y[idx] - step[:, None] * delta
+                F_trial = rhs(0.0, trial, pa, ua)
+                r_trial = _scaled_residual(F_trial, trial)
+                better = pending & np.isfinite(r_trial) & (r_trial < residual[idx])
+                Y[idx[better]] = trial[better]
+                F[idx[better]] = F_trial[better]
+                residual[idx[better]] = r_trial[better]
+                pending &= ~better
+                if not pending.any():
+                    break
+                step[pending] *= 0.5
+            # Stop when there is no descent along the Newton direction, or once the
+            # residual is below tolerance and the last correction is negligible
+            moved = np.max(np.abs(step[:, None] * delta) / (1.0 + np.abs(Y[idx])), axis=-1)
+            active[idx[pending | ((residual[idx] <= tolerance) & (moved <= STEP_TOLERANCE))]] = False
+    return Y, residual, residual <= tolerance
+
+
+def spectrum_summary(J, epsilon=EPSILON):
+    """
+    Eigenvalue summary of one or a stack of Jacobians (..., n, n).
+
+    Returns:
+        dict with 'eigenvalues' (..., n) complex, 'max_real', 'trace',
+        'determinant', 'condition_number', 'n_stable' (real part < -epsilon),
+        'n_unstable' (real part > epsilon) and 'classification'
+        ('STABLE': every real part < -epsilon, 'UNSTABLE': any real part > epsilon,
+        'MARGINAL': largest real part within ±epsilon of zero, where the
+        linearization cannot decide).
+    """
+    J = np.asarray(J, dtype=float)
+    eigenvalues = np.linalg.eigvals(J)
+    real = eigenvalues.real
+    max_real = real.max(axis=-1)
+    n_stable = np.count_nonzero(real < -epsilon, axis=-1)
+    n_unstable = np.count_nonzero(real > epsilon, axis=-1)
+    classification = np.where(
+        max_real < -epsilon, 'STABLE', np.where(max_real > epsilon, 'UNSTABLE', 'MARGINAL')
+    )
+    with np.errstate(all='ignore'):
+        condition = np.linalg.cond(J)
+    return {
+        'eigenvalues': eigenvalues,
+        'max_real': max_real,
+        'trace': np.trace(J, axis1=-2, axis2=-1),
+        'determinant': np.linalg.det(J),
+        'condition_number': condition,
+        'n_stable': n_stable,
+        'n_unstable': n_unstable,
+        'classification': classification if classification.ndim else str(classification),
+    }
+
+
+def find_equilibria(parameters, controls=None, n_starts=N_STARTS, seed=0, nonnegative=True):
+    """
+    Equilibria of the 15-state system for one patient by multi-start Newton.
+
+    Args:
+        parameters: mapping or (38,) array (see simulation.pack_parameters).
+        controls: constant controls (u_E, u_C, u_H, u_I, dose_rate); default untreated.
+        n_starts: random seeds in addition to the tumor-free state.
+        seed: random generator seed (results are reproducible).
+        nonnegative: keep only equilibria in the non-negative orthant.
+
+    Returns:
+        list of (15,) states, distinct, ordered by total tumor burden.
+    """
+    p = pack_parameters(parameters)
+    u = np.zeros(len(CONTROL_NAMES)) if controls is None else np.asarray(controls, dtype=float)
+    seeds = _seeds(p, u, n_starts, np.random.default_rng(seed))
+    Y, _, converged = newton(seeds, p, u)
+    roots = []
+    for y in Y[converged]:
+        if nonnegative and np.any(y < -DUPLICATE_TOLERANCE * (1.0 + np.abs(y))):
+            continue
+        if nonnegative:
+            y = np.maximum(y, 0.0)
+        if not any(np.all(np.abs(y - r) <= DUPLICATE_TOLERANCE * (1.0 + np.abs(r))) for r in roots):
+            roots.append(y)
+    roots.sort(key=lambda y: float(y[_TUMOR].sum()))
+    return roots
+
+
+def analyze_stability(parameters, controls=None, n_starts=N_STARTS, seed=0):
+    """
+    Equilibria with their eigenvalue summaries, and an overall classification.
+
+    Returns:
+        dict with 'equilibria' (list of dicts: 'state', 'tumor_burden' and the
+        spectrum_summary fields), 'status' (the classification of the most
+        stable non-negative equilibrium: 'STABLE' when it is locally
+        asymptotically stable, 'MARGINAL' when its largest Re λ is within ±ε of
+        zero, 'UNSTABLE' when it has any Re λ > ε or when none is found) and
+        'max_real' of the most stable equilibrium (nan if none).
+    """
+    p = pack_parameters(parameters)
+    roots = find_equilibria(p, controls, n_starts, seed)
+    equilibria = []
+    if roots:
+        states = np.array(roots)
+        summary = spectrum_summary(jacobian(0.0, states, p, controls))
+        for i, state in enumerate(states):
+            entry = {'state': state, 'tumor_burden': float(state[_TUMOR].sum())}
+            entry.update({key: value[i] for key, value in summary.items()})
+            entry['classification'] = str(entry['classification'])
+            equilibria.append(entry)
+    if not equilibria:
+        return {'equilibria': [], 'status': 'UNSTABLE', 'max_real': float('nan')}
+    best = min(equilibria, key=lambda e: e['max_real'])
+    return {'equilibria': equilibria, 'status': best['classification'], 'max_real': float(best['max_real'])}
+
+
+def stability_message(analysis):
+    """(status, message) for an analyze_stability result, in the UI's wording."""
+    status = analysis['status']
+    if not analysis['equilibria']:
+        return status, "❌ No non-negative equilibrium found - recommend frequent monitoring"
+    best = min(analysis['equilibria'], key=lambda e: e['max_real'])
+    n = len(best['eigenvalues'])
+    if status == "STABLE":
+        return status, (
+            "✅ Mathematical stability confirmed - locally asymptotically stable equilibrium "
+            f"(max Re(λ) = {best['max_real']:.3g}, {best['n_stable']}/{n} eigenvalues stable)"
+        )
+    if status == "MARGINAL":
+        return status, (
+            "⚠️ Marginal stability - the largest eigenvalue sits on the stability boundary, so the "
+            f"linearization is inconclusive; monitor predictions carefully (max Re(λ) = {best['max_real']:.3g})"
+        )
+    return status, (
+        "❌ Mathematical instability - no locally stable equilibrium; recommend frequent monitoring "
+        f"(max Re(λ) = {best['max_real']:.3g}, {best['n_unstable']}/{n} eigenvalues unstable)"
+    )
@@ -0,0 +1,169 @@
+"""
+Stiff Solvers Module
+Solver cascade for stiff runs of the 15-state system (Chapter 5, Numerical
+Implementation): Radau (rtol 1e-6, atol 1e-9) → BDF (1e-5, 1e-8) → LSODA →
+RK45 (1e-4, 1e-7). Each stage starts again from t0 when the previous one fails
+(step-size underflow, Newton non-convergence, non-finite state or step budget).
+
+Every run records telemetry: the solver that succeeded, accepted steps,
+rejected steps, RHS and Jacobian evaluations, LU decompositions and wall time,
+for the successful stage and for each failed attempt before it. scipy's
+solvers retry rejected steps internally, so n_rejected counts accepted steps
+that needed at least one retry (None for LSODA, which does not expose its
+step size).
+"""
+
+import time
+
+import numpy as np
+
+# (method, rtol, atol) in fallback order; LSODA uses the BDF tolerances
+SOLVER_CASCADE = (
+    ('Radau', 1e-6, 1e-9),
+    ('BDF', 1e-5, 1e-8),
+    ('LSODA', 1e-5, 1e-8),
+    ('RK45', 1e-4, 1e-7),
+)
+# Accepted steps per attempt before it is abandoned as a convergence failure
+MAX_STEPS = 50_000
+
+
+def _attempt(method, fun, t_span, y0, t_eval, rtol, atol, jac, max_step, max_steps, observer=None, events=None):
+    """
+    One stage of the cascade; returns (ys, telemetry dict, events.EventMonitor or
+    None). observer.step sees every accepted step.
+    """
+    from scipy.integrate import LSODA, RK45, BDF, Radau
+
+    solvers = {'Radau': Radau, 'BDF': BDF, 'LSODA': LSODA, 'RK45': RK45}
+    t0, tf = t_span
+    options = {'rtol': rtol, 'atol': atol, 'max_step': max_step}
+    if method != 'RK45' and jac is not None:
+        options['jac'] = jac
+    ys = np.full((len(t_eval), len(y0)), np.nan)
+    n_steps = n_rejected = 0
+    success, message = False, ""
+    start = time.perf_counter()
+    solver = stop = None
+    monitor = None
+    if events:
+        from events import EventMonitor
+        monitor = EventMonitor(events, t0, y0)
+    try:
+        solver = solvers[method](fun, t0, np.array(y0, dtype=float), tf, **options)
+        next_out = int(np.searchsorted(t_eval, t0, side='right'))
+        ys[:next_out] = y0
+        while solver.status == 'running':
+            if n_steps >= max_steps:
+                message = f"Exceeded {max_steps} steps."
+                break
+            h_attempt = getattr(solver, 'h_abs', None)  # LSODA does not expose its step size
+            if h_attempt is not None:
+                h_attempt = min(h_attempt, max_step)
+            t_old, y_old = solver.t, solver.y.copy()
+            error = solver.step()
+            if solver.status == 'failed':
+                message = error or "Step failed."
+                break
+            if not np.all(np.isfinite(solver.y)):
+                message = f"Non-finite state at t={solver.t:.6g}."
+                break
+            t_new, y_new = solver.t, solver.y
+            stop = None
+            if monitor is not None:
+                dense = solver.dense_output()
+                stop = monitor.step(t_old, t_new, y_new, dense)
+                if stop is not None:  # end the step at the terminal event
+                    t_new, y_new = stop
+            if observer is not None:
+                observer.step(t_old, y_old, t_new, y_new)
+            n_steps += 1
+            taken = solver.t - t_old
+            # The step actually taken is shorter than the one attempted only after a rejection
+            if h_attempt is not None and taken < h_attempt * (1 - 1e-12) and solver.t < tf:
+                n_rejected += 1
+            last = int(np.searchsorted(t_eval, t_new, side='right'))
+            if last > next_out:
+                ys[next_out:last] = solver.dense_output()(t_eval[next_out:last]).T
+                next_out = last
+            if stop is not None:
+                success, message = True, monitor.message(t_new)
+                break
+        else:
+            success, message = solver.status == 'finished', "Reached the end of the interval."
+    except (np.linalg.LinAlgError, ValueError, ArithmeticError) as e:
+        message = f"{type(e).__name__}: {e}"
+    return ys, {
+        'solver': method,
+        'rtol': rtol,
+        'atol': atol,
+        'success': success,
+        'message': message,
+        't_final': float(stop[0]) if stop is not None else float(solver.t) if solver is not None else float(t0),
+        'n_steps': n_steps,
+        'n_rejected': n_rejected if method != 'LSODA' else None,
+        'nfev': int(getattr(solver, 'nfev', 0)),
+        'njev': int(getattr(solver, 'njev', 0)),
+        'nlu': int(getattr(solver, 'nlu', 0)),
+        'wall_time': time.perf_counter() - start,
+    }, monitor
+
+
+def solve_cascade(fun, t_span, y0, t_eval=None, jac=None, cascade=SOLVER_CASCADE,
+                  max_step=np.inf, max_steps=MAX_STEPS, observer=None, events=None):
+    """
+    Integrate y' = fun(t, y) with the first solver in the cascade that succeeds.
+
+    Args:
+        fun: right-hand side f(t, y).
+        t_span: (t0, tf).
+        y0: initial state.
+        t_eval: sorted output times within t_span (default: t0 and tf).
+        jac: optional Jacobian J(t, y) for the implicit stages (finite
+            differences otherwise).
+        cascade: sequence of (method, rtol, atol); methods are Radau, BDF, LSODA, RK45.
+        observer: optional object with step(t0, y0, t1, y1) and copy() (e.g.
+            outcomes.ReducerSet); each stage feeds its own copy, so a failed
+            stage leaves no trace.
+        events: optional bound events (events.Event.bind); a terminal crossing
+            ends the stage successfully at the crossing.
+
+    Returns:
+        dict with 't', 'y' (len(t), n), 'success', 'message', 'events',
+        'terminated_by' and 'telemetry': the successful (or last) attempt's
+        statistics plus 'attempts' (all stages tried, in order) and the total
+        'wall_time'; with an observer also 'observer', the copy fed by that attempt.
+    """
+    t0, tf = float(t_span[0]), float(t_span[1])
+    if tf <= t0:
+        raise ValueError("t_span must be increasing")
+    t_eval = np.array([t0, tf]) if t_eval is None else np.asarray(t_eval, dtype=float)
+    if t_eval.size and (np.any(np.diff(t_eval) < 0) or t_eval[0] < t0 or t_eval[-1] > tf):
+        raise ValueError("t_eval must be sorted and within t_span")
+
+    attempts = []
+    ys = trial = None
+    for method, rtol, atol in cascade:
+        trial = observer.copy() if observer is not None else None
+        ys, telemetry, monitor = _attempt(method, fun, (t0, tf), y0, t_eval, rtol, atol, jac, max_step, max_steps,
+                                          trial, events)
+        attempts.append(telemetry)
+        if telemetry['success']:
+            break
+
+    telemetry = dict(attempts[-1])
+    telemetry['attempts'] = attempts
+    telemetry['wall_time'] = sum(a['wall_time'] for a in attempts)
+    result = {
+        't': t_eval,
+        'y': ys,
+        'success': telemetry['success'],
+        'message': telemetry['message'] if telemetry['success'] else
+        "All solvers failed: " + "; ".join(f"{a['solver']}: {a['message']}" for a in attempts),
+        'events': monitor.results() if monitor else {},
+        'terminated_by': monitor.terminated_by if monitor else None,
+        'telemetry': telemetry,
+    }
+    if observer is not None:
+        result['observer'] = trial
+    return result
@@ -0,0 +1,269 @@
+"""
+Sweep Module
+Scenario sweeps over fractional order × patient profile × protocol (Chapter 5:
+7 α values × 4 profiles × 5 protocols = 140 scenarios), optionally for
+several patients, run on a process pool.
+
+Every finished scenario is appended as one JSON line to the results file and
+flushed, so an interrupted sweep picks up where it stopped: scenarios already
+in the file under the same run settings (horizon, solver step, MODEL_VERSION
+and the scenario's parameters) are skipped, and a line cut off by the
+interruption is ignored and run again. Records from other settings stay in the
+file but are neither reused nor aggregated. efficacy_tables aggregates the records into protocol × α
+efficacy tables, overall and per profile.
+
+Usage:
+    python sweep.py -o sweep.jsonl
+    python sweep.py -o sweep.jsonl --alphas 0.8 1.0 --protocols Standard Combined --patient P001 --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from itertools import product
+from multiprocessing import get_context
+
+import pandas as pd
+
+from fractional import DEFAULT_STEP, FRACTIONAL_ORDERS
+from schedules import PROTOCOLS
+from simulation import MODEL_VERSION
+
+# Chapter 5 patient profiles: multipliers relative to the average patient
+PATIENT_PROFILES = {
+    'Young': {'phi1': 1.20, 'growth': 1.10, 'etaH': 1.15, 'clearance': 1.10, 'K': 1.05},
+    'Elderly': {'phi1': 0.85, 'growth': 0.95, 'etaH': 0.90, 'clearance': 0.80, 'K': 0.95},
+    'Compromised': {'phi1': 0.70, 'growth': 0.90, 'etaH': 0.80, 'clearance': 0.75, 'K': 0.90},
+    'Average': {},
+}
+# Parameters behind the grouped profile entries
+_PROFILE_GROUPS = {
+    'growth': ('lambda1', 'lambda2', 'lambdaR1', 'lambdaR2'),
+    'clearance': ('kel', 'k_clearance'),
+}
+DEFAULT_DAYS = 365.0
+
+
+def apply_profile(parameters, profile):
+    """Copy of a parameter mapping with the profile's multipliers applied."""
+    if profile not in PATIENT_PROFILES:
+        raise ValueError(f"Unknown profile: {profile} (expected one of {tuple(PATIENT_PROFILES)})")
+    adjusted = dict(parameters)
+    for key, factor in PATIENT_PROFILES[profile].items():
+        for name in _PROFILE_GROUPS.get(key, (key,)):
+            adjusted[name] = adjusted[name] * factor
+    return adjusted
+
+
+def scenario_key(scenario):
+    """Stable identifier of a scenario in the grid."""
+    return f"{scenario['patient']}|{scenario['profile']}|{scenario['protocol']}|alpha={scenario['alpha']:g}"
+
+
+def parameters_digest(parameters):
+    """Short hash of a parameter mapping, so a patient whose biomarkers changed is run again."""
+    canonical = json.dumps({k: float(v) for k, v in sorted(parameters.items())})
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def run_settings(scenario, days=DEFAULT_DAYS, step=DEFAULT_STEP):
+    """The settings a result depends on besides the scenario key; stored in every record."""
+    return {'days': float(days), 'step': float(step), 'model_version': MODEL_VERSION,
+            'parameters_digest': parameters_digest(scenario['parameters'])}
+
+
+def _resume_id(record):
+    return (record.get('key'), record.get('days'), record.get('step'),
+            record.get('model_version'), record.get('parameters_digest'))
+
+
+def build_scenarios(patients, alphas=FRACTIONAL_ORDERS, profiles=tuple(PATIENT_PROFILES), protocols=PROTOCOLS):
+    """
+    The scenario grid.
+
+    Args:
+        patients: mapping patient id -> parameter mapping (37 parameters,
+            'alpha_acid' and optionally 'G').
+
+    Returns:
+        list of dicts with 'key', 'patient', 'profile', 'protocol', 'alpha' and
+        'parameters' (the patient's parameters with the profile applied).
+    """
+    scenarios = []
+    for (patient, parameters), profile, protocol, alpha in product(patients.items(), profiles, protocols, alphas):
+        scenario = {'patient': patient, 'profile': profile, 'protocol': protocol, 'alpha': float(alpha)}
+        scenario['key'] = scenario_key(scenario)
+        scenario['parameters'] = apply_profile(parameters, profile)
+        scenarios.append(scenario)
+    return scenarios
+
+
+def run_scenario(scenario, days=DEFAULT_DAYS, step=DEFAULT_STEP):
+    """
+    Simulate one scenario and return its result record (JSON-serializable):
+    efficacy E and its components, tumor burden AUC and peak tumor burden,
+    accumulated during the run (no trajectory is stored), plus the run settings.
+
+    The peak of the drug compartment D is not tracked: the Chapter 5 protocols
+    act through u_E, u_C, u_H and u_I only (no bolus or dose_rate), so D stays 0.
+    """
+    from fractional import simulate_fractional
+    from outcomes import AUCReducer, EfficacyReducer, PeakReducer, efficacy_initial_state, tumor_burden
+    from schedules import protocol_schedule
+
+    start = time.perf_counter()
+    parameters = scenario['parameters']
+    reducers = {'efficacy': EfficacyReducer(), 'tumor_auc': AUCReducer(), 'peak_tumor': PeakReducer(tumor_burden)}
+    result = simulate_fractional(parameters, scenario['alpha'], initial_state=efficacy_initial_state(parameters),
+                                 t_span=(0.0, days), schedule=protocol_schedule(scenario['protocol'], days),
+                                 t_eval=[], step=step, reducers=reducers)
+    reductions = result['reductions']
+    record = {key: scenario[key] for key in ('key', 'patient', 'profile', 'protocol', 'alpha')}
+    record.update(run_settings(scenario, days, step))
+    record.update(reductions['efficacy'])
+    record.update({
+        'tumor_auc': reductions['tumor_auc'],
+        'peak_tumor': reductions['peak_tumor']['peak'],
+        'peak_tumor_time': reductions['peak_tumor']['time'],
+        'success': bool(result['success']),
+        'message': result['message'],
+        'n_steps': int(result['n_steps']),
+        'wall_time': time.perf_counter() - start,
+    })
+    # NaN / inf (failed runs) are stored as null to keep the file strict JSON
+    return {k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in record.items()}
+
+
+def _run_task(task):
+    scenario, days, step = task
+    return run_scenario(scenario, days, step)
+
+
+def load_results(path):
+    """Records in a results file; a truncated or corrupt line is skipped."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def run_sweep(scenarios, path, workers=None, days=DEFAULT_DAYS, step=DEFAULT_STEP, log=None):
+    """
+    Run the scenarios not yet in the results file at path under these run
+    settings (see run_settings), appending one JSON line per finished scenario
+    (in completion order).
+
+    Args:
+        workers: processes (default: os.cpu_count()); 1 runs in-process.
+        log: optional callable receiving one progress line per scenario.
+
+    Returns:
+        the records of these scenarios under these settings, from this run or an
+        earlier one; records in the file from other settings are left out.
+    """
+    ids = [_resume_id({'key': s['key'], **run_settings(s, days, step)}) for s in scenarios]
+    done = {_resume_id(record) for record in load_results(path)}
+    pending = [s for s, resume_id in zip(scenarios, ids) if resume_id not in done]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    tasks = [(scenario, days, step) for scenario in pending]
+
+    needs_newline = os.path.exists(path) and os.path.getsize(path) > 0
+    if needs_newline:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    with open(path, 'a', encoding='utf-8') as out:
+        if needs_newline:  # terminate a line cut off by an interrupted run
+            out.write('\n')
+
+        def write(record, count):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            if log:
+                efficacy = 'failed' if record['E'] is None else f"E = {record['E']:.4f}"
+                log(f"[{count}/{len(pending)}] {record['key']}: {efficacy} ({record['wall_time']:.2f}s)")
+
+        if workers == 1:
+            for count, task in enumerate(tasks, 1):
+                write(_run_task(task), count)
+        elif tasks:
+            with get_context().Pool(workers) as pool:
+                for count, record in enumerate(pool.imap_unordered(_run_task, tasks), 1):
+                    write(record, count)
+    wanted = set(ids)
+    return [record for record in load_results(path) if _resume_id(record) in wanted]
+
+
+def efficacy_tables(records, value='E'):
+    """
+    Protocol × α tables of the mean of `value` over patients (successful runs).
+
+    Returns:
+        dict: 'All profiles' and one entry per profile -> pandas DataFrame
+        (rows: protocols, columns: α).
+    """
+    frame = pd.DataFrame([r for r in records if r.get('success')])
+    if frame.empty:
+        return {}
+    tables = {'All profiles': frame.pivot_table(index='protocol', columns='alpha', values=value, aggfunc='mean')}
+    for profile, group in frame.groupby('profile', sort=False):
+        tables[profile] = group.pivot_table(index='protocol', columns='alpha', values=value, aggfunc='mean')
+    return tables
+
+
+def _load_patients(patient_ids):
+    """Parameters for saved patients (patient_data), or the reference patient if none given."""
+    from calculations import calculate_all_parameters
+    from panels import PANELS
+    from patient_data import load_patient
+
+    if not patient_ids:
+        return {'reference': calculate_all_parameters({})['parameters']}
+    patients = {}
+    for patient_id in patient_ids:
+        record = load_patient(patient_id)
+        if record is None:
+            raise ValueError(f"No saved patient {patient_id!r}")
+        panel = record.get('panel_type', 'full')
+        markers = PANELS[panel]['markers'] if panel in PANELS and panel != 'full' else None
+        patients[record['patient_id']] = calculate_all_parameters(record['biomarkers'], core_markers=markers)['parameters']
+    return patients
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fractional-order × profile × protocol sweep (Chapter 5).")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file (appended; resumes if present)")
+    parser.add_argument("--alphas", type=float, nargs="+", default=list(FRACTIONAL_ORDERS), help="fractional orders")
+    parser.add_argument("--profiles", nargs="+", choices=tuple(PATIENT_PROFILES), default=list(PATIENT_PROFILES))
+    parser.add_argument("--protocols", nargs="+", choices=PROTOCOLS, default=list(PROTOCOLS))
+    parser.add_argument("--patient", action="append", default=[],
+                        help="saved patient id (repeatable; default: the reference patient)")
+    parser.add_argument("--days", type=float, default=DEFAULT_DAYS, help="treatment horizon (default %(default)s)")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="fractional solver step in days")
+    parser.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    scenarios = build_scenarios(_load_patients(args.patient), args.alphas, args.profiles, args.protocols)
+    start = time.perf_counter()
+    records = run_sweep(scenarios, args.output, args.workers, args.days, args.step, log)
+    log(f"{len(scenarios)} scenarios, {len(records)} records in {args.output} ({time.perf_counter() - start:.1f}s)")
+    for name, table in efficacy_tables(records).items():
+        print(f"\nEfficacy E — {name}\n{table.round(4).to_string()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -108,3 +108,862 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 
+
+print("\n" + "=" * 60)
+print("Batch Engine Consistency (vectorized vs scalar)")
+print("=" * 60)
+
+try:
+    import numpy as np
+    from biomarkers_data import BIOMARKER_KEYS
+    from batch_calculations import calculate_all_parameters_batch, batch_row_to_result, REFERENCE_VECTOR
+
+    rng = np.random.default_rng(42)
+    cohort = REFERENCE_VECTOR * rng.lognormal(0.0, 1.0, size=(500, len(BIOMARKER_KEYS)))
+    cohort[rng.random(cohort.shape) < 0.1] = np.nan  # missing values -> reference imputation
+    batch = calculate_all_parameters_batch(cohort)
+
+    mismatches = 0
+    for i in range(len(cohort)):
+        row = {k: cohort[i, j] for j, k in enumerate(BIOMARKER_KEYS) if not np.isnan(cohort[i, j])}
+        scalar = calculate_all_parameters(row)
+        vector = batch_row_to_result(batch, i)
+        if any(scalar[key] != vector[key] for key in ('parameters', 'scores', 'organs', 'constraint_violations')):
+            mismatches += 1
+
+    assert mismatches == 0, f"{mismatches} batch rows differ from calculate_all_parameters"
+    # Public results stay plain, JSON-serializable dicts (ParameterSet is opt-in)
+    import json
+    assert type(scalar['parameters']) is dict and type(vector['parameters']) is dict
+    json.dumps(scalar['parameters'])
+    from patient_data import export_to_json, import_from_json, load_record_for_import
+    from records import as_biomarker_vector
+    session = as_biomarker_vector({'cd8': 1.0, 'ki67': 25.0})
+    exported = import_from_json(export_to_json({'panel_type': 'full', 'biomarkers': session}))
+    assert load_record_for_import(exported) == session, "session biomarkers must survive JSON export/import"
+    print(f"✅ {len(cohort)} synthetic patients: batch parameters identical to scalar path")
+    print(f"   λ-ordering corrections applied to {int(batch['constraint_violations'].any(axis=1).sum())} rows")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Incremental Recalculation (single-biomarker edits vs full recompute)")
+print("=" * 60)
+
+try:
+    from dependency_graph import recalculate_incremental
+
+    rng = np.random.default_rng(3)
+    current = dict(example_biomarkers)
+    result = calculate_all_parameters(current)
+    mismatches = 0
+    for _ in range(400):
+        edited = dict(current)
+        key = BIOMARKER_KEYS[rng.integers(len(BIOMARKER_KEYS))]
+        if rng.random() < 0.1:
+            edited.pop(key, None)  # cleared field -> reference imputation
+        else:
+            edited[key] = float(REFERENCE_VECTOR[BIOMARKER_KEYS.index(key)] * rng.lognormal(0.0, 1.0))
+        incremental = recalculate_incremental(result, current, edited)
+        full = calculate_all_parameters(edited)
+        if any(dict(incremental[k]) != dict(full[k]) for k in ('parameters', 'scores', 'organs')) \
+                or incremental['constraint_violations'] != full['constraint_violations']:
+            mismatches += 1
+        current, result = edited, incremental
+
+    assert mismatches == 0, f"{mismatches} of 400 incremental updates differ from calculate_all_parameters"
+    print("✅ 400 chained random single-biomarker edits: incremental results identical to full recompute")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Cohort Median Imputation (incremental vs full recompute)")
+print("=" * 60)
+
+try:
+    import json
+    import tempfile
+    from pathlib import Path
+    import pandas as pd
+    from calculations import PARAMETER_NAMES
+    from imputation import MIN_OBSERVATIONS, CohortImputer, records_to_array
+    from score_cohort import score_chunk
+
+    store = Path(tempfile.mkdtemp())
+    rng = np.random.default_rng(7)
+    records = []
+    for i in range(30):
+        record = {
+            "patient_id": f"cohort_{i}",
+            "panel_type": "core" if i % 3 == 0 else "full",
+            "category": "luminal" if i % 2 else "her2",
+            "biomarkers": dict(zip(BIOMARKER_KEYS, (REFERENCE_VECTOR * rng.lognormal(0.0, 0.5, len(BIOMARKER_KEYS))).tolist())),
+        }
+        records.append(record)
+        (store / f"cohort_{i}.json").write_text(json.dumps(record), encoding="utf-8")
+
+    imputer = CohortImputer(store)
+    assert imputer.refresh() == 30 and imputer.refresh() == 0, "unchanged records must not be re-read"
+    (store / "cohort_0.json").unlink()
+    imputer.refresh()
+    X, missing = records_to_array(records[1:])
+    assert np.allclose(imputer.medians(), np.nanmedian(X, axis=0)), "incremental medians differ"
+
+    def expected_medians(rows, fallback):
+        counts = (~np.isnan(X[rows])).sum(axis=0)
+        with np.errstate(all="ignore"):
+            return np.where(counts >= MIN_OBSERVATIONS, np.nanmedian(X[rows], axis=0), fallback)
+
+    categories = np.array([r["category"] for r in records[1:]])
+    panels = np.array([r["panel_type"] for r in records[1:]])
+    luminal = expected_medians(categories == "luminal", imputer.medians())
+    assert np.allclose(imputer.medians("luminal"), luminal), "category medians differ"
+    assert np.array_equal(imputer.medians("luminal", "core"), imputer.medians("luminal")), \
+        "panel ignored unless the imputer stratifies by panel"
+    stratified = CohortImputer(store, stratify_by_panel=True)
+    stratified.refresh()
+    assert np.allclose(stratified.medians("luminal", "core"),
+                       expected_medians((categories == "luminal") & (panels == "core"), luminal)), \
+        "(category, panel) medians differ"
+
+    X_imputed, mask = stratified.impute(X, missing, categories=categories, panels=panels)
+    assert not np.isnan(X_imputed).any() and (mask == missing).all()
+
+    chunk = pd.DataFrame(X, columns=list(BIOMARKER_KEYS)).assign(category=categories)
+    scored = score_chunk(chunk, imputer=stratified, panel="full")
+    expected = calculate_all_parameters_batch(stratified.impute(X, categories=categories, panels="full")[0])
+    assert np.array_equal(scored[list(PARAMETER_NAMES)].to_numpy(), expected["parameters"]), \
+        "score_cohort --impute store differs from the imputer"
+    # Records saved from the app carry the category the user entered
+    import patient_data
+    app_store, patient_data.PATIENT_DATA_DIR = patient_data.PATIENT_DATA_DIR, Path(tempfile.mkdtemp())
+    try:
+        for i in range(MIN_OBSERVATIONS):
+            patient_data.save_patient({"cd8": 100.0 + i}, patient_id=f"app_{i}", category="tnbc")
+        app_imputer = CohortImputer(patient_data.PATIENT_DATA_DIR)
+        app_imputer.refresh()
+    finally:
+        patient_data.PATIENT_DATA_DIR = app_store
+    assert app_imputer.category_medians()["tnbc"]["cd8"] == 102.0, "saved category not used by the imputer"
+    print(f"✅ {len(imputer)} stored patients: incremental pooled, category and (category, panel) medians "
+          f"match np.nanmedian, {int(mask.sum())} values imputed; score_cohort --impute store uses them")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Parameter Jacobian (forward mode vs finite differences)")
+print("=" * 60)
+
+try:
+    from gradients import parameter_jacobian_batch
+
+    cohort = REFERENCE_VECTOR * rng.lognormal(0.0, 0.7, size=(100, len(BIOMARKER_KEYS)))
+    jac = parameter_jacobian_batch(cohort)
+    assert np.array_equal(jac['parameters'], calculate_all_parameters_batch(cohort)['parameters'])
+
+    worst = 0.0
+    for j in range(len(BIOMARKER_KEYS)):
+        h = 1e-6 * np.maximum(1.0, np.abs(cohort[:, j]))
+        plus, minus = cohort.copy(), cohort.copy()
+        plus[:, j] += h
+        minus[:, j] -= h
+        base = calculate_all_parameters_batch(cohort)['parameters']
+        forward = (calculate_all_parameters_batch(plus)['parameters'] - base) / h[:, None]
+        backward = (base - calculate_all_parameters_batch(minus)['parameters']) / h[:, None]
+        fd = (forward + backward) / 2
+        # Skip points sitting exactly on a clamp boundary (one-sided derivatives differ)
+        smooth = np.abs(forward - backward) <= 1e-4 * np.maximum(1.0, np.abs(fd))
+        error = np.abs(fd - jac['jacobian'][:, :, j]) / np.maximum(1.0, np.abs(fd))
+        worst = max(worst, float(np.max(error[smooth], initial=0.0)))
+
+    assert worst < 1e-5, f"Jacobian differs from finite differences by {worst:.2e}"
+    print(f"✅ {jac['jacobian'].shape} Jacobian matches central differences (max error {worst:.1e})")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Cohort Scoring CLI (CSV / JSONL round trip)")
+print("=" * 60)
+
+try:
+    import contextlib
+    import io
+    import score_cohort
+
+    workdir = Path(tempfile.mkdtemp())
+    lab = pd.DataFrame(cohort[:40], columns=list(BIOMARKER_KEYS)).drop(columns=['folate', 'vitamin_d'])
+    lab[lab.columns] = lab[lab.columns].astype(object)
+    lab.iloc[3, 0] = "<0.5"  # non-numeric cell -> missing, reported
+    lab.insert(0, 'patient_id', [f"P{i:03d}" for i in range(len(lab))])
+    expected_X = score_cohort.chunk_to_array(lab)[0]
+    expected = calculate_all_parameters_batch(expected_X)['parameters']
+    lab.to_csv(workdir / "lab.csv", index=False)
+    lab.to_json(workdir / "lab.jsonl", orient="records", lines=True, double_precision=15)
+
+    for source, target in (("lab.csv", "scored.jsonl"), ("lab.jsonl", "scored.csv")):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = score_cohort.main([str(workdir / source), "-o", str(workdir / target),
+                                      "--id-column", "patient_id", "--chunk-size", "16"])
+        assert code == 0, stderr.getvalue()
+        if target.endswith(".jsonl"):
+            scored = pd.read_json(workdir / target, lines=True)
+        else:
+            scored = pd.read_csv(workdir / target)
+        assert scored['patient_id'].tolist() == lab['patient_id'].tolist(), f"{source}: row order / ids lost"
+        assert np.allclose(scored[list(PARAMETER_NAMES)].to_numpy(), expected, rtol=1e-9, atol=0), source
+        assert "1 non-numeric value(s) treated as missing (ca153: 1)" in stderr.getvalue(), stderr.getvalue()
+
+    (workdir / "empty.csv").write_text("", encoding="utf-8")
+    (workdir / "misspelled.csv").write_text("CA15-3,Cd8\n45,650\n", encoding="utf-8")
+    with contextlib.redirect_stderr(io.StringIO()) as stderr:
+        assert score_cohort.main([str(workdir / "empty.csv"), "-o", str(workdir / "empty_out.csv")]) == 0
+        assert "input is empty" in stderr.getvalue()
+        assert score_cohort.main([str(workdir / "misspelled.csv"), "-o", str(workdir / "bad_out.csv")]) == 2
+        assert "No biomarker columns recognised" in stderr.getvalue()
+    print(f"✅ {len(lab)} rows CSV → JSONL and JSONL → CSV (chunks of 16) match the batch engine with ids in order")
+    print("✅ Empty input warns, unrecognised headers fail, non-numeric cells are counted")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Parallel Scoring (shared-memory worker pool)")
+print("=" * 60)
+
+try:
+    from panels import PANELS
+    from parallel_scoring import plan_slices, score_parallel
+
+    # Slices follow the worker count: a 100k-row cohort keeps all 32 workers busy
+    workers, slices = plan_slices(100_000, workers=32)
+    assert workers == 32 and len(slices) >= 32, (workers, len(slices))
+    assert slices[0][0] == 0 and slices[-1][1] == 100_000
+    assert all(a[1] == b[0] for a, b in zip(slices, slices[1:])), "slices must tile the rows in order"
+
+    rng = np.random.default_rng(11)
+    big = REFERENCE_VECTOR * rng.lognormal(0.0, 1.0, size=(6_000, len(BIOMARKER_KEYS)))
+    big[rng.random(big.shape) < 0.1] = np.nan
+    for markers in (None, PANELS['core']['markers']):
+        single = score_parallel(big, core_markers=markers, workers=1)
+        pooled = score_parallel(big, core_markers=markers, workers=4)
+        assert np.array_equal(pooled['parameters'], single['parameters']), "row order / values differ"
+        assert np.array_equal(pooled['constraint_violations'], single['constraint_violations']), "violations differ"
+        assert single['constraint_violations'].any() and not single['constraint_violations'].all()
+    print(f"✅ {len(big)} rows on 4 workers ({len(plan_slices(len(big), 4)[1])} slices) identical to the "
+          f"single-process path, full and core panel, incl. the λ-correction mask")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Selective Evaluation (requested parameters only)")
+print("=" * 60)
+
+try:
+    from selective import calculate_parameters, calculate_parameters_batch, PARAMETER_GROUPS
+    from calculations import PARAMETER_NAMES
+
+    full = calculate_all_parameters(example_biomarkers)
+    full_batch = calculate_all_parameters_batch(cohort)
+    for group, names in PARAMETER_GROUPS.items():
+        single = calculate_parameters(example_biomarkers, [group])
+        assert all(single['parameters'][n] == full['parameters'][n] for n in names), group
+        selected = calculate_parameters_batch(cohort, [group])
+        columns = [PARAMETER_NAMES.index(n) for n in selected['parameter_names']]
+        assert np.array_equal(selected['parameters'], full_batch['parameters'][:, columns]), group
+        print(f"✅ {group}: {len(names)} parameters, {len(single['scores'])} scores, {len(single['organs'])} organ factors evaluated")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("ODE Simulation (15-state Chapter 4 system)")
+print("=" * 60)
+
+try:
+    import time
+    from simulation import STATE_NAMES, constant_schedule, pack_parameters, rhs, simulate_patient
+
+    sim_parameters = calculate_all_parameters(example_biomarkers)['parameters']
+    states = rng.random((5, len(STATE_NAMES)))
+    single = np.array([rhs(0.0, y, sim_parameters) for y in states])
+    assert np.allclose(rhs(0.0, states, np.tile(pack_parameters(sim_parameters), (5, 1))), single, rtol=1e-14)
+
+    start = time.perf_counter()
+    trajectory = simulate_patient(sim_parameters, schedule=constant_schedule(u_E=1.0, dose_rate=1.0))
+    elapsed = time.perf_counter() - start
+    assert trajectory['success'], trajectory['message']
+    assert trajectory['y'].shape == (366, len(STATE_NAMES)) and np.all(np.isfinite(trajectory['y']))
+    # D' = dose − (k_el + k_met) D relaxes to dose / (k_el + k_met)
+    steady = 1.0 / (sim_parameters['kel'] + sim_parameters['k_metabolism'])
+    assert abs(trajectory['y'][-1, STATE_NAMES.index('D')] - steady) < 1e-5 * steady
+    print(f"✅ 365 days in {elapsed * 1e3:.1f} ms ({trajectory['n_steps']} steps, {trajectory['nfev']} RHS evaluations)")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Ensemble Simulation (cohort integrated in one pass)")
+print("=" * 60)
+
+try:
+    from simulation import STATE_INDEX, simulate_cohort
+
+    cohort_batch = calculate_all_parameters_batch(cohort[:20])
+    cohort_parameters = np.column_stack([cohort_batch['parameters'], cohort_batch['alpha_acid']])
+    regimen = constant_schedule(u_C=1.0, dose_rate=1.0)
+    weekly = np.append(np.arange(0.0, 365.0, 7.0), 365.0)
+    ensemble = simulate_cohort(cohort_parameters, schedule=regimen, t_eval=weekly)
+    assert ensemble['success'].all()
+    for i in range(len(cohort_parameters)):
+        alone = simulate_patient(cohort_parameters[i], schedule=regimen, t_eval=weekly)
+        assert alone['n_steps'] == ensemble['n_steps'][i]
+        assert np.allclose(ensemble['y'][i], alone['y'], rtol=1e-6, atol=1e-8)
+    print(f"✅ {len(cohort_parameters)} patients match simulate_patient "
+          f"({ensemble['n_steps'].min()}–{ensemble['n_steps'].max()} steps per patient)")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Stiff Solver Cascade (Radau → BDF → LSODA → RK45)")
+print("=" * 60)
+
+try:
+    stiff = simulate_patient(sim_parameters, schedule=constant_schedule(u_E=1.0, dose_rate=1.0), method='cascade')
+    telemetry = stiff['telemetry']
+    assert stiff['success'], stiff['message']
+    assert np.allclose(stiff['y'], trajectory['y'], rtol=1e-3, atol=1e-4)
+    print(f"✅ {telemetry['solver']}: {telemetry['n_steps']} steps ({telemetry['n_rejected']} rejected), "
+          f"{telemetry['nfev']} RHS / {telemetry['njev']} Jacobian evaluations, {telemetry['wall_time'] * 1e3:.1f} ms "
+          f"(RK45: {trajectory['n_steps']} steps)")
+
+    from stiff_solvers import solve_cascade
+    with np.errstate(over='ignore', invalid='ignore'):
+        blow_up = solve_cascade(lambda t, y: y * y, (0.0, 2.0), np.ones(2))
+    assert not blow_up['success'] and len(blow_up['telemetry']['attempts']) == 4
+    print(f"✅ Finite-time blow-up falls through all {len(blow_up['telemetry']['attempts'])} solvers and is reported")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Analytic ODE Jacobian (vs finite differences)")
+print("=" * 60)
+
+try:
+    from jacobian import JACOBIAN_SPARSITY, jacobian
+
+    jac_states = np.abs(trajectory['y'][::30]) + rng.random((len(trajectory['y'][::30]), len(STATE_NAMES)))
+    jac_controls = rng.random((len(jac_states), 5))
+    batched = jacobian(0.0, jac_states, pack_parameters(sim_parameters), jac_controls)
+    worst = 0.0
+    for y, u, J in zip(jac_states, jac_controls, batched):
+        assert np.array_equal(jacobian(0.0, y, sim_parameters, u), J)
+        assert not J[~JACOBIAN_SPARSITY].any()
+        for j in range(len(STATE_NAMES)):
+            h = 1e-6 * max(1.0, abs(y[j]))
+            step = np.zeros(len(STATE_NAMES))
+            step[j] = h
+            fd = (rhs(0.0, y + step, sim_parameters, u) - rhs(0.0, y - step, sim_parameters, u)) / (2 * h)
+            worst = max(worst, float(np.max(np.abs(fd - J[:, j]) / np.maximum(1.0, np.abs(fd)))))
+    assert worst < 1e-6, f"Jacobian differs from finite differences by {worst:.2e}"
+    print(f"✅ {batched.shape} Jacobian matches central differences (max error {worst:.1e}); "
+          f"{JACOBIAN_SPARSITY.sum()} of {JACOBIAN_SPARSITY.size} entries structurally non-zero")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Equilibria and Eigenvalue Stability")
+print("=" * 60)
+
+try:
+    from stability import analyze_stability, spectrum_summary, stability_message
+
+    start = time.perf_counter()
+    analysis = analyze_stability(sim_parameters)
+    elapsed_stability = time.perf_counter() - start
+    assert analysis['equilibria'], "no non-negative equilibrium found"
+    for eq in analysis['equilibria']:
+        residual = rhs(0.0, eq['state'], sim_parameters, None)
+        assert np.all(np.abs(residual) <= 1e-6 * (1.0 + np.abs(eq['state']))), residual
+        assert np.all(eq['state'] >= 0)
+    stacked = np.array([jacobian(0.0, eq['state'], sim_parameters) for eq in analysis['equilibria']])
+    batch_summary = spectrum_summary(stacked)
+    for i, eq in enumerate(analysis['equilibria']):
+        single = spectrum_summary(stacked[i])
+        assert single['classification'] == eq['classification'] == batch_summary['classification'][i]
+        assert np.isclose(single['max_real'], batch_summary['max_real'][i])
+    # One eigenvalue with Re λ > ε is enough for UNSTABLE; MARGINAL only on the boundary
+    for diagonal, expected in (((-1.0, -2.0, -3.0), 'STABLE'), ((-1.0, -2.0, 0.137), 'UNSTABLE'),
+                               ((-1.0, -2.0, 1e-9), 'MARGINAL'), ((-1.0, 0.0, -3.0), 'MARGINAL')):
+        assert spectrum_summary(np.diag(diagonal))['classification'] == expected, (diagonal, expected)
+    status, message = stability_message(analysis)
+    best = min(analysis['equilibria'], key=lambda e: e['max_real'])
+    assert status == ('UNSTABLE' if best['max_real'] > 1e-6 else 'STABLE' if best['max_real'] < -1e-6 else 'MARGINAL')
+    print(f"✅ {len(analysis['equilibria'])} equilibrium(s), residual ≈ 0; status {status} "
+          f"in {elapsed_stability * 1e3:.0f} ms")
+    print(f"   {message}")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Dosing Schedules (restart at dosing events)")
+print("=" * 60)
+
+try:
+    from schedules import bolus, cyclic, treatment_window, with_holidays
+
+    standard = cyclic(treatment_window(0.0, 21.0, u_H=1.0), period=28.0)
+    assert standard(20.5)[2] == 1.0 and standard(21.0)[2] == 0.0 and standard(28.0)[2] == 1.0
+    assert standard(np.array([0.0, 25.0])).shape == (2, 5)
+    piecewise = simulate_patient(sim_parameters, schedule=standard)
+    naive = simulate_patient(sim_parameters, schedule=lambda t: standard(t))
+    assert piecewise['success'] and naive['success']
+    assert np.allclose(piecewise['y'], naive['y'], rtol=1e-2, atol=1e-3)
+    attempted = piecewise['n_steps'] + piecewise['n_rejected']
+    naive_attempted = naive['n_steps'] + naive['n_rejected']
+    assert attempted < naive_attempted
+    print(f"✅ 28-day Standard protocol: {attempted} attempted steps over "
+          f"{piecewise['telemetry']['n_segments']} segments (naive: {naive_attempted}), "
+          f"{piecewise['nfev']} vs {naive['nfev']} RHS evaluations")
+
+    chemo = with_holidays(cyclic(bolus(0.0, 5.0) + treatment_window(0.0, 5.0, u_C=1.0), period=21.0), [(120.0, 160.0)])
+    dosed = simulate_patient(sim_parameters, schedule=chemo)
+    D = dosed['y'][:, STATE_NAMES.index('D')]
+    decay = sim_parameters['kel'] + sim_parameters['k_metabolism']
+    assert dosed['success'] and np.isclose(D[0], 5.0)
+    assert np.allclose(D[1:21], 5.0 * np.exp(-decay * np.arange(1, 21)), rtol=1e-4)
+    assert len(chemo.doses(0.0, 365.0)) == 16 and not chemo.doses(120.0, 160.0)
+    print(f"✅ Boluses land exactly on their days ({len(chemo.doses(0.0, 365.0))} doses, holiday skipped); "
+          f"D decays as 5·exp(-{decay:.3g} t) between doses")
+
+    cohort_dosed = simulate_cohort([sim_parameters] * 3, schedule=chemo, t_eval=dosed['t'])
+    assert cohort_dosed['success'].all()
+    assert np.allclose(cohort_dosed['y'][0], dosed['y'], rtol=1e-6, atol=1e-6)
+    print("✅ Cohort integration restarts at the same events as simulate_patient")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Fractional-Order (Caputo) Solver")
+print("=" * 60)
+
+try:
+    import math
+    from fractional import simulate_fractional, soe_kernel
+
+    lags = np.logspace(-1, np.log10(365.0), 500)
+    for order in (0.75, 0.95):
+        weights, rates = soe_kernel(order, 0.1, 365.0, 1e-6)
+        exact_kernel = lags ** (order - 1) / math.gamma(order)
+        kernel_error = np.max(np.abs(np.exp(-np.outer(lags, rates)) @ weights - exact_kernel) / exact_kernel)
+        assert kernel_error < 1e-6, kernel_error
+    print(f"✅ Sum-of-exponentials kernel within 1e-6 on [0.1, 365] days with {len(rates)} modes")
+
+    start = time.perf_counter()
+    soe = simulate_fractional(sim_parameters, 0.85, t_span=(0.0, 60.0), schedule=standard)
+    elapsed_soe = time.perf_counter() - start
+    start = time.perf_counter()
+    full = simulate_fractional(sim_parameters, 0.85, t_span=(0.0, 60.0), schedule=standard, memory='full')
+    elapsed_full = time.perf_counter() - start
+    assert soe['success'] and full['success']
+    assert np.allclose(soe['y'], full['y'], rtol=1e-5, atol=1e-6)
+    print(f"✅ α = 0.85: fast history matches the exact O(n²) history over {soe['n_steps']} steps "
+          f"({elapsed_soe * 1e3:.0f} ms vs {elapsed_full * 1e3:.0f} ms)")
+
+    integer = simulate_fractional(sim_parameters, 1.0, schedule=standard)
+    assert np.array_equal(integer['y'], piecewise['y'])
+    nearly = simulate_fractional(sim_parameters, 0.9999, t_span=(0.0, 60.0), schedule=standard)
+    state_scale = 1.0 + np.abs(integer['y'][:61]).max(axis=0)  # N₁ decays by ~1e-5; compare on each state's scale
+    assert np.all(np.abs(nearly['y'] - integer['y'][:61]) <= 1e-3 * state_scale)
+    print("✅ α = 1 reproduces simulate_patient; α → 1 converges to it")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Scenario Sweep (resumable)")
+print("=" * 60)
+
+try:
+    import os
+    import tempfile
+    from sweep import build_scenarios, efficacy_tables, load_results, run_sweep
+
+    reference_parameters = calculate_all_parameters({})['parameters']
+    sweep_scenarios = build_scenarios({'reference': reference_parameters}, alphas=(0.9, 1.0),
+                                      profiles=('Young', 'Average'), protocols=('Standard', 'Combined'))
+    assert len(sweep_scenarios) == 8
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sweep.jsonl')
+        run_sweep(sweep_scenarios[:5], path, workers=1, days=30.0)
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+        with open(path, 'w', encoding='utf-8') as f:  # interrupted while writing the fifth record
+            f.writelines(lines[:4] + [lines[4][:25]])
+        records = run_sweep(sweep_scenarios, path, workers=2, days=30.0)
+        assert len(records) == 8 and {r['key'] for r in records} == {s['key'] for s in sweep_scenarios}
+        assert len(load_results(path)) == 8 and all(r['success'] for r in records)
+        with open(path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 9  # the cut-off fragment stays on its own line and is skipped
+        # A different horizon is a different run: nothing is reused from the 30-day records
+        longer = run_sweep(sweep_scenarios[:2], path, workers=1, days=60.0)
+        assert len(longer) == 2 and all(r['days'] == 60.0 for r in longer)
+        assert len(load_results(path)) == 10 and len(run_sweep(sweep_scenarios, path, workers=1, days=30.0)) == 8
+        assert all(r['peak_tumor'] > 0 and 0.0 <= r['peak_tumor_time'] <= 60.0 for r in longer)
+    tables = efficacy_tables(records)
+    assert set(tables) == {'All profiles', 'Young', 'Average'} and tables['Young'].shape == (2, 2)
+    print("✅ 8-scenario sweep resumed after an interrupted write (4 kept, 4 run on 2 workers); new horizon re-runs")
+    print(tables['All profiles'].round(4).to_string())
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Streaming Outcomes (reducers)")
+print("=" * 60)
+
+try:
+    from outcomes import AUCReducer, EfficacyReducer, PeakReducer, efficacy_initial_state, treatment_efficacy
+    from outcomes import tumor_burden
+    from simulation import simulate_cohort
+
+    def outcome_reducers():
+        return {'efficacy': EfficacyReducer(), 'tumor_auc': AUCReducer(tumor_burden), 'peak_drug': PeakReducer('D')}
+
+    dosed = standard + bolus([0.0, 10.0], 5.0)
+    y_start = efficacy_initial_state(sim_parameters)
+    dense = simulate_patient(sim_parameters, y_start, (0.0, 60.0), dosed, t_eval=np.linspace(0.0, 60.0, 6001))
+    streamed = simulate_patient(sim_parameters, y_start, (0.0, 60.0), dosed, t_eval=[], reducers=outcome_reducers())
+    reductions = streamed['reductions']
+    assert streamed['y'].shape == (0, 15)
+    assert reductions['efficacy'] == treatment_efficacy(dense['y'][0], dense['y'][-1])
+    dense_auc = np.trapezoid(tumor_burden(dense['y']), dense['t'])
+    assert abs(reductions['tumor_auc'] - dense_auc) <= 1e-2 * dense_auc
+    assert abs(reductions['peak_drug']['peak'] - dense['y'][:, STATE_INDEX['D']].max()) <= 1e-6
+    print(f"✅ Streamed E = {reductions['efficacy']['E']:.4f} equals E from the dense trajectory; "
+          f"AUC {reductions['tumor_auc']:.1f}, peak D {reductions['peak_drug']['peak']:.3f} "
+          f"at t = {reductions['peak_drug']['time']:g}")
+
+    cohort_run = simulate_cohort([sim_parameters] * 3, np.array([y_start] * 3), (0.0, 60.0), dosed,
+                                 reducers=outcome_reducers())
+    assert np.allclose(cohort_run['reductions']['efficacy']['E'], reductions['efficacy']['E'], rtol=1e-8)
+    assert np.allclose(cohort_run['reductions']['tumor_auc'], reductions['tumor_auc'], rtol=1e-8)
+    cascade_run = simulate_patient(sim_parameters, y_start, (0.0, 60.0), dosed, t_eval=[], method='cascade',
+                                   reducers=outcome_reducers())
+    assert abs(cascade_run['reductions']['efficacy']['E'] - reductions['efficacy']['E']) < 1e-4
+    fractional_run = simulate_fractional(sim_parameters, 0.85, y_start, (0.0, 60.0), dosed, t_eval=[0.0, 60.0],
+                                         reducers=outcome_reducers())
+    assert fractional_run['reductions']['efficacy'] == treatment_efficacy(*fractional_run['y'])
+    print("✅ Same reducers on simulate_cohort (per patient), the stiff cascade and the Caputo solver")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Trajectory Store (memory-mapped)")
+print("=" * 60)
+
+try:
+    import tempfile
+    from simulation import MODEL_VERSION
+    from trajectory_store import TrajectoryStore
+
+    cohort_days = np.append(np.arange(0.0, 365.0, 1.0), 365.0)
+    stored = simulate_cohort([sim_parameters] * 4, t_span=(0.0, 365.0), t_eval=cohort_days)
+    with tempfile.TemporaryDirectory() as tmp:
+        with TrajectoryStore(tmp, chunk_rows=500) as store:  # small chunks: the cohort spans several files
+            for i in range(4):
+                store.write(f"P{i}", "untreated", stored['t'], stored['y'][i])
+            store.write("P0", "untreated-weekly", stored['t'], stored['y'][0], every=7, note="downsampled")
+        reopened = TrajectoryStore(tmp)
+        assert len(reopened) == 5 and len({e['chunk'] for e in reopened.entries()}) > 1
+        t_read, y_read = reopened.read("P2", "untreated")
+        assert isinstance(y_read, np.memmap) and y_read.dtype == np.float32 and t_read.dtype == np.float64
+        assert np.allclose(y_read, stored['y'][2], rtol=1e-6, atol=1e-30)
+        t_slice, y_slice = reopened.read("P2", "untreated", t_range=(30.0, 60.0))
+        assert np.array_equal(t_slice, np.arange(30.0, 61.0)) and np.shares_memory(y_slice, y_read)
+        weekly = reopened.entries(protocol="untreated-weekly")[0]
+        assert weekly['length'] == 54 and weekly['note'] == "downsampled" and weekly['model_version'] == MODEL_VERSION
+        assert reopened.read("P0", "untreated-weekly")[0][-1] == 365.0
+        # One-second steps late in a 5-year horizon keep distinct times (float32 would merge them)
+        fine_t = 5 * 365.0 + np.arange(6) / 86400.0
+        reopened.write("P0", "fine", fine_t, np.ones((6, len(STATE_NAMES))))
+        t_fine, _ = reopened.read("P0", "fine", t_range=(fine_t[2], fine_t[3]))
+        assert np.array_equal(t_fine, fine_t[2:4])
+        reopened.close()
+        del t_read, y_read, t_slice, y_slice, t_fine  # release the file maps before the directory is removed
+    print("✅ 5 trajectories in float32 chunks with float64 times; reads are zero-copy memmap views (full, time slice, downsampled)")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Terminal Events (early termination)")
+print("=" * 60)
+
+try:
+    from events import Event, divergence, extinction, progression, resistance
+
+    run_events = [extinction(), progression(0.9), resistance(0.05), divergence()]
+    full_year = simulate_patient(sim_parameters, y_start, (0.0, 365.0), t_eval=np.linspace(0.0, 365.0, 36501))
+    burden = tumor_burden(full_year['y'])
+    crossing = full_year['t'][np.argmax(burden >= 0.9 * sim_parameters['K'])]
+    stopped = simulate_patient(sim_parameters, y_start, (0.0, 365.0), events=run_events)
+    t_progression = stopped['events']['progression']['t']
+    assert stopped['success'] and stopped['terminated_by'] == 'progression' and len(t_progression) == 1
+    assert abs(t_progression[0] - crossing) <= 0.01 and stopped['t_final'] == t_progression[0]
+    assert abs(tumor_burden(stopped['events']['progression']['y'][0]) / sim_parameters['K'] - 0.9) < 1e-9
+    assert len(stopped['events']['extinction']['t']) == 0 and np.isnan(stopped['y'][-1]).all()
+    print(f"✅ Progression (N_total = 0.9 K) at t = {t_progression[0]:.4f} (dense grid: {crossing:.2f}); "
+          f"run stopped after {stopped['n_steps']} of {full_year['n_steps']} steps")
+
+    cohort_events = simulate_cohort([sim_parameters] * 3, np.array([y_start] * 3), (0.0, 365.0), standard,
+                                    events=run_events)
+    treated = simulate_patient(sim_parameters, y_start, (0.0, 365.0), standard, events=run_events)
+    assert list(cohort_events['terminated_by']) == [treated['terminated_by']] * 3
+    assert np.allclose(cohort_events['t_final'], treated['t_final'], rtol=1e-8)
+    cascade_events = simulate_patient(sim_parameters, y_start, (0.0, 365.0), events=run_events, method='cascade')
+    assert abs(cascade_events['events']['progression']['t'][0] - t_progression[0]) < 1e-3
+    fractional_events = simulate_fractional(sim_parameters, 0.9, y_start, (0.0, 365.0), events=run_events)
+    assert fractional_events['terminated_by'] == 'progression' and fractional_events['t_final'] < 365.0
+    halfway = Event('half-D', lambda t, y, p: y[..., STATE_INDEX['D']] - 2.5, direction=-1)
+    recorded = simulate_patient(sim_parameters, y_start, (0.0, 60.0), dosed, events=[halfway])
+    assert recorded['terminated_by'] is None and len(recorded['events']['half-D']['t']) >= 2
+    print(f"✅ Cohort, cascade and Caputo (α = 0.9, t = {fractional_events['t_final']:.2f}) stop at the same event; "
+          f"custom event recorded {len(recorded['events']['half-D']['t'])} crossings")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Model Specification (generated RHS, Jacobian and LaTeX)")
+print("=" * 60)
+
+try:
+    from model_spec import CHAPTER4_MODEL
+    import simulation
+
+    assert simulation._derivatives is CHAPTER4_MODEL.rhs_kernel
+    assert "[" not in CHAPTER4_MODEL.rhs_source() and "[" not in CHAPTER4_MODEL.jacobian_source()
+    print(f"✅ RHS kernel ({len(CHAPTER4_MODEL.rhs_source().splitlines())} lines) and Jacobian kernel "
+          f"({len(CHAPTER4_MODEL.jacobian_entries())} entries) generated without indexing or dict lookups")
+
+    # A drug-dependent kill of N₂ added once shows up in all three outputs
+    symbol = CHAPTER4_MODEL.symbol
+    kill = -0.2 * symbol('etaC') * symbol('u_C') * symbol('N2') * symbol('D')
+    extended = CHAPTER4_MODEL.with_term('N2', kill)
+    p_spec = pack_parameters(sim_parameters).tolist()
+    y_spec = (np.abs(trajectory['y'][40]) + 1.0).tolist()
+    u_spec = [0.0, 1.0, 0.0, 0.0, 0.0]
+    base_f = np.array(CHAPTER4_MODEL.rhs_kernel(y_spec, p_spec, u_spec))
+    new_f = np.array(extended.rhs_kernel(y_spec, p_spec, u_spec))
+    expected = -0.2 * sim_parameters['etaC'] * y_spec[STATE_INDEX['N2']] * y_spec[STATE_INDEX['D']]
+    assert np.isclose(new_f[STATE_INDEX['N2']] - base_f[STATE_INDEX['N2']], expected, rtol=1e-12)
+    assert np.array_equal(np.delete(new_f, STATE_INDEX['N2']), np.delete(base_f, STATE_INDEX['N2']))
+
+    new_pattern = extended.sparsity()
+    assert new_pattern[STATE_INDEX['N2'], STATE_INDEX['D']] and not JACOBIAN_SPARSITY[STATE_INDEX['N2'], STATE_INDEX['D']]
+    new_J = np.zeros((len(STATE_NAMES), len(STATE_NAMES)))
+    rows, cols = zip(*((i, j) for i, j, _ in extended.jacobian_entries()))
+    new_J[rows, cols] = extended.jacobian_kernel(y_spec, p_spec, u_spec)
+    h = 1e-6 * y_spec[STATE_INDEX['D']]
+    shifted = list(y_spec)
+    shifted[STATE_INDEX['D']] += h
+    fd = (np.array(extended.rhs_kernel(shifted, p_spec, u_spec)) - new_f) / h
+    assert np.allclose(new_J[:, STATE_INDEX['D']], fd, rtol=1e-5, atol=1e-8)
+    assert r"0.2 \eta_C u_C N_2 D" in extended.latex('N2') and "D" not in CHAPTER4_MODEL.latex('N2').split("dt}")[1]
+    print(f"✅ Added term updates RHS, Jacobian ({new_pattern.sum()} non-zeros, new ∂f_N2/∂D) and LaTeX consistently")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Closed-form Pharmacokinetics (D, Dm between dosing events)")
+print("=" * 60)
+
+try:
+    from pharmacokinetics import pk_rates, propagate
+    from schedules import infusion, protocol_schedule
+
+    regimen = cyclic(bolus([0.0], 50.0) + infusion(2.0, 0.0, 5.0, u_C=0.5), 7.0, until=365.0)
+    numeric_pk = simulate_patient(sim_parameters, y_start, (0.0, 120.0), regimen)
+    analytic_pk = simulate_patient(sim_parameters, y_start, (0.0, 120.0), regimen, pk='analytic')
+    reference_pk = simulate_patient(sim_parameters, y_start, (0.0, 120.0), regimen, rtol=1e-11, atol=1e-12)
+    assert analytic_pk['success']
+    drug = [STATE_INDEX['D'], STATE_INDEX['Dm']]
+    assert np.allclose(analytic_pk['y'][:, drug], reference_pk['y'][:, drug], rtol=1e-9, atol=1e-10)
+    assert np.allclose(analytic_pk['y'], reference_pk['y'], rtol=1e-4, atol=1e-6)
+    D_check, Dm_check = propagate(3.0, 1.0, 2.0, 0.0, pk_rates(sim_parameters))
+    assert np.isclose(D_check, 3.0) and np.isclose(Dm_check, 1.0)
+    reference_patient = calculate_all_parameters({})['parameters']
+    steps_pk = {mode: simulate_patient(reference_patient, schedule=regimen, t_span=(0.0, 120.0), pk=mode)['n_steps']
+                for mode in ('numeric', 'analytic')}
+    assert steps_pk['analytic'] < steps_pk['numeric']
+    print(f"✅ D, Dm exact to 1e-9 over 120 days of weekly dosing; RK45 steps numeric → analytic: "
+          f"{numeric_pk['n_steps']} → {analytic_pk['n_steps']} (this patient), "
+          f"{steps_pk['numeric']} → {steps_pk['analytic']} (reference patient)")
+
+    pk_events = simulate_patient(sim_parameters, y_start, (0.0, 365.0), regimen, pk='analytic',
+                                 events=[progression(0.9)], reducers={'peak_drug': PeakReducer('D')}, t_eval=[])
+    assert pk_events['terminated_by'] == 'progression' and pk_events['events']['progression']['y'].shape == (1, 15)
+    assert pk_events['reductions']['peak_drug']['peak'] >= 50.0
+    pk_cascade = simulate_patient(sim_parameters, y_start, (0.0, 120.0), regimen, method='cascade', pk='analytic')
+    assert pk_cascade['success'] and np.allclose(pk_cascade['y'], reference_pk['y'], rtol=1e-2, atol=1e-4)
+    try:
+        simulate_patient(sim_parameters, schedule=protocol_schedule('Adaptive'), pk='analytic')
+        raise AssertionError("a general callable schedule was accepted")
+    except ValueError:
+        pass
+    print(f"✅ Events, reducers and the cascade ({pk_cascade['n_steps']} steps) run on the 13-state system")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Log-space Integration (positivity)")
+print("=" * 60)
+
+try:
+    from log_space import LOG_STATES
+
+    populations = [STATE_INDEX[name] for name in LOG_STATES]
+    all_on = treatment_window(u_E=1.0, u_C=1.0, u_H=1.0, u_I=1.0)
+    linear_run = simulate_patient(sim_parameters, y_start, schedule=all_on)
+    log_run = simulate_patient(sim_parameters, y_start, schedule=all_on, state_space='log')
+    reference_run = simulate_patient(sim_parameters, y_start, schedule=all_on, rtol=1e-11, atol=1e-14)
+    assert log_run['success'] and (log_run['y'][:, populations] > 0).all()
+    assert np.allclose(log_run['y'], reference_run['y'], rtol=1e-4, atol=1e-6)
+    assert log_run['n_steps'] < linear_run['n_steps']
+    print(f"✅ All treatments on: RK45 steps linear → log {linear_run['n_steps']} → {log_run['n_steps']}, "
+          f"smallest population {linear_run['y'][:, populations].min():.1e} → {log_run['y'][:, populations].min():.1e}")
+
+    log_pk = simulate_patient(sim_parameters, y_start, (0.0, 365.0), regimen, pk='analytic', state_space='log',
+                              events=[progression(0.9)], reducers={'peak_drug': PeakReducer('D')}, t_eval=[])
+    assert log_pk['terminated_by'] == 'progression'
+    assert abs(log_pk['events']['progression']['t'][0] - pk_events['events']['progression']['t'][0]) < 1e-3
+    assert np.isclose(log_pk['reductions']['peak_drug']['peak'], pk_events['reductions']['peak_drug']['peak'])
+    log_cascade = simulate_patient(sim_parameters, y_start, (0.0, 120.0), regimen, method='cascade', state_space='log')
+    assert log_cascade['success'] and np.allclose(log_cascade['y'], reference_pk['y'], rtol=1e-2, atol=1e-4)
+    assert (log_cascade['y'][:, populations] > 0).all()
+    try:
+        simulate_patient(sim_parameters, state_space='exp')
+        raise AssertionError("an unknown state space was accepted")
+    except ValueError:
+        pass
+    print(f"✅ Combines with pk='analytic', events, reducers and the cascade ({log_cascade['n_steps']} steps)")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
+
+
+print("\n" + "=" * 60)
+print("Checkpoint and Restart (shared prefixes for what-if branches)")
+print("=" * 60)
+
+try:
+    prefix_run = simulate_patient(sim_parameters, y_start, schedule=standard, checkpoints=[120.0],
+                                  reducers={'tumor_auc': AUCReducer(tumor_burden)}, events=[resistance(0.1)])
+    day_120 = prefix_run['checkpoints'][120.0]
+    same = simulate_patient(sim_parameters, schedule=standard, resume=day_120, events=[resistance(0.1)])
+    assert np.array_equal(same['y'], prefix_run['y'][120:])
+    assert same['reductions'] == prefix_run['reductions']
+    assert np.array_equal(same['events']['resistance']['t'], prefix_run['events']['resistance']['t'])
+    print(f"✅ Resuming at day 120 with the same schedule reproduces the run exactly "
+          f"({same['n_steps']} of {prefix_run['n_steps']} steps)")
+
+    chemo_switch = standard + cyclic(bolus([0.0], 50.0) + treatment_window(0.0, 5.0, u_C=1.0), 7.0, start=120.0)
+    branch = simulate_patient(sim_parameters, schedule=chemo_switch, resume=day_120)
+    from_zero = simulate_patient(sim_parameters, y_start, schedule=chemo_switch)
+    assert np.allclose(branch['y'], from_zero['y'][120:], rtol=1e-9, atol=1e-12)
+    assert branch['n_steps'] < from_zero['n_steps']
+    print(f"✅ Chemotherapy from day 120 branches off the checkpoint: {branch['n_steps']} steps instead of "
+          f"{from_zero['n_steps']}, same trajectory")
+
+    memory_run = simulate_fractional(sim_parameters, 0.85, y_start, (0.0, 120.0), standard, checkpoints=[60.0])
+    memory_resumed = simulate_fractional(sim_parameters, 0.85, t_span=(0.0, 120.0), schedule=standard,
+                                         resume=memory_run['checkpoints'][60.0])
+    assert np.array_equal(memory_resumed['y'], memory_run['y'][60:])
+    for bad in ({'alpha': 0.9}, {'alpha': 0.85, 'memory': 'full'}):
+        try:
+            simulate_fractional(sim_parameters, t_span=(0.0, 120.0), resume=memory_run['checkpoints'][60.0], **bad)
+            raise AssertionError(f"resumed with {bad}")
+        except ValueError:
+            pass
+    print("✅ Fractional checkpoints carry the memory (resumed α = 0.85 run identical to the original)")
+
+except Exception as e:
+    print(f"\n❌ ERROR: {str(e)}")
+    import traceback
+    traceback.print_exc()
@@ -0,0 +1,190 @@
+"""
+Trajectory Store Module
+On-disk store for simulated trajectories, read back through memory maps.
+
+Trajectories are written as float32 state rows (N₁ … H) into chunk files
+(chunk_00000.npy, …) of about CHUNK_ROWS rows each, with their times in a
+float64 companion file (times_00000.npy, …): float32 keeps only ~7 significant
+digits (about 10 s at a 5-year horizon in days), so fine steps would collapse
+onto equal times and t_range bounds would be rounded. index.json maps each (patient, protocol, model version) to its chunk,
+row offset and length plus any metadata given on write. Reading opens the chunk with np.load(mmap_mode='r'),
+so a single patient or a time slice of it is a view on the file: nothing else
+is read from disk and nothing is copied. Trajectories can be downsampled on
+write (every k-th point, always keeping the last).
+
+Writes are buffered and land on disk as a new chunk on flush() (or when the
+buffer reaches CHUNK_ROWS, or on close); the index is replaced atomically after
+the chunk is written. A trajectory written again under the same key supersedes
+the earlier one. One writer at a time per directory.
+
+Example:
+    with TrajectoryStore("trajectories") as store:
+        store.write("P001", "Standard", result['t'], result['y'], every=7)
+    t, y = TrajectoryStore("trajectories").read("P001", "Standard")
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from simulation import MODEL_VERSION, STATE_INDEX, STATE_NAMES
+
+# Rows (time points) buffered before a chunk is written: 2**18 rows × (15 float32 + 1 float64) = 17 MiB
+CHUNK_ROWS = 2 ** 18
+DTYPE = np.float32
+TIME_DTYPE = np.float64
+INDEX_FILE = "index.json"
+# Columns of a stored state row, in STATE_NAMES order (times are stored separately)
+COLUMNS = STATE_NAMES
+
+
+def trajectory_key(patient, protocol, model_version=MODEL_VERSION):
+    """Index key of a stored trajectory."""
+    return f"{patient}|{protocol}|{model_version}"
+
+
+def downsample(t, y, every):
+    """Every `every`-th point of (t, y), always keeping the last one."""
+    if every < 1:
+        raise ValueError("every must be a positive integer")
+    keep = np.arange(0, len(t), int(every))
+    if len(t) and keep[-1] != len(t) - 1:
+        keep = np.append(keep, len(t) - 1)
+    return np.asarray(t)[keep], np.asarray(y)[keep]
+
+
+class TrajectoryStore:
+    """
+    Chunked float32 trajectory store in `directory` (created if missing).
+
+    Args:
+        directory: store location.
+        chunk_rows: buffered rows that trigger writing a chunk.
+    """
+
+    def __init__(self, directory, chunk_rows=CHUNK_ROWS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_rows = int(chunk_rows)
+        index_path = self.directory / INDEX_FILE
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        else:
+            index = {'columns': list(COLUMNS), 'entries': {}}
+        if tuple(index['columns']) != COLUMNS:
+            raise ValueError(f"Store at {self.directory} has columns {index['columns']}, expected {list(COLUMNS)}")
+        self._entries = index['entries']
+        self._pending = []  # (key, entry, t, y) not yet on disk
+        self._pending_rows = 0
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries) + len({key for key, *_ in self._pending} - set(self._entries))
+
+    def __contains__(self, key):
+        return key in self._entries or any(k == key for k, *_ in self._pending)
+
+    def write(self, patient, protocol, t, y, model_version=MODEL_VERSION, every=1, **metadata):
+        """
+        Add one trajectory: t (n,) and y (n, 15) as returned by simulate_patient
+        or simulate_fractional (one row of simulate_cohort's y for a cohort).
+
+        Args:
+            every: keep every every-th point (and the last).
+            metadata: JSON-serializable values stored in the index entry.
+
+        Returns:
+            the trajectory's key.
+        """
+        t = np.asarray(t, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if y.shape != (len(t), len(STATE_NAMES)):
+            raise ValueError(f"y must have shape ({len(t)}, {len(STATE_NAMES)}), got {y.shape}")
+        t, y = downsample(t, y, every)
+        key = trajectory_key(patient, protocol, model_version)
+        entry = {'patient': str(patient), 'protocol': str(protocol), 'model_version': str(model_version),
+                 'length': len(t), 'every': int(every), **metadata}
+        self._pending.append((key, entry, t.astype(TIME_DTYPE), y.astype(DTYPE)))
+        self._pending_rows += len(t)
+        if self._pending_rows >= self.chunk_rows:
+            self.flush()
+        return key
+
+    def flush(self):
+        """Write the buffered trajectories as one chunk and update the index."""
+        if not self._pending:
+            return
+        number = self._next_chunk()
+        chunk, times = f"chunk_{number:05d}.npy", f"times_{number:05d}.npy"
+        np.save(self.directory / times, np.concatenate([t for _, _, t, _ in self._pending]))
+        np.save(self.directory / chunk, np.concatenate([y for _, _, _, y in self._pending]))
+        offset = 0
+        for key, entry, t, _ in self._pending:
+            self._entries[key] = {**entry, 'chunk': chunk, 'times': times, 'offset': offset}
+            offset += len(t)
+        self._pending, self._pending_rows = [], 0
+        tmp = self.directory / (INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({'columns': list(COLUMNS), 'entries': self._entries}, f, indent=1)
+        os.replace(tmp, self.directory / INDEX_FILE)
+
+    def close(self):
+        """Flush pending trajectories and release the memory maps."""
+        self.flush()
+        self._maps.clear()
+
+    def _next_chunk(self):
+        existing = [int(p.stem.split("_")[1]) for p in self.directory.glob("chunk_*.npy")]
+        return max(existing, default=-1) + 1
+
+    def _chunk(self, name):
+        if name not in self._maps:
+            self._maps[name] = np.load(self.directory / name, mmap_mode='r')
+        return self._maps[name]
+
+    def entries(self, patient=None, protocol=None, model_version=None):
+        """Index entries (with their 'key'), filtered by any of patient, protocol and model_version."""
+        self.flush()
+        wanted = {'patient': patient, 'protocol': protocol, 'model_version': model_version}
+        return [
+            {'key': key, **entry} for key, entry in self._entries.items()
+            if all(value is None or entry[field] == str(value) for field, value in wanted.items())
+        ]
+
+    def read(self, patient, protocol, model_version=MODEL_VERSION, t_range=None, states=None):
+        """
+        One stored trajectory as memory-mapped views (float64 times, float32 states).
+
+        Args:
+            t_range: optional (start, end) to return only the points with
+                start <= t <= end (still a view).
+            states: optional state names; their columns are gathered into a new
+                (n, len(states)) array (the one case that copies).
+
+        Returns:
+            (t, y): (n,) times and (n, 15) states (or (n, len(states))).
+        """
+        key = trajectory_key(patient, protocol, model_version)
+        if key not in self:
+            raise KeyError(key)
+        if any(k == key for k, *_ in self._pending):
+            self.flush()
+        entry = self._entries[key]
+        rows = slice(entry['offset'], entry['offset'] + entry['length'])
+        t, y = self._chunk(entry['times'])[rows], self._chunk(entry['chunk'])[rows]
+        if t_range is not None:
+            lo = int(np.searchsorted(t, t_range[0], side='left'))
+            hi = int(np.searchsorted(t, t_range[1], side='right'))
+            t, y = t[lo:hi], y[lo:hi]
+        if states is not None:
+            y = y[:, [STATE_INDEX[name] for name in states]]
+        return t, y